@@ -1,67 +1,123 @@
 /*********************************************************************
   DS18B20 Temperature Sensor - Space Freezer Integration
-  
-  Reads temperature from DS18B20 sensor and sends via USB serial
+
+  Reads every DS18B20 on the bus and sends readings via USB serial
   to be captured by arduino_serial_reader.py
-  
+
+  Non-blocking: loop() never waits. A millis() scheduler starts one
+  conversion for all probes at once (setWaitForConversion(false)) every
+  SAMPLE_INTERVAL_MS and collects the results when the conversion time
+  for RESOLUTION_BITS has passed.
+
+  A reading is sent only when a probe moves more than DEADBAND_C from
+  the last value sent for it, plus a heartbeat every HEARTBEAT_MS so the
+  reader can tell a quiet probe from a dead link.
+
+  Serial format (one line per reading):
+    TEMP:-18.50      probe 0 (same line the original sketch sent)
+    TEMP1:-17.94     probe 1, 2, ... in bus order
+
   Modified for Space Freezer project
 *********************************************************************/
 
-#include <Wire.h>
 #include <OneWire.h>
 #include <DallasTemperature.h>
 
 #define ONE_WIRE_BUS 2                // DS18B20 data wire is connected to input 2
+#define MAX_PROBES 8
 
-DeviceAddress thermometerAddress;     // custom array type to hold 64 bit device address
+// ----- tuning -----
+const uint8_t  RESOLUTION_BITS    = 11;     // 9..12 bits = 0.5 / 0.25 / 0.125 / 0.0625 C, 94..750 ms per conversion
+const uint32_t SAMPLE_INTERVAL_MS = 500;    // how often to start a conversion (>= conversion time)
+const float    DEADBAND_C         = 0.25;   // send when a probe moves at least this much
+const uint32_t HEARTBEAT_MS       = 30000;  // ...and at least this often regardless
 
 OneWire oneWire(ONE_WIRE_BUS);        // create a oneWire instance to communicate with temperature IC
 DallasTemperature tempSensor(&oneWire);  // pass the oneWire reference to Dallas Temperature
 
+DeviceAddress probes[MAX_PROBES];     // custom array type to hold 64 bit device addresses
+uint8_t probeCount = 0;
+
+float lastSent[MAX_PROBES];
+uint32_t lastSentAt[MAX_PROBES];
+bool everSent[MAX_PROBES];
+
+bool converting = false;
+uint32_t conversionStartedAt = 0;
+uint32_t lastRequestAt = 0;
+uint16_t conversionMs = 750;
+
 void setup()   {
 
   Serial.begin(115200);  // Changed to 115200 to match arduino_serial_reader.py
-                      
+
   Serial.println("=== Space Freezer Temperature Monitor (Serial Mode) ===");
   Serial.println("DS18B20 Temperature IC");
   Serial.println("Locating devices...");
   tempSensor.begin();                         // initialize the temp sensor
 
-  if (!tempSensor.getAddress(thermometerAddress, 0))
-    Serial.println("Unable to find Device.");
-  else {
-    Serial.print("Device 0 Address: ");
-    printAddress(thermometerAddress);
-    Serial.println();
+  uint8_t found = tempSensor.getDeviceCount();
+  for (uint8_t i = 0; i < found && probeCount < MAX_PROBES; i++) {
+    if (tempSensor.getAddress(probes[probeCount], i)) {
+      Serial.print("Device ");
+      Serial.print(probeCount);
+      Serial.print(" Address: ");
+      printAddress(probes[probeCount]);
+      Serial.println();
+      tempSensor.setResolution(probes[probeCount], RESOLUTION_BITS);
+      everSent[probeCount] = false;
+      probeCount++;
+    }
   }
+  if (probeCount == 0)
+    Serial.println("Unable to find Device.");
 
-  tempSensor.setResolution(thermometerAddress, 9);      // set the temperature resolution (9-12)
+  tempSensor.setWaitForConversion(false);     // requestTemperatures() returns immediately
+  conversionMs = tempSensor.millisToWaitForConversion(RESOLUTION_BITS);
   Serial.println("Ready to send data!");
 }
 
 
 void loop() {
+  uint32_t now = millis();                    // unsigned subtraction below is rollover-safe
+
+  // Start one conversion on every probe at once
+  if (!converting && probeCount > 0 && now - lastRequestAt >= SAMPLE_INTERVAL_MS) {
+    tempSensor.requestTemperatures();
+    conversionStartedAt = now;
+    lastRequestAt = now;
+    converting = true;
+  }
 
-  tempSensor.requestTemperatures();                      // request temperature sample from sensor on the one wire bus
-  float temperatureC = tempSensor.getTempC(thermometerAddress);
-  
-  displayTemp(temperatureC);  // show temperature for debugging
+  // Collect when the conversion time for this resolution has elapsed
+  if (converting && now - conversionStartedAt >= conversionMs) {
+    converting = false;
+    for (uint8_t i = 0; i < probeCount; i++) {
+      float temperatureC = tempSensor.getTempC(probes[i]);
+      if (shouldSend(i, temperatureC, now)) {
+        sendTemp(i, temperatureC);
+        lastSent[i] = temperatureC;
+        lastSentAt[i] = now;
+        everSent[i] = true;
+      }
+    }
+  }
+}
 
-  delay(60000);  // Changed to 60 seconds (60000 ms) - adjust as needed
+bool shouldSend(uint8_t i, float temperatureC, uint32_t now) {
+  if (!everSent[i]) return true;
+  if (now - lastSentAt[i] >= HEARTBEAT_MS) return true;                  // heartbeat
+  // Fault codes (-127 disconnected, 85 power-on) are never within the deadband of a real reading
+  return fabs(temperatureC - lastSent[i]) >= DEADBAND_C;
 }
 
-void displayTemp(float temperatureReading) {             // temperature comes in as a float with 2 decimal places
+void sendTemp(uint8_t probe, float temperatureReading) {
 
   // Format for Python script to parse (CRITICAL - don't change this line!)
-  Serial.print("TEMP:");
+  Serial.print("TEMP");
+  if (probe > 0) Serial.print(probe);
+  Serial.print(":");
   Serial.println(temperatureReading, 2);  // 2 decimal places
-  
-  // Human-readable output for debugging
-  Serial.print("Temperature: ");
-  Serial.print(temperatureReading);
-  Serial.print("°C  (");
-  Serial.print(DallasTemperature::toFahrenheit(temperatureReading));
-  Serial.println("°F)");
 }
 
 
@@ -14,7 +14,14 @@ from datetime import datetime
 # Configuration
 BACKEND_URL = "http://localhost:8000/temperature"
 BAUD_RATE = 115200  # Must match Arduino sketch
-READ_INTERVAL = 1  # How often to check for data (seconds)
+SERIAL_TIMEOUT = 0.5  # Longest a read waits for a line (seconds); lines are handled as they arrive
+FREEZER_ID = 1  # Which freezer unit this probe belongs to (see GET /freezers)
+# Probe index on the 1-Wire bus (TEMP: = 0, TEMP1: = 1, ...) -> freezer unit; unmapped probes are only printed
+PROBE_FREEZERS = {0: FREEZER_ID}
+# The sketch only sends on a change beyond its deadband, plus a heartbeat every HEARTBEAT_MS (30 s)
+HEARTBEAT_SECONDS = 30
+STALE_AFTER_SECONDS = 2.5 * HEARTBEAT_SECONDS  # no line from a probe this long = link or probe lost
+FAULT_URL = f"{BACKEND_URL}/fault"  # reported once per outage: raises a sensor-fault alert, stores no reading
 
 def list_available_ports():
     """List all available serial ports"""
@@ -47,39 +54,28 @@ def select_port(ports):
 
 def parse_temperature_line(line):
     """
-    Parse temperature from Arduino serial output.
-    Expected format: "TEMP:23.45" or "Temperature: 23.45 C"
+    Parse one reading from Arduino serial output.
+    Expected format: "TEMP:23.45" (probe 0) or "TEMP1:23.45" (probe 1, ...)
+    Returns (probe, temperature) or None.
     """
     line = line.strip()
-    
-    # Format 1: TEMP:23.45
-    if line.startswith("TEMP:"):
-        try:
-            temp = float(line.split(":")[1])
-            return temp
-        except (ValueError, IndexError):
-            return None
-    
-    # Format 2: Temperature: 23.45 C or similar
-    if "temperature" in line.lower():
-        try:
-            # Extract number from string
-            parts = line.split(":")
-            if len(parts) >= 2:
-                temp_str = parts[1].split()[0]  # Get first word after colon
-                temp = float(temp_str)
-                return temp
-        except (ValueError, IndexError):
-            return None
-    
-    return None
+    if not line.startswith("TEMP"):
+        return None  # includes the old sketch's human-readable "Temperature: ..." echo
+    tag, sep, value = line.partition(":")
+    if not sep:
+        return None
+    try:
+        probe = int(tag[4:] or 0)
+        return probe, float(value)
+    except ValueError:
+        return None
 
-def send_to_backend(temperature):
+def send_to_backend(temperature, freezer_id=FREEZER_ID):
     """Send temperature reading to FastAPI backend"""
     try:
         response = requests.post(
             BACKEND_URL,
-            params={"temperature": temperature},
+            params={"temperature": temperature, "freezer_id": freezer_id},
             timeout=5
         )
         if response.status_code == 200:
@@ -95,6 +91,22 @@ def send_to_backend(temperature):
         print(f"✗ Error sending data: {e}")
         return False
 
+def report_fault(reason, freezer_id=FREEZER_ID):
+    """Raise a sensor-fault alert on the backend without sending a reading"""
+    try:
+        response = requests.post(FAULT_URL, params={"reason": reason, "freezer_id": freezer_id}, timeout=5)
+        if response.status_code == 200:
+            print(f"✓ Reported to backend: {reason}")
+            return True
+        print(f"✗ Backend error: {response.status_code}")
+        return False
+    except requests.exceptions.ConnectionError:
+        print("✗ Cannot connect to backend. Is FastAPI running?")
+        return False
+    except Exception as e:
+        print(f"✗ Error reporting fault: {e}")
+        return False
+
 def main():
     print("=" * 50)
     print("Arduino Serial Temperature Reader")
@@ -109,42 +121,53 @@ def main():
     
     try:
         # Open serial connection
-        ser = serial.Serial(port, BAUD_RATE, timeout=1)
+        ser = serial.Serial(port, BAUD_RATE, timeout=SERIAL_TIMEOUT)
         time.sleep(2)  # Wait for Arduino to reset after connection
         print("✓ Connected to Arduino!")
         print(f"✓ Backend URL: {BACKEND_URL}")
         print("\n--- Reading temperature data (Ctrl+C to stop) ---\n")
         
-        last_temp = None
         consecutive_failures = 0
+        last_seen = {probe: time.monotonic() for probe in PROBE_FREEZERS}
+        stale = set()
         
         while True:
             try:
-                # Read line from serial
-                if ser.in_waiting > 0:
-                    line = ser.readline().decode('utf-8', errors='ignore').strip()
+                # Blocks until a full line arrives or SERIAL_TIMEOUT passes
+                line = ser.readline().decode('utf-8', errors='ignore').strip()
+                
+                if line:
+                    # Print raw output for debugging
+                    timestamp = datetime.now().strftime("%H:%M:%S")
+                    print(f"[{timestamp}] Arduino: {line}")
                     
-                    if line:
-                        # Print raw output for debugging
-                        timestamp = datetime.now().strftime("%H:%M:%S")
-                        print(f"[{timestamp}] Arduino: {line}")
-                        
-                        # Try to parse temperature
-                        temp = parse_temperature_line(line)
-                        
-                        if temp is not None and temp != last_temp:
-                            last_temp = temp
-                            if send_to_backend(temp):
-                                consecutive_failures = 0
-                            else:
-                                consecutive_failures += 1
-                        
-                        # Warn if too many failures
-                        if consecutive_failures >= 5:
-                            print("\n⚠ WARNING: Multiple backend failures. Check if FastAPI is running.")
+                    # Try to parse temperature (already deadbanded by the sketch: send every one)
+                    reading = parse_temperature_line(line)
+                    
+                    if reading is not None and reading[0] in PROBE_FREEZERS:
+                        probe, temp = reading
+                        last_seen[probe] = time.monotonic()
+                        if probe in stale:
+                            stale.discard(probe)
+                            print(f"✓ Probe {probe} is reporting again")
+                        if send_to_backend(temp, PROBE_FREEZERS[probe]):
                             consecutive_failures = 0
+                        else:
+                            consecutive_failures += 1
+                    
+                    # Warn if too many failures
+                    if consecutive_failures >= 5:
+                        print("\n⚠ WARNING: Multiple backend failures. Check if FastAPI is running.")
+                        consecutive_failures = 0
                 
-                time.sleep(READ_INTERVAL)
+                # Liveness: a missed heartbeat means the probe or the serial link is gone
+                now = time.monotonic()
+                for probe, seen in last_seen.items():
+                    if probe not in stale and now - seen > STALE_AFTER_SECONDS:
+                        stale.add(probe)
+                        reason = f"No reading from probe {probe} for {now - seen:.0f}s (heartbeat missed)"
+                        print(f"\n⚠ WARNING: {reason}")
+                        report_fault(reason, PROBE_FREEZERS[probe])
                 
             except KeyboardInterrupt:
                 print("\n\nStopping reader...")
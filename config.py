@@ -1,5 +1,18 @@
 # config.py
+import os
 from datetime import timedelta
 EXPIRY_SOON_DAYS = 7          # yellow
 EXPIRY_URGENT_DAYS = 2        # orange/red
-CHECK_INTERVAL_SECONDS = 300  # Check every 5 minutes (was 3600 = 1 hour)
+
+COMPACTION_INTERVAL_SECONDS = 3600  # Retention/compaction pass for alerts + transactions
+SNAPSHOT_INTERVAL_SECONDS = 6 * 3600  # Online DB snapshot (services/snapshot.py)
+
+QUERY_PROFILE_SAMPLE_RATE = 0.05    # Share of requests whose SQL is profiled (services/profiler.py)
+QUERY_PROFILE_SERVER_TIMING = False  # Add a Server-Timing header to profiled responses
+# /leader, /writer and /debug/queries (routes_debug.py): off unless FREEZER_DEBUG_ENDPOINTS=1
+DEBUG_ENDPOINTS = os.getenv("FREEZER_DEBUG_ENDPOINTS", "0") == "1"
+
+# SQLite file on the Pi; a PostgreSQL URL for a central hub serving many units (services/dialect.py)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./freezer_inventory.db")
+DB_POOL_SIZE = 5                    # Postgres only: connections kept open per worker process
+DB_MAX_OVERFLOW = 10                # ...plus this many extra under load
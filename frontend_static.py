@@ -0,0 +1,147 @@
+# frontend_static.py
+"""
+Serve the production React build (frontend/dist) from FastAPI.
+
+The build directory is scanned once at startup into an in-memory table, so a
+request is a dict lookup (no per-request stat/exists). Each file gets a .gz
+(and .br when the optional `brotli` package is installed) sibling generated
+once, and the smallest variant the client accepts is sent. Vite's hashed
+bundles under assets/ are cached forever; everything else (index.html, which
+lives in memory, and public/ files such as icons and the web manifest)
+revalidates via ETag.
+"""
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Vite names bundles like assets/index-Bx3kP9aQ.js (exactly 8 hash characters)
+ASSETS_DIR = "assets/"
+HASHED_NAME = re.compile(r"-[A-Za-z0-9_]{8}\.[A-Za-z0-9]+$")
+COMPRESSIBLE = {".html", ".js", ".mjs", ".css", ".svg", ".json", ".txt", ".map", ".ico", ".webmanifest"}
+MIN_COMPRESS_BYTES = 512
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+@dataclass
+class StaticEntry:
+    path: Path
+    media_type: str
+    etag: str
+    cache_control: str
+    variants: dict = field(default_factory=dict)  # encoding -> Path
+
+def _etag(data: bytes) -> str:
+    return '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+
+def _ensure_variant(src: Path, data: bytes, encoding: str) -> Path | None:
+    suffix = {"gzip": ".gz", "br": ".br"}[encoding]
+    dst = src.with_name(src.name + suffix)
+    if dst.exists() and dst.stat().st_mtime >= src.stat().st_mtime:
+        return dst
+    if encoding == "gzip":
+        packed = gzip.compress(data, compresslevel=9, mtime=0)
+    else:
+        packed = brotli.compress(data, quality=11)
+    if len(packed) >= len(data):
+        return None
+    try:
+        dst.write_bytes(packed)
+    except OSError:
+        return None
+    return dst
+
+def is_hashed_asset(rel: str) -> bool:
+    return rel.startswith(ASSETS_DIR) and HASHED_NAME.search(rel) is not None
+
+def build_table(root: Path) -> dict[str, StaticEntry]:
+    table = {}
+    for path in root.rglob("*"):
+        if not path.is_file() or path.suffix in (".gz", ".br"):
+            continue
+        rel = path.relative_to(root).as_posix()
+        data = path.read_bytes()
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        entry = StaticEntry(
+            path=path,
+            media_type=media_type,
+            etag=_etag(data),
+            cache_control=IMMUTABLE if is_hashed_asset(rel) else REVALIDATE,
+        )
+        if path.suffix in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+            for encoding in (("br", "gzip") if brotli else ("gzip",)):
+                variant = _ensure_variant(path, data, encoding)
+                if variant:
+                    entry.variants[encoding] = variant
+        table[rel] = entry
+    return table
+
+def pick_encoding(accept_encoding: str, available) -> str | None:
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+    for encoding in ("br", "gzip"):  # preference order: smallest first
+        if encoding in available and encoding in accepted:
+            return encoding
+    return None
+
+class IndexDocument:
+    """index.html held in memory (plain + compressed) with a content ETag."""
+
+    def __init__(self, path: Path):
+        self.body = path.read_bytes()
+        self.etag = _etag(self.body)
+        self.encoded = {"gzip": gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli:
+            self.encoded["br"] = brotli.compress(self.body, quality=11)
+
+    def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"}
+        if request.headers.get("if-none-match") == self.etag:
+            return Response(status_code=304, headers=headers)
+        encoding = pick_encoding(request.headers.get("accept-encoding", ""), self.encoded)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(self.encoded[encoding], media_type="text/html", headers=headers)
+        return Response(self.body, media_type="text/html", headers=headers)
+
+def mount_frontend(app: FastAPI, build_dir: Path):
+    """
+    Register the SPA catch-all. Call this after every API router/route has been
+    added: routes match in registration order, so API paths never reach it.
+    """
+    table = build_table(build_dir)
+    index_entry = table.get("index.html")
+    index = IndexDocument(index_entry.path) if index_entry else None
+
+    @app.get("/{full_path:path}", include_in_schema=False)
+    async def serve_react_app(full_path: str, request: Request):
+        entry = table.get(full_path)
+        if entry is not None and full_path != "index.html":
+            headers = {"ETag": entry.etag, "Cache-Control": entry.cache_control}
+            if entry.variants:
+                headers["Vary"] = "Accept-Encoding"
+            if request.headers.get("if-none-match") == entry.etag:
+                return Response(status_code=304, headers=headers)
+            encoding = pick_encoding(request.headers.get("accept-encoding", ""), entry.variants)
+            if encoding:
+                headers["Content-Encoding"] = encoding
+                return FileResponse(entry.variants[encoding], media_type=entry.media_type, headers=headers)
+            return FileResponse(entry.path, media_type=entry.media_type, headers=headers)
+
+        # Missing files (anything with an extension) are real 404s, not the SPA shell
+        last = full_path.rsplit("/", 1)[-1]
+        if "." in last and full_path != "index.html":
+            return Response(status_code=404)
+
+        # Serve index.html for all other routes (React Router will handle them)
+        if index is None:
+            return {'error': 'Frontend not built. Run: cd frontend && npm run build'}
+        return index.response(request)
@@ -1,6 +1,6 @@
 from database import engine
-from models import Base
+from services import migrations
 
-# Initialize the database and create tables
-Base.metadata.create_all(bind=engine)
-print("✅ Database initialized")
\ No newline at end of file
+# Initialize the database: importing database already brings the schema up to date
+migrations.upgrade(engine, log=print)
+print("✅ Database initialized")
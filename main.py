@@ -1,26 +1,64 @@
 # main.py
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Query
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session, relationship
 from database import SessionLocal, engine
-from models import Item, Base, Transaction, Alert
+from models import Item, Base, Transaction, Alert, DEFAULT_FREEZER_ID
 from fastapi.middleware.cors import CORSMiddleware
 import uuid, os
 import barcode
 from barcode.writer import ImageWriter
 from fastapi.responses import FileResponse
 import pandas as pd
-import random
 import asyncio
-from datetime import date, datetime
-from config import EXPIRY_SOON_DAYS, EXPIRY_URGENT_DAYS, CHECK_INTERVAL_SECONDS
+import logging
+from datetime import date, datetime, timezone
+from typing import Optional
+from config import (EXPIRY_SOON_DAYS, EXPIRY_URGENT_DAYS, COMPACTION_INTERVAL_SECONDS, SNAPSHOT_INTERVAL_SECONDS,
+                    QUERY_PROFILE_SAMPLE_RATE, QUERY_PROFILE_SERVER_TIMING, DEBUG_ENDPOINTS)
 from services.expiry import expiry_status
+from services.expiry_scheduler import scheduler as expiry_scheduler
+from services import search as search_svc
+from services import scan as scan_svc
+from services import pick as pick_svc
+from services import archive as archive_svc
+from services import compaction as compaction_svc
+from services import settings as settings_svc
+from services import freezers as freezers_svc
+from services.simulator import FreezerSim
+from services import power as power_svc
+from services import anomaly as anomaly_svc
+from services import forecast as forecast_svc
+from services import replication as replication_svc
+from services import snapshot as snapshot_svc
+from services import coord
+from services import dialect
+from services import writer as writer_svc
+from services import profiler as profiler_svc
 from routes_mission import router as mission_router
 from routes_settings import router as settings_router
-
+from routes_archive import router as archive_router
+from routes_freezers import router as freezers_router
+from routes_sync import router as sync_router
+from routes_labels import router as labels_router
+from routes_debug import router as debug_router
+from routes_export import router as export_router
+from schemas import (FastJSONResponse, ItemOut, TransactionOut, AlertOut, PowerBlockIn,
+                     ITEM_COLUMNS, TRANSACTION_COLUMNS, ALERT_COLUMNS, rows_as_dicts)
+
+# uvicorn's own error logger: same stream and format as its startup lines
+log = logging.getLogger("uvicorn.error")
 
 app = FastAPI()
 app.include_router(mission_router)
 app.include_router(settings_router)
+app.include_router(archive_router)
+app.include_router(freezers_router)
+app.include_router(sync_router)
+app.include_router(labels_router)
+if DEBUG_ENDPOINTS:
+    app.include_router(debug_router)
+app.include_router(export_router)
 
 #Allow requests from the frontend
 app.add_middleware(
@@ -31,6 +69,24 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# SQL profiling: a sampled share of requests (or any request sent with X-Profile-SQL: 1)
+profiler_svc.install(engine)
+profiler_svc.configure(QUERY_PROFILE_SAMPLE_RATE)
+
+@app.middleware("http")
+async def profile_sql(request, call_next):
+    forced = request.headers.get("x-profile-sql") == "1"
+    if not (forced or profiler_svc.sampled()):
+        return await call_next(request)
+    with profiler_svc.scope(f"{request.method} {request.url.path}") as profile:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            profile.name = f"{request.method} {route.path}"   # group /items/{code}/... together
+    if forced or QUERY_PROFILE_SERVER_TIMING:
+        response.headers["Server-Timing"] = profile.server_timing()
+    return response
+
 # Dependency: get DB session
 def get_db():
     db = SessionLocal()
@@ -39,71 +95,73 @@ def get_db():
     finally:
         db.close()
 
+def freezer_exists(freezer_id: int) -> bool:
+    # Sensor endpoints take freezer_id as a plain parameter: never create files/rows for unknown units
+    db = SessionLocal()
+    try:
+        return freezers_svc.exists(db, freezer_id)
+    finally:
+        db.close()
+
+# Group commit: write endpoints share one transaction (one fsync) per few-ms batch
+db_writer = writer_svc.for_engine(engine)
+
 # Expiry check background task
 async def expiry_sweeper():
+    # Sleeps until the next item changes status (min-heap of transition times), not on a timer
+    await expiry_scheduler.run(SessionLocal)
+
+# Retention background task: archive old alerts, roll up old transactions, vacuum in slices
+async def compaction_job():
     while True:
         try:
-            db: Session = SessionLocal()
-            today = date.today()
-            items = db.query(Item).all()
-            for it in items:
-                status, days = expiry_status(it.expiration_date, today)
-
-                # Avoid duplicating identical active alerts: only create when needed
-                def already_open(msg: str):
-                    return db.query(Alert).filter(
-                        Alert.message == msg,
-                        Alert.resolved_at.is_(None)
-                    ).first() is not None
-
-                if status == "expired":
-                    msg = f"'{it.name}' is EXPIRED (expired {abs(days)} day(s) ago)."
-                    if not already_open(msg):
-                        db.add(Alert(
-                            type="inventory", severity="critical",
-                            message=msg, item_id=it.id
-                        ))
-
-                elif status == "urgent":
-                    msg = f"'{it.name}' expires in {days} day(s)."
-                    if not already_open(msg):
-                        db.add(Alert(
-                            type="inventory", severity="warning",
-                            message=msg, item_id=it.id
-                        ))
-
-                elif status == "soon":
-                    msg = f"'{it.name}' expires in {days} day(s)."
-                    if not already_open(msg):
-                        db.add(Alert(
-                            type="inventory", severity="info",
-                            message=msg, item_id=it.id
-                        ))
-
-                # Optional: auto-resolve old alerts if item updated/removed
-                if status in ("ok","no_date"):
-                    # resolve any open alerts for this item
-                    open_alerts = db.query(Alert).filter(
-                        Alert.item_id == it.id,
-                        Alert.resolved_at.is_(None),
-                        Alert.type == "inventory"
-                    ).all()
-                    now = datetime.utcnow()
-                    for a in open_alerts:
-                        a.resolved_at = now
-
-            db.commit()
-        except Exception as e:
-            # You could log this
+            with profiler_svc.scope("task:compaction"):
+                db: Session = SessionLocal()
+                try:
+                    retention_days = settings_svc.get_all(db)["retention_days"]
+                finally:
+                    db.close()
+                # Runs off the event loop in short batches so requests keep flowing
+                await asyncio.to_thread(compaction_svc.run, engine, retention_days)
+                await asyncio.to_thread(replication_svc.prune, engine, retention_days)
+        except Exception:
             pass
-        finally:
-            db.close()
-        await asyncio.sleep(CHECK_INTERVAL_SECONDS)
+        await asyncio.sleep(COMPACTION_INTERVAL_SECONDS)
 
-@app.on_event("startup")
-async def startup_event():
+async def snapshot_job(db_file):
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            # Stepwise online backup in a thread; writers keep going while it runs
+            await asyncio.to_thread(snapshot_svc.take, str(db_file))
+        except Exception:
+            pass
+
+def start_background_jobs():
+    # Only in the leader worker (services/coord.py): one sweeper, one CSV writer, one compactor
+    log.info("Worker %d is the leader; starting background jobs", os.getpid())
+    # Segments sealed before replication existed (or by simulate_sensors.py) get their references too
+    for metric in archive_svc.list_metrics():
+        replication_svc.log_segments(engine, metric, archive_svc.load_index(metric), archive_svc.ARCHIVE_DIR)
     asyncio.create_task(expiry_sweeper())
     asyncio.create_task(sensor_writer())
+    asyncio.create_task(compaction_job())
+    # File snapshots are SQLite-only; a Postgres hub is backed up with pg_dump
+    db_file = dialect.sqlite_file(engine)
+    if db_file:
+        asyncio.create_task(snapshot_job(db_file))
+
+@app.on_event("startup")
+async def startup_event():
+    scan_svc.index.warm(engine)
+    pick_svc.index.warm(engine)
+    # Every worker campaigns; the others take over within coord.POLL_SECONDS if the leader dies
+    asyncio.create_task(coord.campaign(start_background_jobs))
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Energy measured since this worker's last flush goes into the shared total
+    power_svc.flush_all(engine)
 
 # Create barcode directory if not exists
 BARCODE_DIR = "barcodes"
@@ -116,11 +174,30 @@ def create_item(name: str, quantity: int = 1, location: str = None,
                 serving_size: str = None, calories: float = None, protein: float = None,
                 carbs: float = None, fat: float = None, fiber: float = None,
                 sodium: float = None, sugar: float = None,
+                freezer_id: int = DEFAULT_FREEZER_ID,
                 db: Session = Depends(get_db)):
 
-    # Create item with unique code
+    if not freezers_svc.exists(db, freezer_id):
+        return {"error": "Freezer not found"}
+
+    # Check if we need to create an alert for this new item
+    alert_msg = None
+    alert_severity = None
+    if expiration_date:
+        status, days = expiry_status(expiration_date, date.today())
+        if status == "expired":
+            alert_msg = f"'{name}' is EXPIRED (expired {abs(days)} day(s) ago)."
+            alert_severity = "critical"
+        elif status == "urgent":
+            alert_msg = f"'{name}' expires in {days} day(s)."
+            alert_severity = "warning"
+        elif status == "soon":
+            alert_msg = f"'{name}' expires in {days} day(s)."
+            alert_severity = "info"
+
+    # Create item with unique code (item + its alert in one group-commit job)
     unique_code = str(uuid.uuid4())[:8]
-    item = Item(
+    fields = dict(
         name=name,
         quantity=quantity,
         location=location,
@@ -136,59 +213,47 @@ def create_item(name: str, quantity: int = 1, location: str = None,
         fat=fat,
         fiber=fiber,
         sodium=sodium,
-        sugar=sugar
+        sugar=sugar,
+        freezer_id=freezer_id
     )
-    db.add(item)
-    db.commit()
-    db.refresh(item)
-
-    # Generate barcode image
-    file_path = os.path.join(BARCODE_DIR, f"{unique_code}")
-    code128 = barcode.get('code128', unique_code, writer=ImageWriter())
-    code128.save(file_path)
 
-    # Check if we need to create an alert for this new item
-    if expiration_date:
-        from services.expiry import expiry_status
-        today = date.today()
-        status, days = expiry_status(expiration_date, today)
-        
-        alert_msg = None
-        alert_severity = None
-        
-        if status == "expired":
-            alert_msg = f"'{name}' is EXPIRED (expired {abs(days)} day(s) ago)."
-            alert_severity = "critical"
-        elif status == "urgent":
-            alert_msg = f"'{name}' expires in {days} day(s)."
-            alert_severity = "warning"
-        elif status == "soon":
-            alert_msg = f"'{name}' expires in {days} day(s)."
-            alert_severity = "info"
-        
-        # Create alert if needed
+    def insert_item(conn):
+        item_id = conn.execute(insert(Item).values(**fields)).inserted_primary_key[0]
         if alert_msg:
             # Check if this exact alert already exists
-            existing = db.query(Alert).filter(
+            existing = conn.execute(select(Alert.id).where(
                 Alert.message == alert_msg,
+                Alert.freezer_id == freezer_id,
                 Alert.resolved_at.is_(None)
-            ).first()
-            
+            )).first()
             if not existing:
-                db.add(Alert(
+                conn.execute(insert(Alert).values(
                     type="inventory",
                     severity=alert_severity,
                     message=alert_msg,
-                    item_id=item.id
+                    item_id=item_id,
+                    freezer_id=freezer_id
                 ))
-                db.commit()
+        return item_id
+
+    item_id = db_writer.call(insert_item)
+    scan_svc.index.put(unique_code, item_id)
+    pick_svc.index.upsert(item_id, name, quantity, expiration_date, unique_code, location, freezer_id)
+    expiry_scheduler.item_changed(item_id)
+    coord.bump(scan_svc.ITEMS_CREATED_SIGNAL)
+
+    # Generate barcode image
+    file_path = os.path.join(BARCODE_DIR, f"{unique_code}")
+    code128 = barcode.get('code128', unique_code, writer=ImageWriter())
+    code128.save(file_path)
 
     # Return item info + barcode image URL path
     return {
-        "id": item.id,
-        "name": item.name,
-        "code": item.code,
-        "barcode_image": f"/barcode/{item.code}.png"
+        "id": item_id,
+        "name": name,
+        "code": unique_code,
+        "freezer_id": freezer_id,
+        "barcode_image": f"/barcode/{unique_code}.png"
     }
 
 # New route to serve barcode images
@@ -200,9 +265,39 @@ def get_barcode(code: str):
     return {"error": "Barcode not found"}
 
 # Retrieve all items
-@app.get("/items/")
-def read_items(db: Session = Depends(get_db)):
-    return db.query(Item).all()
+@app.get("/items/", response_class=FastJSONResponse, responses={200: {"model": list[ItemOut]}})
+def read_items(freezer_id: Optional[int] = None, db: Session = Depends(get_db)):
+    query = db.query(*ITEM_COLUMNS)
+    if freezer_id is not None:
+        query = query.filter(Item.freezer_id == freezer_id)
+    return FastJSONResponse(rows_as_dicts(query.order_by(Item.id)))
+
+# Typeahead search over name/location/serving size (FTS5, prefix match on last word)
+@app.get("/items/search")
+def search_items(q: str = Query("", max_length=100),
+                 limit: int = Query(20, ge=1, le=100),
+                 offset: int = Query(0, ge=0),
+                 freezer_id: Optional[int] = None,
+                 db: Session = Depends(get_db)):
+    return search_svc.search_items(db, q, limit=limit, offset=offset, freezer_id=freezer_id)
+
+# FEFO pick list: which units to eat next (or, with plan=true, a per-day meal plan)
+@app.get("/items/pick")
+def pick_items(name: Optional[str] = Query(None, max_length=100),
+               count: int = Query(1, ge=1, le=1000),
+               plan: bool = False,
+               days: int = Query(pick_svc.DEFAULT_HORIZON_DAYS, ge=1, le=pick_svc.MAX_HORIZON_DAYS),
+               per_day: Optional[int] = Query(None, ge=1),
+               freezer_id: Optional[int] = None,
+               include_expired: bool = False):
+    pick_svc.index.sync(engine)
+    if plan:
+        # Whole-inventory plans run to thousands of entries: skip jsonable_encoder
+        return FastJSONResponse(pick_svc.index.plan(date.today(), days=days, name=name,
+                                                    per_day=per_day, freezer_id=freezer_id))
+    if not name:
+        return {"error": "name is required (or use plan=true)"}
+    return pick_svc.index.pick(name, count, date.today(), freezer_id=freezer_id, include_expired=include_expired)
 
 # Delete item
 @app.delete("/items/{item_id}")
@@ -216,105 +311,157 @@ def delete_item(item_id: int, db: Session = Depends(get_db)):
     if os.path.exists(barcode_path):
         os.remove(barcode_path)
     
-    # Delete the item (transactions will cascade delete if configured)
-    db.delete(item)
-    db.commit()
-    return {"message": "Item deleted successfully", "item_name": item.name}
+    # Delete the item; its transactions stay as history with item_id cleared
+    def remove_item(conn):
+        conn.execute(update(Transaction).where(Transaction.item_id == item_id).values(item_id=None))
+        return conn.execute(delete(Item).where(Item.id == item_id)).rowcount
 
-# Check out item
-@app.post("/items/{code}/check_out")
-def check_out_item(code: str, db: Session = Depends(get_db)):
-    item = db.query(Item).filter(Item.code == code).first()
-    if not item:
+    if not db_writer.call(remove_item):
         return {"error": "Item not found"}
+    scan_svc.index.drop(item.code)
+    pick_svc.index.drop(item_id)
+    coord.bump(scan_svc.ITEMS_SIGNAL)
+    expiry_scheduler.item_changed(item_id)
+    return {"message": "Item deleted successfully", "item_name": item.name}
 
-    if item.quantity > 0:
-        item.quantity -= 1
-    else:
-        return {"error": "No quantity available"}
-
-    tx = Transaction(item_id=item.id, action="check_out")
-    db.add(tx)
-    db.commit()
-    db.refresh(item)
-    return {"message": "Checked out", "item": item, "transaction": tx}
+# Check out item (scan fast path: cached code lookup + atomic decrement)
+@app.post("/items/{code}/check_out")
+def check_out_item(code: str):
+    return scan_svc.scan(engine, code, "check_out")
 
 # Check in item
 @app.post("/items/{code}/check_in")
-def check_in_item(code: str, db: Session = Depends(get_db)):
-    item = db.query(Item).filter(Item.code == code).first()
-    if not item:
-        return {"error": "Item not found"}
-
-    item.quantity += 1
-
-    tx = Transaction(item_id=item.id, action="check_in")
-    db.add(tx)
-    db.commit()
-    db.refresh(item)
-    return {"message": "Checked in", "item": item, "transaction": tx}
+def check_in_item(code: str):
+    return scan_svc.scan(engine, code, "check_in")
 
 # Transaction history
-@app.get("/transactions/")
+@app.get("/transactions/", response_class=FastJSONResponse, responses={200: {"model": list[TransactionOut]}})
 def read_transactions(db: Session = Depends(get_db)):
-    return db.query(Transaction).all()
+    return FastJSONResponse(rows_as_dicts(db.query(*TRANSACTION_COLUMNS).order_by(Transaction.id)))
 
-# Temperature and power CSVs + max rows
-TEMPERATURE_FILE = "temperature_data.csv"
-POWER_FILE = "power_data.csv"
+# Temperature and power CSVs + max rows (one pair per freezer unit, see services/freezers.py)
+TEMPERATURE_FILE = freezers_svc.data_file("temperature")
+POWER_FILE = freezers_svc.data_file("power")
 MAX_ROWS = 100
 SENSOR_INTERVAL_SECONDS = 60  # Write sensor data every 60 seconds
 
-if not os.path.exists(TEMPERATURE_FILE):
-    pd.DataFrame(columns=["timestamp", "temperature"]).to_csv(TEMPERATURE_FILE, index=False)
-if not os.path.exists(POWER_FILE):
-    pd.DataFrame(columns=["timestamp", "power"]).to_csv(POWER_FILE, index=False)
+def ensure_csv(path: str, column: str):
+    if not os.path.exists(path):
+        pd.DataFrame(columns=["timestamp", column]).to_csv(path, index=False)
+
+ensure_csv(TEMPERATURE_FILE, "temperature")
+ensure_csv(POWER_FILE, "power")
+
+# Every worker appends to and trims the live CSVs: a trim must not drop a row appended mid-rewrite
+def csv_lock(path: str):
+    return coord.exclusive(f"csv-{os.path.basename(path)}")
+
+def append_csv(path: str, column: str, timestamps: list, values: list):
+    with csv_lock(path):
+        ensure_csv(path, column)
+        pd.DataFrame({"timestamp": timestamps, column: values}).to_csv(path, mode='a', header=False, index=False)
+
+# Keep the live CSV at MAX_ROWS; trimmed rows are staged for the long-term archive
+def trim_csv(path: str, metric: str):
+    with csv_lock(path):
+        data = pd.read_csv(path)
+        if len(data) > MAX_ROWS:
+            archive_svc.stage(metric, data.head(len(data) - MAX_ROWS).itertuples(index=False, name=None))
+            tmp = f"{path}.tmp"
+            data.tail(MAX_ROWS).to_csv(tmp, index=False)
+            os.replace(tmp, path)   # readers never see a half-written file
+
+# One simulated unit per freezer: compressor-correlated power instead of random noise
+_sims: dict[int, FreezerSim] = {}
 
 # Background task: periodically write sensor readings to CSV
 # NOTE: Comment out the temperature writing section if you're using real Arduino data
 async def sensor_writer():
     while True:
-        try:
-            now = datetime.utcnow().isoformat()
-            
-            # OPTIONAL: Comment out these lines when using real Arduino temperature data
-            # Write temperature reading (simulated)
-            # temp = round(random.uniform(18, 25), 2)
-            # pd.DataFrame({"timestamp": [now], "temperature": [temp]}).to_csv(
-            #     TEMPERATURE_FILE, mode='a', header=False, index=False
-            # )
-            
-            # Write power reading
-            watts = round(random.uniform(10, 50), 2)
-            pd.DataFrame({"timestamp": [now], "power": [watts]}).to_csv(
-                POWER_FILE, mode='a', header=False, index=False
-            )
-
-            # Trim temperature file to MAX_ROWS
+        with profiler_svc.scope("task:sensor_writer"):
             try:
-                tdata = pd.read_csv(TEMPERATURE_FILE)
-                if len(tdata) > MAX_ROWS:
-                    tdata.tail(MAX_ROWS).to_csv(TEMPERATURE_FILE, index=False)
-            except Exception:
-                pass
+                db: Session = SessionLocal()
+                try:
+                    freezer_ids = freezers_svc.list_ids(db)
+                finally:
+                    db.close()
+
+                for fid in freezer_ids:
+                    now = datetime.utcnow().isoformat()
+                    temperature_file = freezers_svc.data_file("temperature", fid)
+                    power_file = freezers_svc.data_file("power", fid)
+                    ensure_csv(temperature_file, "temperature")
+                    ensure_csv(power_file, "power")
+
+                    sim = _sims.setdefault(fid, FreezerSim(seed=fid))
+                    sample = sim.step(SENSOR_INTERVAL_SECONDS)
+
+                    # OPTIONAL: Comment out these lines when using real Arduino temperature data
+                    # Write temperature reading (simulated)
+                    # temp = sample.temperature
+                    # append_csv(temperature_file, "temperature", [now], [temp])
+
+                    # Write power reading (simulated unless a current sensor is streaming to /power/samples)
+                    if not power_svc.is_live(fid):
+                        watts = sample.power
+                        append_csv(power_file, "power", [now], [watts])
+
+                    # Trim temperature file to MAX_ROWS
+                    try:
+                        trim_csv(temperature_file, freezers_svc.archive_metric("temperature", fid))
+                    except Exception:
+                        pass
+
+                    # Trim power file to MAX_ROWS
+                    try:
+                        trim_csv(power_file, freezers_svc.archive_metric("power", fid))
+                    except Exception:
+                        pass
+
+                    # Seal finished days into archive segments (no-op until the UTC day rolls over)
+                    try:
+                        for metric in ("temperature", "power"):
+                            name = freezers_svc.archive_metric(metric, fid)
+                            if archive_svc.seal(name):
+                                replication_svc.log_segments(engine, name, archive_svc.load_index(name),
+                                                             archive_svc.ARCHIVE_DIR)
+                    except Exception:
+                        pass
 
-            # Trim power file to MAX_ROWS
-            try:
-                pdata = pd.read_csv(POWER_FILE)
-                if len(pdata) > MAX_ROWS:
-                    pdata.tail(MAX_ROWS).to_csv(POWER_FILE, index=False)
             except Exception:
                 pass
 
-        except Exception:
-            pass
-
         await asyncio.sleep(SENSOR_INTERVAL_SECONDS)
 
+# One open sensor-fault alert per unit (dismissed by the operator, like the banner says)
+def raise_sensor_fault(freezer_id: int, reason: str):
+    def insert_fault_alert(conn):
+        # Check if there's already an unacknowledged sensor fault alert
+        existing_alert = conn.execute(select(Alert.id).where(
+            Alert.freezer_id == freezer_id,
+            Alert.type == "temperature",
+            Alert.severity == "warning",
+            Alert.message.like("%Sensor fault%"),
+            Alert.is_acknowledged == False
+        )).first()
+        if not existing_alert:
+            conn.execute(insert(Alert).values(
+                type="temperature",
+                severity="warning",
+                message=f"Sensor fault detected: {reason}",
+                is_acknowledged=False,
+                freezer_id=freezer_id
+            ))
+
+    db_writer.call(insert_fault_alert)
+
 # POST endpoint to receive temperature data from Arduino
 @app.post("/temperature")
-def post_temperature(temperature: float):
+def post_temperature(temperature: float, freezer_id: int = DEFAULT_FREEZER_ID):
+    if not freezer_exists(freezer_id):
+        return {"error": "Freezer not found"}
     try:
+        temperature_file = freezers_svc.data_file("temperature", freezer_id)
         now = datetime.utcnow().isoformat()
         
         # Fault detection for DS18B20 sensor
@@ -334,31 +481,8 @@ def post_temperature(temperature: float):
             fault_reason = f"Unrealistic temperature reading ({temperature}°C)"
         
         if is_fault:
-            # Create an alert for the sensor fault
-            from database import SessionLocal
-            from models import Alert
-            db = SessionLocal()
-            try:
-                # Check if there's already an unacknowledged sensor fault alert
-                existing_alert = db.query(Alert).filter(
-                    Alert.type == "temperature",
-                    Alert.severity == "warning",
-                    Alert.message.like("%Sensor fault%"),
-                    Alert.is_acknowledged == False
-                ).first()
-                
-                if not existing_alert:
-                    alert = Alert(
-                        type="temperature",
-                        severity="warning",
-                        message=f"Sensor fault detected: {fault_reason}",
-                        is_acknowledged=False
-                    )
-                    db.add(alert)
-                    db.commit()
-            finally:
-                db.close()
-            
+            # Alert only: fault values never reach the CSV, archive or detectors
+            raise_sensor_fault(freezer_id, fault_reason)
             return {
                 "status": "fault", 
                 "temperature": temperature, 
@@ -367,36 +491,86 @@ def post_temperature(temperature: float):
             }
         
         # Save valid temperature reading
-        pd.DataFrame({"timestamp": [now], "temperature": [temperature]}).to_csv(
-            TEMPERATURE_FILE, mode='a', header=False, index=False
-        )
+        append_csv(temperature_file, "temperature", [now], [temperature])
         
         # Trim to MAX_ROWS
         try:
-            tdata = pd.read_csv(TEMPERATURE_FILE)
-            if len(tdata) > MAX_ROWS:
-                tdata.tail(MAX_ROWS).to_csv(TEMPERATURE_FILE, index=False)
+            trim_csv(temperature_file, freezers_svc.archive_metric("temperature", freezer_id))
         except Exception:
             pass
+
+        # Early warning: streaming EWMA / rate-of-rise / CUSUM detector (O(1) per reading)
+        ts = datetime.fromisoformat(now).replace(tzinfo=timezone.utc).timestamp()
+        forecast_svc.observe(freezer_id, ts, temperature)
+        db_writer.call(lambda conn: anomaly_svc.observe(conn, freezer_id, ts, temperature))
             
         return {"status": "success", "temperature": temperature, "timestamp": now}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+# A fault the reader detects itself (e.g. missed heartbeats): an alert, no reading
+@app.post("/temperature/fault")
+def post_temperature_fault(reason: str = Query(..., min_length=1, max_length=200),
+                           freezer_id: int = DEFAULT_FREEZER_ID):
+    if not freezer_exists(freezer_id):
+        return {"error": "Freezer not found"}
+    raise_sensor_fault(freezer_id, reason)
+    return {"status": "fault", "timestamp": datetime.utcnow().isoformat(), "message": reason}
+
 # Simulate temperature readings and return data for graph
 @app.get("/temperature")
-def get_temperature():
+def get_temperature(freezer_id: int = DEFAULT_FREEZER_ID):
+    if not freezer_exists(freezer_id):
+        return {"error": "Freezer not found"}
     try:
-        all_data = pd.read_csv(TEMPERATURE_FILE)
+        all_data = pd.read_csv(freezers_svc.data_file("temperature", freezer_id))
         if len(all_data) > MAX_ROWS:
             all_data = all_data.tail(MAX_ROWS)
         return all_data.to_dict(orient="records")
     except Exception:
         return []
 
+# Current state of the unit's online anomaly detector
+@app.get("/temperature/anomaly")
+def get_temperature_anomaly(freezer_id: int = DEFAULT_FREEZER_ID):
+    return anomaly_svc.state(engine, freezer_id) or {"samples": 0}
+
+# Predicted temperature curve and minutes until each alarm threshold is crossed
+@app.get("/temperature/forecast")
+def get_temperature_forecast(freezer_id: int = DEFAULT_FREEZER_ID,
+                             horizon_min: int = Query(240, ge=5, le=24 * 60),
+                             step_min: int = Query(5, ge=1, le=60)):
+    db = SessionLocal()
+    try:
+        if not freezers_svc.exists(db, freezer_id):
+            return {"error": "Freezer not found"}
+        settings = settings_svc.get_all(db, freezer_id)
+    finally:
+        db.close()
+    thresholds = {
+        "temp_nominal_max": (settings["temp_nominal_max"], True),
+        "temp_critical_high": (settings["temp_critical_high"], True),
+        "temp_critical_low": (settings["temp_critical_low"], False),
+    }
+
+    source = freezers_svc.data_file("temperature", freezer_id)
+
+    def history():
+        # Read after a restart, or when another worker appended readings this one hasn't seen
+        try:
+            tdata = pd.read_csv(source)
+        except Exception:
+            return []
+        ts = pd.to_datetime(tdata["timestamp"]).astype("int64") / 1e9
+        return list(zip(ts.tolist(), tdata["temperature"].astype(float).tolist()))
+
+    result = forecast_svc.run(freezer_id, thresholds, history=history, source=source,
+                              horizon_s=horizon_min * 60, step_s=step_min * 60)
+    return {"freezer_id": freezer_id, **result}
+
 # Get temperature sensor status
 @app.get("/temperature/status")
-def get_temperature_status():
+def get_temperature_status(freezer_id: int = DEFAULT_FREEZER_ID):
     """Check if the temperature sensor is working properly"""
     from database import SessionLocal
     from models import Alert
@@ -404,6 +578,7 @@ def get_temperature_status():
     try:
         # Check for recent sensor fault alerts
         recent_fault = db.query(Alert).filter(
+            Alert.freezer_id == freezer_id,
             Alert.type == "temperature",
             Alert.severity == "warning",
             Alert.message.like("%Sensor fault%"),
@@ -412,7 +587,7 @@ def get_temperature_status():
         
         # Check if we have recent temperature data
         try:
-            tdata = pd.read_csv(TEMPERATURE_FILE)
+            tdata = pd.read_csv(freezers_svc.data_file("temperature", freezer_id))
             if len(tdata) > 0:
                 last_reading_time = pd.to_datetime(tdata.iloc[-1]['timestamp'])
                 time_since_reading = (datetime.utcnow() - last_reading_time.replace(tzinfo=None)).total_seconds()
@@ -443,27 +618,19 @@ def get_temperature_status():
         db.close()
 
 # Get all alerts
-@app.get("/alerts")
-def get_alerts(include_acknowledged: bool = False):
+@app.get("/alerts", response_class=FastJSONResponse, responses={200: {"model": list[AlertOut]}})
+def get_alerts(include_acknowledged: bool = False, freezer_id: Optional[int] = None):
     """Get all alerts, optionally including acknowledged ones"""
     from database import SessionLocal
     from models import Alert
     db = SessionLocal()
     try:
-        query = db.query(Alert)
+        query = db.query(*ALERT_COLUMNS)
+        if freezer_id is not None:
+            query = query.filter(Alert.freezer_id == freezer_id)
         if not include_acknowledged:
             query = query.filter(Alert.is_acknowledged == False)
-        alerts = query.order_by(Alert.created_at.desc()).all()
-        return [{
-            "id": a.id,
-            "type": a.type,
-            "severity": a.severity,
-            "message": a.message,
-            "item_id": a.item_id,
-            "is_acknowledged": a.is_acknowledged,
-            "created_at": a.created_at.isoformat(),
-            "resolved_at": a.resolved_at.isoformat() if a.resolved_at else None
-        } for a in alerts]
+        return FastJSONResponse(rows_as_dicts(query.order_by(Alert.created_at.desc())))
     finally:
         db.close()
 
@@ -471,58 +638,93 @@ def get_alerts(include_acknowledged: bool = False):
 @app.post("/alerts/{alert_id}/acknowledge")
 def acknowledge_alert(alert_id: int):
     """Mark an alert as acknowledged"""
-    from database import SessionLocal
-    from models import Alert
-    db = SessionLocal()
-    try:
-        alert = db.query(Alert).filter(Alert.id == alert_id).first()
-        if not alert:
-            return {"status": "error", "message": "Alert not found"}
-        
-        alert.is_acknowledged = True
-        db.commit()
-        return {"status": "success", "message": "Alert acknowledged"}
-    finally:
-        db.close()
+    updated = db_writer.call(lambda conn: conn.execute(
+        update(Alert).where(Alert.id == alert_id).values(is_acknowledged=True)
+    ).rowcount)
+    if not updated:
+        return {"status": "error", "message": "Alert not found"}
+    return {"status": "success", "message": "Alert acknowledged"}
 
 # Power consumption simulation endpoint
 @app.get("/power")
-def get_power():
+def get_power(freezer_id: int = DEFAULT_FREEZER_ID):
+    if not freezer_exists(freezer_id):
+        return {"error": "Freezer not found"}
     try:
-        all_data = pd.read_csv(POWER_FILE)
+        all_data = pd.read_csv(freezers_svc.data_file("power", freezer_id))
         if len(all_data) > MAX_ROWS:
             all_data = all_data.tail(MAX_ROWS)
         return all_data.to_dict(orient="records")
     except Exception:
         return []
+
+# High-rate power ingest: aggregate on arrival, store only one row per window
+@app.post("/power/samples")
+def post_power_samples(block: PowerBlockIn):
+    if not freezer_exists(block.freezer_id):
+        return {"error": "Freezer not found"}
+    if block.unit == "A":
+        if block.voltage is None:
+            return {"status": "error", "message": "voltage is required when unit is 'A'"}
+        watts = [a * block.voltage for a in block.samples]
+    else:
+        watts = block.samples
+
+    start = None
+    if block.start is not None:
+        start = block.start.replace(tzinfo=block.start.tzinfo or timezone.utc).timestamp()
+    result = power_svc.ingest(engine, block.freezer_id, watts, block.rate_hz, start, block.keep_raw)
+    if "error" in result:
+        return {"status": "error", "message": result["error"]}
+
+    if result["closed"]:
+        power_file = freezers_svc.data_file("power", block.freezer_id)
+        append_csv(power_file, "power",
+                   [w["timestamp"] for w in result["closed"]],
+                   [w["mean_w"] for w in result["closed"]])
+        try:
+            trim_csv(power_file, freezers_svc.archive_metric("power", block.freezer_id))
+        except Exception:
+            pass
+
+    if result["trigger"]:
+        def insert_spike_alert(conn):
+            existing = conn.execute(select(Alert.id).where(
+                Alert.freezer_id == block.freezer_id,
+                Alert.type == "power",
+                Alert.resolved_at.is_(None),
+                Alert.is_acknowledged == False
+            )).first()
+            if not existing:
+                conn.execute(insert(Alert).values(
+                    type="power", severity="warning",
+                    message=f"Power spike detected: peak {max(watts):.0f} W",
+                    is_acknowledged=False,
+                    freezer_id=block.freezer_id
+                ))
+
+        db_writer.call(insert_spike_alert)
+
+    return {"status": "success", "windows_closed": len(result["closed"]), **power_svc.live(engine, block.freezer_id)}
+
+# Live power/energy figures (kept incrementally; no history scan)
+@app.get("/power/live")
+def get_power_live(freezer_id: int = DEFAULT_FREEZER_ID):
+    if not freezer_exists(freezer_id):
+        return {"error": "Freezer not found"}
+    return power_svc.live(engine, freezer_id)
+
 # ===== PRODUCTION FRONTEND SERVING =====
 # Serve the built React frontend from FastAPI (for Raspberry Pi deployment)
-from fastapi.staticfiles import StaticFiles
+# Must stay at the bottom of this file: the SPA catch-all is registered after every API route.
 from pathlib import Path
+from frontend_static import mount_frontend
 
 FRONTEND_BUILD_DIR = Path(__file__).parent / 'frontend' / 'dist'
 
 if FRONTEND_BUILD_DIR.exists():
-    # Mount static assets (JS, CSS, images)
-    assets_dir = FRONTEND_BUILD_DIR / 'assets'
-    if assets_dir.exists():
-        app.mount('/assets', StaticFiles(directory=str(assets_dir)), name='assets')
-    
-    # Catch-all route: serve index.html for all frontend routes (SPA)
-    @app.get('/{full_path:path}')
-    async def serve_react_app(full_path: str):
-        # Don't intercept API routes
-        api_prefixes = ['items', 'temperature', 'power', 'settings', 'mission', 'barcode', 'transactions', 'docs', 'openapi.json']
-        if any(full_path.startswith(prefix) for prefix in api_prefixes):
-            return {'error': 'API endpoint not found'}
-        
-        # Serve index.html for all other routes (React Router will handle them)
-        index_file = FRONTEND_BUILD_DIR / 'index.html'
-        if index_file.exists():
-            return FileResponse(str(index_file))
-        return {'error': 'Frontend not built. Run: cd frontend && npm run build'}
+    mount_frontend(app, FRONTEND_BUILD_DIR)
 else:
     print('  Frontend build not found at:', FRONTEND_BUILD_DIR)
     print('    Run: cd frontend && npm run build')
     print('    For development, use: npm run dev (in frontend folder)')
-
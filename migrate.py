@@ -0,0 +1,50 @@
+"""
+Schema migrations for the configured database (DATABASE_URL, default SQLite).
+
+    python migrate.py status        # applied / pending versions
+    python migrate.py upgrade       # apply everything pending
+    python migrate.py upgrade 2     # ...up to version 2
+    python migrate.py vacuum        # SQLite: switch an old file to incremental auto-vacuum
+
+The app applies pending migrations on startup too; this is for doing it
+ahead of a deploy, or checking a hub's database from a shell.
+"""
+import sys
+from config import DATABASE_URL
+from services import compaction, dialect, migrations
+
+# Not database.engine: importing database would already migrate on import
+engine = dialect.make_engine(DATABASE_URL)
+
+def status():
+    print(f"Database: {dialect.describe(engine)} ({dialect.name(engine)})")
+    for m in migrations.status(engine):
+        mark = f"✓ applied {m['applied_at']:%Y-%m-%d %H:%M}" if m["applied_at"] else "⚠ pending"
+        print(f"  {m['version']:>3}  {m['description']:<32} {mark}")
+
+def upgrade(target=None):
+    ran = migrations.upgrade(engine, target, log=print)
+    print(f"✓ Up to date ({len(ran)} applied)" if ran else "✓ Already up to date")
+
+def vacuum():
+    # One full VACUUM: holds an exclusive lock for its whole run, so stop the app first
+    if compaction.incremental_vacuum_enabled(engine):
+        print("✓ Incremental auto-vacuum already enabled")
+    elif not dialect.is_sqlite(engine):
+        print("⚠ Not SQLite: autovacuum is handled by the server")
+    else:
+        print(f"Rewriting {dialect.describe(engine)} (stop the app first)...")
+        compaction.enable_incremental_vacuum(engine)
+        print("✓ Incremental auto-vacuum enabled")
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if cmd == "status":
+        status()
+    elif cmd == "upgrade":
+        upgrade(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif cmd == "vacuum":
+        vacuum()
+    else:
+        print(f"✗ Unknown command: {cmd} (status | upgrade [version] | vacuum)")
+        sys.exit(1)
@@ -0,0 +1,20 @@
+"""
+Migration script to add multi-freezer support (freezer_id partitioning).
+
+Superseded by the versioned migrations in services/migrations.py (version 3),
+which database.py applies on startup. Kept so existing setup notes still work:
+it simply runs `python migrate.py upgrade`.
+"""
+
+from config import DATABASE_URL
+from services import dialect, migrations
+
+engine = dialect.make_engine(DATABASE_URL)
+
+def migrate(verbose: bool = True):
+    ran = migrations.upgrade(engine, log=print if verbose else (lambda msg: None))
+    if verbose and not ran:
+        print("- Already migrated")
+
+if __name__ == "__main__":
+    migrate()
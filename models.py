@@ -1,11 +1,22 @@
 # models.py
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Date, Boolean, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Date, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
 Base = declarative_base()
 
+# Default unit for requests that don't name one (single-freezer deployments)
+DEFAULT_FREEZER_ID = 1
+
+# One physical freezer unit served by this hub
+class Freezer(Base):
+    __tablename__ = "freezers"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    module = Column(String, nullable=True)            # e.g. habitat module / rack
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 # Existing Item model
 class Item(Base):
     __tablename__ = "items"
@@ -29,6 +40,11 @@ class Item(Base):
     sodium = Column(Float, nullable=True)         # mg
     sugar = Column(Float, nullable=True)          # grams
 
+    freezer_id = Column(Integer, ForeignKey("freezers.id"), nullable=False, default=DEFAULT_FREEZER_ID)
+
+    # Per-unit scans (panel, sweeper) never touch other units' rows
+    __table_args__ = (Index("ix_items_freezer_expiration", "freezer_id", "expiration_date"),)
+
 # New Transaction model
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -38,8 +54,11 @@ class Transaction(Base):
     action = Column(String)  # "check_in" or "check_out"
     timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
-    # Link back to the item
-    item = relationship("Item", backref="transactions")
+    # Link back to the item (never lazy-load implicitly, e.g. during serialization)
+    item = relationship("Item", backref="transactions", lazy="raise_on_sql")
+
+    # Ids never go backwards, even after compaction empties the table (pick index cursor)
+    __table_args__ = {"sqlite_autoincrement": True}
 
 # New Alert model
 class Alert(Base):
@@ -52,11 +71,59 @@ class Alert(Base):
     is_acknowledged = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     resolved_at = Column(DateTime, nullable=True)
+    freezer_id = Column(Integer, ForeignKey("freezers.id"), nullable=False, default=DEFAULT_FREEZER_ID)
 
-    item = relationship("Item")
+    item = relationship("Item", lazy="raise_on_sql")
+
+    __table_args__ = (Index("ix_alerts_freezer_open", "freezer_id", "resolved_at"),)
 
 # New Setting model
 class Setting(Base):
     __tablename__ = "settings"
     key = Column(String, primary_key=True)
-    value = Column(Text, nullable=False)  # store JSON strings
\ No newline at end of file
+    value = Column(Text, nullable=False)  # store JSON strings
+
+# Per-unit overrides on top of the hub-wide settings above
+class FreezerSetting(Base):
+    __tablename__ = "freezer_settings"
+    freezer_id = Column(Integer, ForeignKey("freezers.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+    value = Column(Text, nullable=False)  # store JSON strings
+
+# Resolved/acknowledged alerts past the retention window (moved by services/compaction.py)
+class AlertArchive(Base):
+    __tablename__ = "alerts_archive"
+    id = Column(Integer, primary_key=True)           # same id as the original alert
+    type = Column(String, nullable=False)
+    severity = Column(String, nullable=False)
+    message = Column(Text, nullable=False)
+    item_id = Column(Integer, nullable=True)         # no FK: the item may be gone
+    is_acknowledged = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+    resolved_at = Column(DateTime, nullable=True)
+    freezer_id = Column(Integer, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+# Old transactions rolled up to per-item daily counts
+class TransactionDaily(Base):
+    __tablename__ = "transactions_daily"
+    item_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    action = Column(String, primary_key=True)        # "check_in" or "check_out"
+    count = Column(Integer, nullable=False, default=0)
+
+# Running energy total and latest reading per unit, shared by every worker (services/power.py)
+class PowerEnergy(Base):
+    __tablename__ = "power_energy"
+    freezer_id = Column(Integer, ForeignKey("freezers.id"), primary_key=True)
+    energy_wh = Column(Float, nullable=False, default=0.0)
+    mean_w = Column(Float, nullable=True)             # mean of the latest block
+    last_block_at = Column(Float, nullable=True)      # unix seconds
+    last_window = Column(Text, nullable=True)         # last closed window, JSON
+
+# Early-warning detector state per probe, shared by every worker (services/anomaly.py)
+class AnomalyState(Base):
+    __tablename__ = "anomaly_state"
+    freezer_id = Column(Integer, ForeignKey("freezers.id"), primary_key=True)
+    probe = Column(String, primary_key=True)
+    state = Column(Text, nullable=False)              # TemperatureDetector fields, JSON
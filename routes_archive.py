@@ -0,0 +1,35 @@
+# routes_archive.py
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Query
+from services import archive as archive_svc
+
+router = APIRouter(prefix="/archive", tags=["archive"])
+
+@router.get("")
+def list_archives():
+    return [archive_svc.stats(m) for m in archive_svc.list_metrics()]
+
+@router.get("/{metric}")
+def read_archive(metric: str,
+                 start: Optional[datetime] = None,
+                 end: Optional[datetime] = None,
+                 bucket_s: Optional[int] = Query(None, ge=1),
+                 limit: int = Query(10_000, ge=1, le=1_000_000)):
+    if metric not in archive_svc.list_metrics():
+        return {"error": "No archive for metric"}
+
+    samples = archive_svc.query(
+        metric,
+        archive_svc.to_ms(start.isoformat()) if start else None,
+        archive_svc.to_ms(end.isoformat()) if end else None,
+    )
+    if bucket_s:
+        samples = archive_svc.downsample(samples, bucket_s * 1000)
+
+    out = []
+    for t, v in samples:
+        out.append({"timestamp": datetime.utcfromtimestamp(t / 1000).isoformat(), metric: v})
+        if len(out) >= limit:
+            break
+    return out
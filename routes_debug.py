@@ -0,0 +1,35 @@
+# routes_debug.py
+# Mounted only with DEBUG_ENDPOINTS (config.py): these expose and change per-process internals
+import os
+from fastapi import APIRouter, Query
+from database import engine
+from services import coord
+from services import profiler as svc
+from services import writer as writer_svc
+
+router = APIRouter(tags=["debug"])
+
+# Which worker process runs the background jobs
+@router.get("/leader")
+def get_leader():
+    return {"pid": os.getpid(), "is_leader": coord.is_leader(), "leader_pid": coord.leader_pid()}
+
+# Group-commit counters for this worker (jobs per commit = fsyncs saved)
+@router.get("/writer")
+def get_writer_stats():
+    return writer_svc.for_engine(engine).stats()
+
+# SQL profiles of sampled requests and background tasks in this worker process
+@router.get("/debug/queries")
+def read_query_profiles(limit: int = Query(20, ge=0, le=svc.RECENT)):
+    return {"pid": os.getpid(), **svc.report(limit)}
+
+@router.put("/debug/queries")
+def configure_query_profiler(sample_rate: float = Query(..., ge=0, le=1)):
+    svc.configure(sample_rate)
+    return {"pid": os.getpid(), "sample_rate": svc.sample_rate}
+
+@router.delete("/debug/queries")
+def clear_query_profiles():
+    svc.registry.clear()
+    return {"ok": True}
@@ -0,0 +1,33 @@
+# routes_export.py
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from database import engine
+from services import export as svc
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+@router.get("")
+def list_exports():
+    return {"datasets": svc.datasets(), "formats": [f for f in svc.FORMATS if f != "parquet" or svc.pq is not None]}
+
+# Full history, streamed in chunks (sync generator: Starlette iterates it in the threadpool)
+@router.get("/{dataset}")
+def export_dataset(dataset: str,
+                   start: Optional[datetime] = Query(None, alias="from"),
+                   end: Optional[datetime] = Query(None, alias="to"),
+                   format: Literal["csv", "ndjson", "parquet"] = "csv",
+                   gzip: bool = False,
+                   freezer_id: Optional[int] = None):
+    if dataset not in svc.datasets():
+        return {"error": "Unknown dataset", "datasets": svc.datasets()}
+    if format == "parquet" and svc.pq is None:
+        return {"error": "Parquet export needs pyarrow (pip install pyarrow)"}
+
+    filename = f"{dataset}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        svc.stream(engine, dataset, format, start, end, freezer_id, gzip=gzip),
+        media_type="application/gzip" if gzip else svc.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,28 @@
+# routes_freezers.py
+from typing import Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Freezer
+from services import freezers as svc
+
+router = APIRouter(prefix="/freezers", tags=["freezers"])
+
+def get_db():
+    db = SessionLocal()
+    try: yield db
+    finally: db.close()
+
+@router.get("")
+def list_freezers(db: Session = Depends(get_db)):
+    return [svc.as_dict(f) for f in db.query(Freezer).order_by(Freezer.id)]
+
+@router.post("")
+def create_freezer(name: str, module: Optional[str] = None, db: Session = Depends(get_db)):
+    if db.query(Freezer.id).filter(Freezer.name == name).first():
+        return {"ok": False, "error": "name_taken"}
+    f = Freezer(name=name, module=module)
+    db.add(f)
+    db.commit()
+    db.refresh(f)
+    return svc.as_dict(f)
@@ -0,0 +1,54 @@
+# routes_labels.py
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Item
+from schemas import LabelSheetIn
+from services import labels as svc
+
+router = APIRouter(prefix="/labels", tags=["labels"])
+
+MAX_LABELS = 2000
+
+def get_db():
+    db = SessionLocal()
+    try: yield db
+    finally: db.close()
+
+@router.post("/sheet")
+def label_sheet(body: LabelSheetIn, db: Session = Depends(get_db)):
+    query = db.query(Item.code, Item.name, Item.expiration_date, Item.quantity)
+    if body.codes is not None:
+        query = query.filter(Item.code.in_(body.codes))
+    if body.freezer_id is not None:
+        query = query.filter(Item.freezer_id == body.freezer_id)
+    if body.name:
+        query = query.filter(Item.name.ilike(f"%{body.name}%"))
+    if body.added_since is not None:
+        query = query.filter(Item.date_added >= body.added_since)
+    if body.expiring_before is not None:
+        query = query.filter(Item.expiration_date < body.expiring_before)
+    rows = query.order_by(Item.id).all()
+    if body.codes is not None:
+        # Keep the caller's order (and any repeats) for explicit code lists
+        by_code = {r.code: r for r in rows}
+        rows = [by_code[c] for c in body.codes if c in by_code]
+
+    # Count first: one item's quantity alone can be far more labels than we'd ever render
+    copies = [max(1, r.quantity or 1) if body.per_unit else 1 for r in rows]
+    total = sum(copies)
+    if not total:
+        return {"error": "No matching items"}
+    if total > MAX_LABELS:
+        return {"error": f"Too many labels ({total} > {MAX_LABELS})"}
+    labels = []
+    for r, n in zip(rows, copies):
+        labels.extend([svc.Label(r.code, r.name, r.expiration_date)] * n)
+
+    layout = svc.SheetLayout(dpi=body.dpi, columns=body.columns, rows=body.rows)
+    content = svc.render_sheet(labels, layout, fmt=body.format)
+    media_type = "application/pdf" if body.format == "pdf" else "image/png"
+    return Response(content, media_type=media_type,
+                    headers={"Content-Disposition": f'inline; filename="labels.{body.format}"',
+                             "X-Label-Count": str(len(labels))})
@@ -1,18 +1,26 @@
 # routes_mission.py
 import csv
+import math
 import os
 from pathlib import Path
 from typing import Callable, Optional
 from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
-from datetime import date
-from models import Item, Alert
+from datetime import date, timedelta
+from config import EXPIRY_SOON_DAYS
+from models import Item, Alert, DEFAULT_FREEZER_ID
 from services.expiry import expiry_status
 from services.status import Gauge, classify_temp, classify_power, classify_humidity
 from services import settings as settings_svc
-from database import SessionLocal
+from services import freezers as freezers_svc
+from services import power as power_svc
+from services import writer as writer_svc
+from database import SessionLocal, engine
+from schemas import FastJSONResponse, AlertOut, ALERT_COLUMNS, rows_as_dicts
 
 router = APIRouter(prefix="/mission", tags=["mission"])
+db_writer = writer_svc.for_engine(engine)
 
 def get_db():
     db = SessionLocal()
@@ -22,13 +30,51 @@ def get_db():
         db.close()
 
 @router.get("/panel")
-def mission_panel(db: Session = Depends(get_db)):
-    # Fetch settings from database
-    settings = settings_svc.get_all(db)
+def mission_panel(freezer_id: int = DEFAULT_FREEZER_ID, db: Session = Depends(get_db)):
+    return build_panel(db, freezer_id)
+
+# Every unit's panel plus a fleet-wide rollup (worst gauge status, summed inventory)
+@router.get("/fleet")
+def mission_fleet(db: Session = Depends(get_db)):
+    units = []
+    for fid in freezers_svc.list_ids(db):
+        panel = build_panel(db, fid)
+        panel["freezer_id"] = fid
+        units.append(panel)
+
+    status_rank = {"nominal": 0, "elevated": 1, "critical": 2}
+    def worst(key):
+        statuses = [u[key]["status"] for u in units if u[key]]
+        return max(statuses, key=status_rank.__getitem__) if statuses else None
+
+    expiring = {"soon": 0, "urgent": 0, "expired": 0}
+    for u in units:
+        for k in expiring:
+            expiring[k] += u["inventory"]["expiring"][k]
+    power_values = [u["power"]["value"] for u in units if u["power"]["value"] is not None]
+
+    return {
+        "units": units,
+        "fleet": {
+            "units": len(units),
+            "temperature_status": worst("temperature"),
+            "power_status": worst("power"),
+            "power_total_w": round(sum(power_values), 2),
+            "energy_kwh": round(sum(u["energy"]["kwh"] for u in units), 5),
+            "inventory": {
+                "total": sum(u["inventory"]["total"] for u in units),
+                "expiring": expiring,
+            },
+        },
+    }
+
+def build_panel(db: Session, freezer_id: int) -> dict:
+    # Fetch settings from database (hub-wide + this unit's overrides)
+    settings = settings_svc.get_all(db, freezer_id)
     
-    current_temp_c = latest_metric("temperature_data.csv", "temperature")
-    current_power_w = latest_metric("power_data.csv", "power")
-    current_humidity = latest_metric("humidity_data.csv", "humidity")
+    current_temp_c = latest_metric(freezers_svc.data_file("temperature", freezer_id), "temperature")
+    current_power_w = latest_metric(freezers_svc.data_file("power", freezer_id), "power")
+    current_humidity = latest_metric(freezers_svc.data_file("humidity", freezer_id), "humidity")
 
     # Pass settings to classify_temp
     temp = build_gauge(current_temp_c, "C", lambda c: classify_temp(c, settings), "No temperature readings yet.")
@@ -37,13 +83,20 @@ def mission_panel(db: Session = Depends(get_db)):
     if current_humidity is not None:
         humidity = build_gauge(current_humidity, "%", classify_humidity, None)
 
-    # Inventory snapshot
-    total_items = db.query(Item).count()
+    # Inventory snapshot for this unit only
+    total_items = db.query(func.count(Item.id)).filter(Item.freezer_id == freezer_id).scalar()
     today = date.today()
     expiring_counts = {"soon":0, "urgent":0, "expired":0}
     next_expiring = []
 
-    for it in db.query(Item).all():
+    # Only items that can be soon/urgent/expired; served by ix_items_freezer_expiration
+    horizon = today + timedelta(days=EXPIRY_SOON_DAYS)
+    candidates = db.query(Item.id, Item.name, Item.expiration_date).filter(
+        Item.freezer_id == freezer_id,
+        Item.expiration_date.isnot(None),
+        Item.expiration_date <= horizon,
+    )
+    for it in candidates:
         status, days = expiry_status(it.expiration_date, today)
         if status in expiring_counts:
             expiring_counts[status] += 1
@@ -62,6 +115,7 @@ def mission_panel(db: Session = Depends(get_db)):
         "power": gauge_as_dict(power),
         "temperature": gauge_as_dict(temp),
         "humidity": gauge_as_dict(humidity) if humidity else None,
+        "energy": energy_as_dict(power_svc.live(engine, freezer_id)),
         "inventory": {
             "total": total_items,
             "expiring": expiring_counts,
@@ -69,9 +123,13 @@ def mission_panel(db: Session = Depends(get_db)):
         }
     }
 
+def energy_as_dict(live: dict):
+    return {"kw": live["kw"], "kwh": live["kwh"], "live": live["live"]}
+
 def gauge_as_dict(g: Gauge | None):
     if g is None: return None
-    return {"value": g.value, "unit": g.unit, "status": g.status, "note": g.note}
+    value = None if math.isnan(g.value) else g.value  # NaN = no reading; not valid JSON
+    return {"value": value, "unit": g.unit, "status": g.status, "note": g.note}
 
 def latest_metric(filename: str, column: str) -> Optional[float]:
     path = Path(filename)
@@ -157,27 +215,20 @@ def build_gauge(value: Optional[float], unit: str, classifier: Callable[[float],
         return Gauge(value=float("nan"), unit=unit, status="critical", note=note)
     return Gauge(value=value, unit=unit, status=classifier(value))
 
-@router.get("/alerts")
-def list_alerts(db: Session = Depends(get_db), include_resolved: bool = Query(False)):
-    q = db.query(Alert).order_by(Alert.created_at.desc())
+@router.get("/alerts", response_class=FastJSONResponse, responses={200: {"model": list[AlertOut]}})
+def list_alerts(db: Session = Depends(get_db), include_resolved: bool = Query(False),
+                freezer_id: Optional[int] = None):
+    q = db.query(*ALERT_COLUMNS).order_by(Alert.created_at.desc())
+    if freezer_id is not None:
+        q = q.filter(Alert.freezer_id == freezer_id)
     if not include_resolved:
         q = q.filter(Alert.resolved_at.is_(None))
-    alerts = q.limit(100).all()
-    return [{
-        "id": a.id,
-        "type": a.type,
-        "severity": a.severity,
-        "message": a.message,
-        "item_id": a.item_id,
-        "is_acknowledged": a.is_acknowledged,
-        "created_at": a.created_at.isoformat(),
-        "resolved_at": a.resolved_at.isoformat() if a.resolved_at else None
-    } for a in alerts]
+    return FastJSONResponse(rows_as_dicts(q.limit(100)))
 
 @router.post("/alerts/{alert_id}/ack")
-def acknowledge_alert(alert_id: int, db: Session = Depends(get_db)):
-    a = db.query(Alert).get(alert_id)
-    if not a: return {"ok": False, "error": "not_found"}
-    a.is_acknowledged = True
-    db.commit()
+def acknowledge_alert(alert_id: int):
+    updated = db_writer.call(lambda conn: conn.execute(
+        update(Alert).where(Alert.id == alert_id).values(is_acknowledged=True)
+    ).rowcount)
+    if not updated: return {"ok": False, "error": "not_found"}
     return {"ok": True}
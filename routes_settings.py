@@ -1,8 +1,10 @@
 # routes_settings.py
+from typing import Optional
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from database import SessionLocal
 from services import settings as svc
+from services import freezers as freezers_svc
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
@@ -11,12 +13,15 @@ def get_db():
     try: yield db
     finally: db.close()
 
+# freezer_id omitted = hub-wide settings; given = that unit's effective settings/overrides
 @router.get("")
-def read_settings(db: Session = Depends(get_db)):
-    return svc.get_all(db)
+def read_settings(freezer_id: Optional[int] = None, db: Session = Depends(get_db)):
+    return svc.get_all(db, freezer_id)
 
 @router.put("")
-def write_settings(payload: dict, db: Session = Depends(get_db)):
+def write_settings(payload: dict, freezer_id: Optional[int] = None, db: Session = Depends(get_db)):
     # (Optional) validate/clip here (e.g., temp ranges)
-    svc.update_many(db, payload)
+    if freezer_id is not None and not freezers_svc.exists(db, freezer_id):
+        return {"ok": False, "error": "freezer_not_found"}
+    svc.update_many(db, payload, freezer_id)
     return {"ok": True}
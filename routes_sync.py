@@ -0,0 +1,44 @@
+# routes_sync.py
+from fastapi import APIRouter, Query, Response
+from fastapi.responses import FileResponse
+from database import engine
+from services import archive as archive_svc
+from services import replication as svc
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+@router.get("/status")
+def sync_status():
+    return {
+        "head": svc.head(engine),
+        "acked": int(svc.get_state(engine, "acked_seq", "0")),
+    }
+
+# Changes after `since` as one zlib-compressed JSON batch (see services/replication.py)
+@router.get("/changes")
+def read_changes(since: int = Query(0, ge=0), limit: int = Query(svc.BATCH_LIMIT, ge=1, le=5000)):
+    batch = svc.read_batch(engine, since, limit)
+    return Response(
+        content=svc.encode_batch(batch),
+        media_type="application/octet-stream",
+        headers={
+            "X-Sync-Next": str(batch["next"]),
+            "X-Sync-More": "1" if batch["more"] else "0",
+        },
+    )
+
+# The replica has applied everything up to `seq`: those log rows may be pruned
+@router.post("/ack")
+def ack_changes(seq: int = Query(..., ge=0)):
+    seq = min(seq, svc.head(engine))
+    svc.ack(engine, seq)
+    return {"acked": int(svc.get_state(engine, "acked_seq", "0"))}
+
+# Raw bytes of one sealed archive segment (immutable, so safe to fetch at any time)
+@router.get("/segments/{metric}/{file}")
+def read_segment(metric: str, file: str):
+    if metric not in archive_svc.list_metrics():
+        return {"error": "No archive for metric"}
+    if file not in {e["file"] for e in archive_svc.load_index(metric)}:
+        return {"error": "Segment not found"}
+    return FileResponse(archive_svc.ARCHIVE_DIR / metric / file, media_type="application/octet-stream")
@@ -0,0 +1,111 @@
+# schemas.py
+"""
+Slim response shapes for the list endpoints plus a fast JSON response class.
+
+Handlers select plain columns (Row tuples, no ORM hydration) and return
+`FastJSONResponse(rows_as_dicts(...))`. Returning a Response skips FastAPI's
+jsonable_encoder/validation pass, so the pydantic models below are docs only:
+routes list them under `responses={200: {"model": ...}}`, not `response_model`,
+which would suggest a validation that never runs.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Literal, Optional
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+from models import Item, Transaction, Alert
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return json.dumps(content, default=_default, separators=(",", ":")).encode()
+        # orjson encodes date/datetime natively (same ISO format as .isoformat())
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ItemOut(BaseModel):
+    id: int
+    name: str
+    quantity: Optional[int] = None
+    location: Optional[str] = None
+    date_added: Optional[date] = None
+    expiration_date: Optional[date] = None
+    temperature_requirement: Optional[float] = None
+    code: Optional[str] = None
+    serving_size: Optional[str] = None
+    calories: Optional[float] = None
+    protein: Optional[float] = None
+    carbs: Optional[float] = None
+    fat: Optional[float] = None
+    fiber: Optional[float] = None
+    sodium: Optional[float] = None
+    sugar: Optional[float] = None
+    freezer_id: int
+
+
+class TransactionOut(BaseModel):
+    id: int
+    item_id: Optional[int] = None
+    action: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+
+class AlertOut(BaseModel):
+    id: int
+    type: str
+    severity: str
+    message: str
+    item_id: Optional[int] = None
+    is_acknowledged: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    resolved_at: Optional[datetime] = None
+    freezer_id: int
+
+
+# High-rate power sample block from a current sensor (POST /power/samples)
+class PowerBlockIn(BaseModel):
+    freezer_id: int = 1
+    rate_hz: float = Field(gt=0, le=1000)
+    samples: list[float] = Field(min_length=1, max_length=50_000)
+    unit: Literal["W", "A"] = "W"
+    voltage: Optional[float] = None       # required when unit == "A"
+    start: Optional[datetime] = None      # UTC time of the first sample; default: ends now
+    keep_raw: bool = True                 # keep raw bursts around power alerts
+
+
+# Multi-up label sheet (POST /labels/sheet): explicit codes, or a filter over items
+class LabelSheetIn(BaseModel):
+    codes: Optional[list[str]] = Field(None, max_length=2000)
+    freezer_id: Optional[int] = None
+    name: Optional[str] = None                # substring match
+    added_since: Optional[date] = None
+    expiring_before: Optional[date] = None
+    per_unit: bool = False                    # one label per unit of quantity
+    format: Literal["pdf", "png"] = "pdf"
+    columns: int = Field(3, ge=1, le=8)
+    rows: int = Field(10, ge=1, le=30)
+    dpi: int = Field(300, ge=150, le=600)
+
+
+# Column lists in schema order, for db.query(*COLUMNS) / select(*COLUMNS)
+ITEM_COLUMNS = tuple(getattr(Item, f) for f in ItemOut.model_fields)
+TRANSACTION_COLUMNS = tuple(getattr(Transaction, f) for f in TransactionOut.model_fields)
+ALERT_COLUMNS = tuple(getattr(Alert, f) for f in AlertOut.model_fields)
+
+
+def rows_as_dicts(rows) -> list[dict]:
+    return [dict(r._mapping) for r in rows]
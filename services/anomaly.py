@@ -0,0 +1,203 @@
+# services/anomaly.py
+"""
+Online early-warning detector for temperature, one per freezer probe.
+
+Constant state and constant work per sample:
+- EWMA mean/variance -> z-score of each reading against recent behaviour
+- smoothed rate of rise in C/min (door left ajar; a brief opening doesn't trip it)
+- two-sided CUSUM against a slow baseline (gradual drift, e.g. a failing compressor)
+
+Fires well before the fixed `temp_critical_high` threshold is crossed. An
+alert stays open (one per kind) until every score has dropped back under
+`resolve_score`, then it is resolved.
+
+Readings are spread over the API workers, so the detector state lives in the
+anomaly_state table: each reading loads it, updates it and stores it back in
+one group-commit job (row-locked on PostgreSQL; SQLite's write lock serializes
+the jobs), together with any alert it raises or resolves. Every worker then
+feeds the same detector, in arrival order.
+"""
+import json
+import math
+from dataclasses import dataclass, asdict, field, fields
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.engine import Engine
+from models import Alert, AnomalyState
+
+@dataclass
+class DetectorParams:
+    alpha: float = 0.05             # EWMA weight (~20-sample memory)
+    z_threshold: float = 6.0
+    rise_c_per_min: float = 0.6
+    slope_beta: float = 0.2         # EWMA weight of the rate of rise
+    min_rate_dt_s: float = 30       # readings closer than this don't inflate the rate
+    baseline_alpha: float = 0.005   # slow mean the CUSUM measures drift against (~3 h at 1/min)
+    cusum_k: float = 1.0            # slack, in standard deviations
+    cusum_h: float = 25.0           # decision threshold, in standard deviations
+    min_std: float = 0.1            # floor so a very steady cabinet doesn't alarm on noise
+    warmup: int = 30                # samples before any alert
+    cooldown_s: float = 600         # min time between alerts from one detector
+    resolve_score: float = 0.5      # all scores below this fraction of their thresholds: back to normal
+
+@dataclass
+class Anomaly:
+    timestamp: float
+    value: float
+    kind: str                       # "ewma" | "rate" | "cusum"
+    confidence: float               # 0..1
+    detail: str
+
+@dataclass
+class TemperatureDetector:
+    params: DetectorParams = field(default_factory=DetectorParams)
+    n: int = 0
+    mean: float = 0.0
+    baseline: float = 0.0
+    var: float = 0.0
+    cusum_pos: float = 0.0
+    cusum_neg: float = 0.0
+    slope: float = 0.0
+    last_value: Optional[float] = None
+    last_ts: Optional[float] = None
+    last_alert_ts: float = float("-inf")
+    alerting: bool = False          # alerted, and the signal hasn't settled since
+    settled: bool = False           # this reading brought an alerting detector back to normal
+
+    def update(self, ts: float, x: float) -> Optional[Anomaly]:
+        p = self.params
+        self.settled = False
+        if self.n == 0:
+            self.n, self.mean, self.baseline = 1, x, x
+            self.last_value, self.last_ts = x, ts
+            return None
+
+        std = max(math.sqrt(self.var), p.min_std)
+        z = (x - self.mean) / std
+        dt = max(ts - self.last_ts, p.min_rate_dt_s)
+        rate = (x - self.last_value) / dt * 60
+        self.slope += p.slope_beta * (rate - self.slope)
+
+        drift = (x - self.baseline) / std
+        self.cusum_pos = max(0.0, self.cusum_pos + drift - p.cusum_k)
+        self.cusum_neg = max(0.0, self.cusum_neg - drift - p.cusum_k)
+
+        # EWMA update (West's incremental form)
+        diff = x - self.mean
+        incr = p.alpha * diff
+        self.mean += incr
+        self.var = (1 - p.alpha) * (self.var + diff * incr)
+        self.baseline += p.baseline_alpha * (x - self.baseline)
+        self.n += 1
+        self.last_value, self.last_ts = x, ts
+
+        if self.n < p.warmup:
+            return None
+
+        scores = {
+            "ewma": abs(z) / p.z_threshold,
+            "rate": self.slope / p.rise_c_per_min,
+            "cusum": max(self.cusum_pos, self.cusum_neg) / p.cusum_h,
+        }
+        kind = max(scores, key=scores.get)
+        score = scores[kind]
+        if self.alerting and score < p.resolve_score:
+            self.alerting, self.settled = False, True
+        if score < 1.0 or ts - self.last_alert_ts < p.cooldown_s:
+            return None
+
+        detail = {
+            "ewma": f"{x:.2f}C is {z:+.1f} sd from recent mean {self.mean:.2f}C",
+            "rate": f"rising {self.slope:.2f} C/min",
+            "cusum": f"sustained {'rise' if self.cusum_pos >= self.cusum_neg else 'drop'} vs baseline {self.baseline:.2f}C",
+        }[kind]
+        self.last_alert_ts = ts
+        self.alerting = True
+        self.cusum_pos = self.cusum_neg = 0.0
+        return Anomaly(ts, x, kind, round(1 - 0.5 ** score, 3), detail)
+
+    def dump(self) -> str:
+        return json.dumps({f.name: getattr(self, f.name) for f in fields(self) if f.name != "params"})
+
+    @classmethod
+    def load(cls, data: str, params: Optional[DetectorParams] = None) -> "TemperatureDetector":
+        saved = json.loads(data)
+        return cls(params or DetectorParams(), **{f.name: saved[f.name] for f in fields(cls)
+                                                  if f.name != "params" and f.name in saved})
+
+    def state(self) -> dict:
+        return {
+            "samples": self.n,
+            "mean": round(self.mean, 4),
+            "baseline": round(self.baseline, 4),
+            "std": round(math.sqrt(self.var), 4),
+            "cusum_pos": round(self.cusum_pos, 3),
+            "cusum_neg": round(self.cusum_neg, 3),
+            "slope_c_per_min": round(self.slope, 4),
+            "params": asdict(self.params),
+        }
+
+def replay(samples: Iterable[tuple[float, float]], params: Optional[DetectorParams] = None) -> list[Anomaly]:
+    """Run a fresh detector over (unix_ts, value) history; used for offline tuning."""
+    det = TemperatureDetector(params or DetectorParams())
+    return [a for a in (det.update(t, v) for t, v in samples) if a is not None]
+
+# ----- alerts (run inside a group-commit job) -----
+
+ALERT_PREFIX = "Early warning"
+
+def raise_alert(conn, freezer_id: int, anomaly: Anomaly) -> bool:
+    """Insert an alert unless one of the same kind is still open for this unit."""
+    prefix = f"{ALERT_PREFIX} ({anomaly.kind})"
+    if conn.execute(select(Alert.id).where(
+        Alert.freezer_id == freezer_id,
+        Alert.type == "temperature",
+        Alert.message.like(f"{prefix}%"),
+        Alert.resolved_at.is_(None),
+    )).first():
+        return False
+    conn.execute(insert(Alert).values(
+        type="temperature",
+        severity="warning" if anomaly.confidence >= 0.75 else "info",
+        message=f"{prefix}: {anomaly.detail} (confidence {anomaly.confidence:.2f})",
+        is_acknowledged=False,
+        freezer_id=freezer_id,
+    ))
+    return True
+
+def resolve_alerts(conn, freezer_id: int) -> int:
+    """The signal is back to normal: close this unit's open early warnings."""
+    return conn.execute(update(Alert).where(
+        Alert.freezer_id == freezer_id,
+        Alert.type == "temperature",
+        Alert.message.like(f"{ALERT_PREFIX} (%"),
+        Alert.resolved_at.is_(None),
+    ).values(resolved_at=datetime.utcnow())).rowcount
+
+# ----- shared detectors: one row per (freezer, probe) in anomaly_state -----
+
+_UPSERT = text("""
+    INSERT INTO anomaly_state (freezer_id, probe, state) VALUES (:fid, :probe, :state)
+    ON CONFLICT (freezer_id, probe) DO UPDATE SET state = excluded.state
+""")
+
+def observe(conn, freezer_id: int, ts: float, value: float, probe: str = "temperature") -> Optional[Anomaly]:
+    """Feed one reading to the unit's shared detector and raise/resolve its alerts. Run as a writer job."""
+    row = conn.execute(select(AnomalyState.state).where(
+        AnomalyState.freezer_id == freezer_id, AnomalyState.probe == probe,
+    ).with_for_update()).first()
+    det = TemperatureDetector.load(row.state) if row else TemperatureDetector()
+    found = det.update(ts, value)
+    conn.execute(_UPSERT, {"fid": freezer_id, "probe": probe, "state": det.dump()})
+    if found:
+        raise_alert(conn, freezer_id, found)
+    elif det.settled:
+        resolve_alerts(conn, freezer_id)
+    return found
+
+def state(engine: Engine, freezer_id: int, probe: str = "temperature") -> Optional[dict]:
+    with engine.connect() as conn:
+        row = conn.execute(select(AnomalyState.state).where(
+            AnomalyState.freezer_id == freezer_id, AnomalyState.probe == probe)).first()
+    return TemperatureDetector.load(row.state).state() if row else None
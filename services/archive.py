@@ -0,0 +1,317 @@
+# services/archive.py
+"""
+Long-term sensor history as immutable, compressed, columnar segments.
+
+Rows trimmed out of the live CSVs are staged per metric, and once their UTC day
+is over they are sealed into one segment file per day:
+
+    archive/<metric>/<YYYY-MM-DD>.seg
+    archive/<metric>/index.json            [{file, start, end, count, min, max}, ...]
+
+Rows that arrive for an already sealed day (late rows, restart leftovers) are
+merged into that day's segment, which is rewritten atomically. Older archives
+may still hold extra parts (<day>.1.seg ...); query() merges overlapping ones.
+stage() and seal() share a per-metric lock across worker processes, so rows
+appended while a seal is running are never lost.
+
+Segment layout (little endian):
+    header  magic "SFA1", count, first timestamp (ms), value scale,
+            compressed sizes of the two columns
+    column  timestamp deltas in ms   (int64, zlib)
+    column  value deltas, quantized  (int32, zlib)
+
+Delta-encoded fixed-width integers compress to a few bytes per sample and
+decode in C via `array` + `itertools.accumulate`.
+"""
+import csv
+import heapq
+import json
+import os
+import struct
+import zlib
+from array import array
+from datetime import date, datetime, timezone
+from itertools import accumulate
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from services import coord
+
+ARCHIVE_DIR = Path("archive")
+MAGIC = b"SFA1"
+SCALE = 100  # values kept to 0.01 (DS18B20 max resolution is 0.0625 C)
+_HEADER = struct.Struct("<4sIqIII")
+
+# metric -> UTC day it was last sealed on (avoids re-reading staging every tick)
+_sealed_through: dict[str, date] = {}
+
+
+def _metric_dir(metric: str) -> Path:
+    d = ARCHIVE_DIR / metric
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def to_ms(ts) -> int:
+    if isinstance(ts, (int, float)):
+        return int(ts)
+    dt = datetime.fromisoformat(str(ts))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _ms_day(ms: int) -> date:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).date()
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+# ----- encoding -----
+
+def encode_segment(samples: list[tuple[int, float]]) -> bytes:
+    """samples: (timestamp_ms, value) sorted by time."""
+    ts = [t for t, _ in samples]
+    vals = [round(v * SCALE) for _, v in samples]
+    ts_deltas = array("q", [0] + [b - a for a, b in zip(ts, ts[1:])])
+    val_deltas = array("i", [vals[0]] + [b - a for a, b in zip(vals, vals[1:])])
+    ts_block = zlib.compress(ts_deltas.tobytes(), 9)
+    val_block = zlib.compress(val_deltas.tobytes(), 9)
+    header = _HEADER.pack(MAGIC, len(samples), ts[0], SCALE, len(ts_block), len(val_block))
+    return header + ts_block + val_block
+
+
+def segment_count(path: Path) -> int:
+    """Sample count from a segment's header, without decoding it."""
+    with open(path, "rb") as fh:
+        return _HEADER.unpack(fh.read(_HEADER.size))[1]
+
+
+def decode_segment(buf: bytes) -> tuple[array, list[float]]:
+    magic, count, t0, scale, ts_len, val_len = _HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError("not an archive segment")
+    off = _HEADER.size
+    ts_deltas = array("q")
+    ts_deltas.frombytes(zlib.decompress(buf[off:off + ts_len]))
+    val_deltas = array("i")
+    val_deltas.frombytes(zlib.decompress(buf[off + ts_len:off + ts_len + val_len]))
+    if len(ts_deltas) != count or len(val_deltas) != count:
+        raise ValueError("corrupt archive segment")
+    ts = array("q", accumulate(ts_deltas, initial=t0))[1:]
+    values = [v / scale for v in accumulate(val_deltas)]
+    return ts, values
+
+
+# ----- index -----
+
+def load_index(metric: str) -> list[dict]:
+    path = _metric_dir(metric) / "index.json"
+    if not path.exists():
+        return []
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def write_index(metric_dir: Path, entries: list[dict]):
+    """index.json for the segments in metric_dir (also used for a replica's copy)."""
+    entries.sort(key=lambda e: (e["start"], e["file"]))
+    _write_atomic(metric_dir / "index.json", json.dumps(entries).encode())
+
+
+def _save_index(metric: str, entries: list[dict]):
+    write_index(_metric_dir(metric), entries)
+
+
+def _lock(metric: str):
+    return coord.exclusive(f"archive-{metric}")
+
+
+def list_metrics() -> list[str]:
+    if not ARCHIVE_DIR.exists():
+        return []
+    return sorted(p.name for p in ARCHIVE_DIR.iterdir() if (p / "index.json").exists())
+
+
+# ----- write path -----
+
+def stage(metric: str, rows: Iterable[tuple]):
+    """Append (timestamp, value) rows that are about to be trimmed from a live CSV."""
+    rows = list(rows)
+    if not rows:
+        return
+    with _lock(metric), open(_metric_dir(metric) / "staging.csv", "a", newline="") as fh:
+        csv.writer(fh).writerows(rows)
+
+
+def write_segment(metric: str, day: date, samples: list[tuple[int, float]], name: Optional[str] = None) -> dict:
+    """Write one segment; without a name, a new part next to the day's existing ones."""
+    samples.sort()
+    d = _metric_dir(metric)
+    if name is None:
+        name = f"{day.isoformat()}.seg"
+        n = 0
+        while (d / name).exists():
+            n += 1
+            name = f"{day.isoformat()}.{n}.seg"
+    data = encode_segment(samples)
+    _write_atomic(d / name, data)
+    values = [v for _, v in samples]
+    return {
+        "file": name, "start": samples[0][0], "end": samples[-1][0],
+        "count": len(samples), "min": min(values), "max": max(values), "bytes": len(data),
+    }
+
+
+def _read_segment(metric: str, entry: dict) -> list[tuple[int, float]]:
+    with open(_metric_dir(metric) / entry["file"], "rb") as fh:
+        ts, values = decode_segment(fh.read())
+    return list(zip(ts, values))
+
+
+def _day_of(entry: dict) -> str:
+    return entry["file"].split(".", 1)[0]
+
+
+def append_days(metric: str, by_day: dict[date, list[tuple[int, float]]]) -> int:
+    """
+    Add samples to the archive, one segment per UTC day. A day that already has
+    segments gets them merged with the new samples into a single <day>.seg.
+    Returns samples added.
+    """
+    with _lock(metric):
+        return _append_days_locked(metric, by_day)
+
+
+def _append_days_locked(metric: str, by_day: dict[date, list[tuple[int, float]]]) -> int:
+    if not by_day:
+        return 0
+    d = _metric_dir(metric)
+    entries = load_index(metric)
+    obsolete = []
+    added = 0
+    for day in sorted(by_day):
+        iso = day.isoformat()
+        existing = [e for e in entries if _day_of(e) == iso]
+        # Same quantization as decoded samples, so re-staged duplicates collapse
+        samples = {(ms, round(v * SCALE) / SCALE) for ms, v in by_day[day]}
+        stored = set()
+        for e in existing:
+            stored.update(_read_segment(metric, e))
+        added += len(samples - stored)          # only rows the archive didn't have yet
+        samples |= stored
+        entries = [e for e in entries if _day_of(e) != iso]
+        # The merged segment replaces <day>.seg atomically; extra parts go once the index is saved
+        entries.append(write_segment(metric, day, sorted(samples), name=f"{iso}.seg"))
+        obsolete += [e["file"] for e in existing if e["file"] != f"{iso}.seg"]
+    _save_index(metric, entries)
+    for name in obsolete:
+        (d / name).unlink(missing_ok=True)
+    return added
+
+
+def seal(metric: str, today: Optional[date] = None) -> int:
+    """Roll staged rows from finished UTC days into segments. Returns rows sealed."""
+    today = today or datetime.now(timezone.utc).date()
+    if _sealed_through.get(metric) == today:
+        return 0
+
+    with _lock(metric):
+        sealed = _seal_locked(metric, today)
+    _sealed_through[metric] = today
+    return sealed
+
+
+def _seal_locked(metric: str, today: date) -> int:
+    staging = _metric_dir(metric) / "staging.csv"
+    by_day: dict[date, list[tuple[int, float]]] = {}
+    keep: list[tuple[int, float]] = []
+    if not staging.exists():
+        return 0
+    with open(staging, newline="") as fh:
+        for row in csv.reader(fh):
+            try:
+                ms, value = to_ms(row[0]), float(row[1])
+            except (ValueError, IndexError):
+                continue
+            day = _ms_day(ms)
+            if day < today:
+                by_day.setdefault(day, []).append((ms, value))
+            else:
+                keep.append((ms, value))
+    if not by_day:
+        return 0
+
+    sealed = _append_days_locked(metric, by_day)
+    # Rewrite staging with only the still-open day
+    tmp = staging.with_suffix(".tmp")
+    with open(tmp, "w", newline="") as fh:
+        w = csv.writer(fh)
+        for ms, value in keep:
+            w.writerow((datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+                        .replace(tzinfo=None).isoformat(), value))
+    os.replace(tmp, staging)
+    return sealed
+
+
+# ----- read path -----
+
+def query(metric: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[tuple[int, float]]:
+    """Stream samples in [start_ms, end_ms], touching only overlapping segments."""
+    lo = start_ms if start_ms is not None else -(1 << 62)
+    hi = end_ms if end_ms is not None else (1 << 62)
+    groups: list[list[dict]] = []
+    for entry in load_index(metric):              # sorted by start
+        if entry["end"] < lo or entry["start"] > hi:
+            continue
+        if groups and entry["start"] <= max(e["end"] for e in groups[-1]):
+            groups[-1].append(entry)              # overlaps a previous part of the same day
+        else:
+            groups.append([entry])
+    for group in groups:
+        if len(group) == 1:
+            samples = _read_segment(metric, group[0])
+        else:
+            samples = list(heapq.merge(*(_read_segment(metric, e) for e in group)))
+        if lo <= group[0]["start"] and max(e["end"] for e in group) <= hi:
+            yield from samples
+        else:
+            for t, v in samples:
+                if lo <= t <= hi:
+                    yield t, v
+
+
+def downsample(samples: Iterable[tuple[int, float]], bucket_ms: int) -> Iterator[tuple[int, float]]:
+    """Mean per fixed time bucket; keeps long-range responses small."""
+    cur, total, n = None, 0.0, 0
+    for t, v in samples:
+        b = t - t % bucket_ms
+        if b != cur:
+            if n:
+                yield cur, total / n
+            cur, total, n = b, 0.0, 0
+        total += v
+        n += 1
+    if n:
+        yield cur, total / n
+
+
+def stats(metric: str) -> dict:
+    entries = load_index(metric)
+    count = sum(e["count"] for e in entries)
+    size = sum(e.get("bytes", 0) for e in entries)
+    return {
+        "metric": metric,
+        "segments": len(entries),
+        "samples": count,
+        "bytes": size,
+        "bytes_per_sample": round(size / count, 2) if count else None,
+        "start": entries[0]["start"] if entries else None,
+        "end": max(e["end"] for e in entries) if entries else None,
+    }
@@ -0,0 +1,145 @@
+# services/compaction.py
+"""
+Retention for the hot tables, run in small batches so the API never waits on it:
+
+- resolved or acknowledged alerts older than `retention_days` move to alerts_archive
+- transactions older than `retention_days` collapse into transactions_daily counts
+  (rows whose item is gone are counted under UNKNOWN_ITEM_ID)
+- freed pages are returned to the filesystem with time-boxed PRAGMA incremental_vacuum
+  (SQLite only; on PostgreSQL autovacuum does this)
+
+New SQLite files are created with auto_vacuum=INCREMENTAL (dialect.tune); an older file
+needs one full VACUUM to switch, which locks the database, so it is never done by the
+app itself: `python migrate.py vacuum` during a maintenance window.
+"""
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from services import dialect
+
+BATCH_ROWS = 500
+VACUUM_STEP_PAGES = 64
+VACUUM_BUDGET_S = 0.05
+# transactions_daily.item_id for transactions with no item (item_id is part of its primary key)
+UNKNOWN_ITEM_ID = 0
+
+_ALERT_COLUMNS = "id, type, severity, message, item_id, is_acknowledged, created_at, resolved_at, freezer_id"
+_ARCHIVE_UPDATE = ", ".join(f"{c} = excluded.{c}" for c in [*_ALERT_COLUMNS.split(", ")[1:], "archived_at"])
+
+
+def incremental_vacuum_enabled(engine: Engine) -> bool:
+    if not dialect.is_sqlite(engine):
+        return False
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+
+
+def enable_incremental_vacuum(engine: Engine) -> bool:
+    """
+    Switch an existing SQLite file to auto_vacuum=INCREMENTAL with one full VACUUM.
+    Rewrites the whole file under an exclusive lock: maintenance only, never at startup.
+    Returns False on databases that don't need it (PostgreSQL) or already have it.
+    """
+    if not dialect.is_sqlite(engine) or incremental_vacuum_enabled(engine):
+        return False
+    raw = engine.raw_connection()
+    try:
+        raw.isolation_level = None  # VACUUM cannot run inside a transaction
+        raw.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        raw.execute("VACUUM")
+    finally:
+        raw.close()
+    return True
+
+
+def archive_alerts(engine: Engine, cutoff: datetime, batch: int = BATCH_ROWS) -> int:
+    moved = 0
+    params = {"cutoff": dialect.ts_param(engine, cutoff), "batch": batch, "yes": True}
+    while True:
+        with engine.begin() as conn:
+            ids = [r[0] for r in conn.execute(text("""
+                SELECT id FROM alerts
+                WHERE (resolved_at IS NOT NULL AND resolved_at < :cutoff)
+                   OR (resolved_at IS NULL AND is_acknowledged = :yes AND created_at < :cutoff)
+                ORDER BY id LIMIT :batch
+            """), params)]
+            if not ids:
+                return moved
+            bounds = {"lo": ids[0], "hi": ids[-1], **params}
+            where = """id BETWEEN :lo AND :hi AND (
+                (resolved_at IS NOT NULL AND resolved_at < :cutoff)
+                OR (resolved_at IS NULL AND is_acknowledged = :yes AND created_at < :cutoff))"""
+            conn.execute(text(f"""
+                INSERT INTO alerts_archive ({_ALERT_COLUMNS}, archived_at)
+                SELECT {_ALERT_COLUMNS}, :now FROM alerts WHERE {where}
+                ON CONFLICT (id) DO UPDATE SET {_ARCHIVE_UPDATE}
+            """), {**bounds, "now": dialect.ts_param(engine, datetime.utcnow())})
+            moved += conn.execute(text(f"DELETE FROM alerts WHERE {where}"), bounds).rowcount
+        time.sleep(0)  # let writers in between batches
+
+
+def rollup_transactions(engine: Engine, cutoff: datetime, batch: int = BATCH_ROWS) -> int:
+    rolled = 0
+    params = {"cutoff": dialect.ts_param(engine, cutoff), "batch": batch}
+    while True:
+        with engine.begin() as conn:
+            hi = conn.execute(text("""
+                SELECT MAX(id) FROM (
+                    SELECT id FROM transactions WHERE timestamp < :cutoff ORDER BY id LIMIT :batch
+                ) AS batch
+            """), params).scalar()
+            if hi is None:
+                return rolled
+            bounds = {"hi": hi, **params}
+            conn.execute(text(f"""
+                INSERT INTO transactions_daily (item_id, day, action, count)
+                SELECT COALESCE(item_id, {UNKNOWN_ITEM_ID}), date(timestamp), action, COUNT(*)
+                FROM transactions
+                WHERE id <= :hi AND timestamp < :cutoff
+                GROUP BY COALESCE(item_id, {UNKNOWN_ITEM_ID}), date(timestamp), action
+                ON CONFLICT (item_id, day, action) DO UPDATE SET count = transactions_daily.count + excluded.count
+            """), bounds)
+            rolled += conn.execute(text(
+                "DELETE FROM transactions WHERE id <= :hi AND timestamp < :cutoff"
+            ), bounds).rowcount
+        time.sleep(0)
+
+
+def incremental_vacuum(engine: Engine, budget_s: float = VACUUM_BUDGET_S,
+                       step_pages: int = VACUUM_STEP_PAGES) -> int:
+    """Release free pages in small steps until none are left or the time budget is spent."""
+    if not dialect.is_sqlite(engine):
+        return 0
+    freed = 0
+    deadline = time.monotonic() + budget_s
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        while time.monotonic() < deadline:
+            before = cur.execute("PRAGMA freelist_count").fetchone()[0]
+            if not before:
+                break
+            # executescript steps the pragma to completion (execute() frees only one page)
+            cur.executescript(f"PRAGMA incremental_vacuum({int(step_pages)})")
+            freed += before - cur.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        raw.close()
+    return freed
+
+
+def run(engine: Engine, retention_days: int, vacuum_slices: int = 20) -> dict:
+    """One compaction pass. Safe to call repeatedly; each step is idempotent."""
+    cutoff = datetime.utcnow() - timedelta(days=max(int(retention_days), 1))
+    result = {
+        "alerts_archived": archive_alerts(engine, cutoff),
+        "transactions_rolled_up": rollup_transactions(engine, cutoff),
+        "pages_freed": 0,
+    }
+    for _ in range(vacuum_slices):
+        freed = incremental_vacuum(engine)
+        if not freed:
+            break
+        result["pages_freed"] += freed
+        time.sleep(VACUUM_BUDGET_S)  # leave the write lock free between slices
+    return result
@@ -0,0 +1,149 @@
+# services/coord.py
+"""
+Coordination between uvicorn worker processes (uvicorn main:app --workers 4).
+
+- Leader election: background jobs (sweeper, sensor writer, compaction,
+  snapshots) run only in the worker holding an exclusive flock on
+  run/leader.lock. The kernel drops the lock when that process dies, and the
+  other workers keep retrying, so one of them takes over within POLL_SECONDS.
+- Signals: tiny files under run/ whose inode/mtime change when something
+  other workers cache has changed. Checking one is a single stat() call.
+
+Without fcntl (Windows dev boxes) every process is the leader, which is right
+for the single-process dev server.
+"""
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+RUN_DIR = Path("run")
+LEADER_LOCK = RUN_DIR / "leader.lock"
+POLL_SECONDS = 5
+
+_leader_fh = None
+
+def _run_dir() -> Path:
+    RUN_DIR.mkdir(exist_ok=True)
+    return RUN_DIR
+
+# ----- leader election -----
+
+def try_lead() -> bool:
+    """Take leadership if nobody holds it. Never blocks."""
+    global _leader_fh
+    if _leader_fh is not None:
+        return True
+    if fcntl is None:
+        _leader_fh = True
+        return True
+    _run_dir()
+    fh = open(LEADER_LOCK, "a+")
+    try:
+        fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fh.close()
+        return False
+    fh.seek(0)
+    fh.truncate()
+    fh.write(str(os.getpid()))
+    fh.flush()
+    _leader_fh = fh
+    return True
+
+def is_leader() -> bool:
+    return _leader_fh is not None
+
+def leader_pid() -> Optional[int]:
+    try:
+        return int(LEADER_LOCK.read_text().strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+def leader_alive() -> bool:
+    """True while some process holds the leader lock, i.e. the service is running."""
+    if _leader_fh is not None:
+        return True
+    if fcntl is None or not LEADER_LOCK.exists():
+        return False
+    with open(LEADER_LOCK, "a+") as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.flock(fh, fcntl.LOCK_UN)
+    return False
+
+async def campaign(on_elected: Callable[[], None]):
+    """Wait until this process is the leader, then call on_elected() once."""
+    while not try_lead():
+        await asyncio.sleep(POLL_SECONDS)
+    on_elected()
+
+@contextmanager
+def exclusive(name: str):
+    """Blocking cross-process mutex (e.g. so only one worker runs schema setup at a time)."""
+    if fcntl is None:
+        yield
+        return
+    with open(_run_dir() / f"{name}.lock", "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+# ----- signals -----
+
+def _signal_path(name: str) -> Path:
+    return _run_dir() / f"{name}.sig"
+
+def bump(name: str):
+    """Tell every worker that `name` changed (atomic replace, so the inode always changes)."""
+    path = _signal_path(name)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(str(time.time()))
+    os.replace(tmp, path)
+
+def touch(name: str):
+    """Mark `name` as active now (liveness, read back with age())."""
+    path = _signal_path(name)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        path.touch()
+
+def age(name: str) -> float:
+    """Seconds since `name` was last bumped/touched (inf if never)."""
+    try:
+        return time.time() - _signal_path(name).stat().st_mtime
+    except FileNotFoundError:
+        return float("inf")
+
+class Watch:
+    """Per-process view of one signal: changed() is True once after every bump elsewhere."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._seen = self._stamp()
+
+    def _stamp(self):
+        try:
+            st = _signal_path(self.name).stat()
+            return st.st_ino, st.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def changed(self) -> bool:
+        stamp = self._stamp()
+        if stamp == self._seen:
+            return False
+        self._seen = stamp
+        return True
@@ -0,0 +1,90 @@
+# services/dialect.py
+"""
+The few places where SQLite and PostgreSQL differ, behind one set of helpers.
+
+SQLite (the Pi default): one file, WAL journal, a single writer.
+PostgreSQL (a central hub serving many units): a pooled engine, real
+concurrent writers; the SQLite-only machinery (FTS5, pragmas, incremental
+vacuum, file snapshots) is either swapped for its Postgres counterpart or
+skipped where Postgres does the job itself (autovacuum, pg_dump).
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+def name(bind) -> str:
+    """Dialect name of an Engine, Connection or Session."""
+    if isinstance(bind, Session):
+        bind = bind.get_bind()
+    return bind.dialect.name
+
+def is_sqlite(bind) -> bool:
+    return name(bind) == "sqlite"
+
+def is_postgres(bind) -> bool:
+    return name(bind) == "postgresql"
+
+def make_engine(url: str, pool_size: int = 5, max_overflow: int = 10) -> Engine:
+    if url.startswith("sqlite"):
+        # timeout: wait for other workers' write locks instead of failing with "database is locked"
+        return create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+    return create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,         # survive hub restarts / dropped links
+        pool_recycle=1800,
+    )
+
+def tune(engine: Engine):
+    """Per-database settings that persist in the database itself."""
+    if is_sqlite(engine):
+        with engine.connect() as conn:
+            # Only takes effect on a file with no tables yet, i.e. when the hub is first set up;
+            # older files are switched by `python migrate.py vacuum` (services/compaction.py)
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            # WAL: readers (snapshots, sync, exports) never block writers. Persists in the DB file.
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+def sqlite_file(engine: Engine) -> Optional[Path]:
+    """The database file for file-level tools (snapshots); None for servers and :memory:."""
+    if not is_sqlite(engine) or not engine.url.database or engine.url.database == ":memory:":
+        return None
+    return Path(engine.url.database)
+
+def describe(engine: Engine) -> str:
+    path = sqlite_file(engine)
+    return str(path.resolve()) if path else engine.url.render_as_string(hide_password=True)
+
+def table_exists(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+def table_columns(conn: Connection, table: str) -> tuple[list[str], list[str]]:
+    """(column names in table order, primary key columns); ([], []) if the table doesn't exist."""
+    insp = inspect(conn)
+    if not insp.has_table(table):
+        return [], []
+    columns = [c["name"] for c in insp.get_columns(table)]
+    pk = insp.get_pk_constraint(table).get("constrained_columns") or []
+    return columns, pk
+
+def ts_param(bind, dt: datetime):
+    """A DateTime bound into hand-written SQL: SQLite compares the text SQLAlchemy stores."""
+    if is_sqlite(bind):
+        return dt.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return dt
+
+def sync_sequence(conn: Connection, table: str, column: str = "id"):
+    """After inserting explicit ids on Postgres, move the serial past them."""
+    if is_postgres(conn):
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence(:t, :c), COALESCE((SELECT MAX({column}) FROM {table}), 1))"
+        ), {"t": table, "c": column})
+
+def lock_for_migration(conn: Connection):
+    """Serialize schema changes across hosts (Postgres); SQLite relies on coord.exclusive()."""
+    if is_postgres(conn):
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('space-freezer-migrations'))"))
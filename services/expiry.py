@@ -1,6 +1,7 @@
 # services/expiry.py
-from datetime import date
+from datetime import date, timedelta
 from typing import Literal, Optional
+from config import EXPIRY_SOON_DAYS as SOON_DAYS, EXPIRY_URGENT_DAYS as URGENT_DAYS
 
 Status = Literal["no_date","ok","soon","urgent","expired"]
 
@@ -10,8 +11,21 @@ def expiry_status(expiration_date: Optional[date], today: date) -> tuple[Status,
     delta = (expiration_date - today).days
     if delta < 0:
         return "expired", delta
-    if delta <= 2:
+    if delta <= URGENT_DAYS:
         return "urgent", delta
-    if delta <= 7:
+    if delta <= SOON_DAYS:
         return "soon", delta
     return "ok", delta
+
+def next_transition(expiration_date: Optional[date], today: date) -> Optional[date]:
+    """First day after `today` on which expiry_status changes (None once expired / undated)."""
+    if not expiration_date:
+        return None
+    delta = (expiration_date - today).days
+    if delta > SOON_DAYS:
+        return expiration_date - timedelta(days=SOON_DAYS)      # ok -> soon
+    if delta > URGENT_DAYS:
+        return expiration_date - timedelta(days=URGENT_DAYS)    # soon -> urgent
+    if delta >= 0:
+        return expiration_date + timedelta(days=1)              # urgent -> expired
+    return None
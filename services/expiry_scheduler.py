@@ -0,0 +1,211 @@
+# services/expiry_scheduler.py
+"""
+Event-driven expiry alerts.
+
+An item's expiry status only changes at local midnight on three known days
+(ok -> soon, soon -> urgent, urgent -> expired), so instead of re-reading every
+item on a timer we keep a min-heap of each item's next transition and sleep
+until the earliest one. Items created/deleted in this process are re-evaluated
+immediately; changes made by other worker processes arrive through the
+"items-created" and "items" (deletes) signals (services/coord.py), which cost
+one stat() each per SIGNAL_POLL_SECONDS. Statuses change by the day, so picking
+those up within a minute is plenty. A create only reads the new rows; a delete
+re-reads every item's expiry date.
+
+One alert is raised per transition. The item's previous inventory alert is
+resolved when a new one supersedes it, or when the item is back to ok.
+"""
+import asyncio
+import heapq
+import logging
+import threading
+from datetime import date, datetime, time as dtime
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+from models import Item, Alert
+from services import coord, profiler
+from services.expiry import expiry_status, next_transition
+from services.scan import ITEMS_SIGNAL, ITEMS_CREATED_SIGNAL, CREATED_OVERLAP
+
+SIGNAL_POLL_SECONDS = 60
+BATCH = 500
+
+log = logging.getLogger(__name__)
+
+_SEVERITY = {"soon": "info", "urgent": "warning", "expired": "critical"}
+
+def _message(name: str, status: str, days: int) -> str:
+    if status == "expired":
+        return f"'{name}' is EXPIRED (expired {abs(days)} day(s) ago)."
+    return f"'{name}' expires in {days} day(s)."
+
+def evaluate(db: Session, item_ids: list[int], today: date) -> dict[int, Optional[date]]:
+    """
+    Bring the inventory alerts of these items in line with their current status.
+    Two queries per batch (items, their open alerts). Returns id -> expiration_date
+    for the items that still exist.
+    """
+    found = {}
+    now = datetime.utcnow()
+    for i in range(0, len(item_ids), BATCH):
+        chunk = item_ids[i:i + BATCH]
+        items = db.query(Item.id, Item.name, Item.expiration_date, Item.freezer_id).filter(Item.id.in_(chunk)).all()
+        open_alerts: dict[int, list[Alert]] = {}
+        for a in db.query(Alert).filter(
+            Alert.item_id.in_(chunk),
+            Alert.type == "inventory",
+            Alert.resolved_at.is_(None),
+        ):
+            open_alerts.setdefault(a.item_id, []).append(a)
+
+        for it in items:
+            found[it.id] = it.expiration_date
+            status, days = expiry_status(it.expiration_date, today)
+            severity = _SEVERITY.get(status)
+            current = open_alerts.get(it.id, [])
+            for a in current:
+                if a.severity != severity:
+                    a.resolved_at = now          # back to ok, or superseded by the new status
+            if severity and not any(a.severity == severity for a in current):
+                db.add(Alert(
+                    type="inventory", severity=severity,
+                    message=_message(it.name, status, days),
+                    item_id=it.id, freezer_id=it.freezer_id,
+                ))
+    db.commit()
+    return found
+
+class ExpiryScheduler:
+    def __init__(self):
+        self._heap: list[tuple[datetime, int]] = []
+        self._due: dict[int, datetime] = {}            # live heap entry per item; others are stale
+        self._expiry: dict[int, Optional[date]] = {}   # last expiration_date seen per item
+        self._pending: set[int] = set()
+        self._lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_item_id = 0                          # highest item id read
+        self._items_changed = coord.Watch(ITEMS_SIGNAL)
+        self._items_created = coord.Watch(ITEMS_CREATED_SIGNAL)
+
+    # --- heap ---
+
+    def _schedule(self, item_id: int, expiration_date: Optional[date], today: date):
+        self._expiry[item_id] = expiration_date
+        nxt = next_transition(expiration_date, today)
+        if nxt is None:
+            self._due.pop(item_id, None)
+            return
+        due = datetime.combine(nxt, dtime.min)
+        self._due[item_id] = due
+        heapq.heappush(self._heap, (due, item_id))
+
+    def _remove(self, item_id: int):
+        self._due.pop(item_id, None)
+        self._expiry.pop(item_id, None)
+
+    def _pop_due(self, now: datetime) -> set[int]:
+        out = set()
+        while self._heap and self._heap[0][0] <= now:
+            due, item_id = heapq.heappop(self._heap)
+            if self._due.get(item_id) == due:
+                del self._due[item_id]
+                out.add(item_id)
+        return out
+
+    def next_due(self) -> Optional[datetime]:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)                  # drop stale entries lazily
+        return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return len(self._due)
+
+    # --- notifications (any thread) ---
+
+    def item_changed(self, item_id: int):
+        """Re-evaluate this item now (created, edited or deleted in this process)."""
+        if self._loop is None:
+            return          # not the leader: the scheduler's process hears of it via the signals
+        with self._lock:
+            self._pending.add(item_id)
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    # --- loop ---
+
+    def _reload(self, session_factory: Callable[[], Session]) -> set[int]:
+        """Diff item expiries against what's scheduled; returns ids needing evaluation."""
+        db = session_factory()
+        try:
+            rows = db.query(Item.id, Item.expiration_date).all()
+        finally:
+            db.close()
+        current = dict(rows)
+        for gone in set(self._expiry) - set(current):
+            self._remove(gone)
+        self._last_item_id = max(current, default=0)
+        return {i for i, exp in current.items() if i not in self._expiry or self._expiry[i] != exp}
+
+    def _catch_up(self, session_factory: Callable[[], Session]) -> set[int]:
+        """Items created since the last read; returns ids needing evaluation."""
+        db = session_factory()
+        try:
+            rows = db.query(Item.id, Item.expiration_date).filter(
+                Item.id > self._last_item_id - CREATED_OVERLAP).all()
+        finally:
+            db.close()
+        self._last_item_id = max([self._last_item_id, *(i for i, _ in rows)])
+        return {i for i, exp in rows if i not in self._expiry or self._expiry[i] != exp}
+
+    def _evaluate(self, session_factory: Callable[[], Session], ids: set[int]) -> dict:
+        db = session_factory()
+        try:
+            return evaluate(db, sorted(ids), date.today())
+        finally:
+            db.close()
+
+    async def run(self, session_factory: Callable[[], Session]):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        with self._lock:
+            self._pending |= await asyncio.to_thread(self._reload, session_factory)
+
+        while True:
+            self._wake.clear()
+            ids: set[int] = set()
+            with profiler.scope("task:expiry"):
+                try:
+                    changed = set()
+                    if self._items_changed.changed():
+                        self._items_created.changed()  # the reload covers creates too
+                        changed = await asyncio.to_thread(self._reload, session_factory)
+                    elif self._items_created.changed():
+                        changed = await asyncio.to_thread(self._catch_up, session_factory)
+                    with self._lock:
+                        self._pending |= changed
+                    with self._lock:
+                        ids, self._pending = self._pending, set()
+                    ids |= self._pop_due(datetime.now())
+                    if ids:
+                        found = await asyncio.to_thread(self._evaluate, session_factory, ids)
+                        today = date.today()
+                        for item_id in ids:
+                            if item_id in found:
+                                self._schedule(item_id, found[item_id], today)
+                            else:
+                                self._remove(item_id)
+                except Exception:
+                    log.exception("expiry pass failed; retrying %d item(s) on the next wakeup", len(ids))
+                    with self._lock:
+                        self._pending |= ids           # retry on the next wakeup
+
+            timeout = SIGNAL_POLL_SECONDS
+            due = self.next_due()
+            if due is not None:
+                timeout = max(0.0, min(timeout, (due - datetime.now()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+scheduler = ExpiryScheduler()
@@ -0,0 +1,260 @@
+# services/export.py
+"""
+Streaming full-history exports (GET /export/{dataset}).
+
+Tables are read in keyset-paginated chunks (WHERE pk > last ORDER BY pk LIMIT
+CHUNK_ROWS), each chunk on a short-lived connection, so an export of millions
+of rows holds at most one chunk in memory and never pins a connection or a
+read transaction between chunks. Telemetry comes from the sealed archive
+segments, then the staging file, then the live CSV, in time order; rows are
+copied from one to the next before being removed, so each source only
+contributes what is newer than the last row of the ones before it.
+
+Each chunk is encoded (CSV, NDJSON or a Parquet row group) and optionally
+run through one streaming gzip compressor before it is yielded.
+"""
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, select, tuple_
+from sqlalchemy.engine import Engine
+from models import Item, Transaction, TransactionDaily, Alert, AlertArchive, DEFAULT_FREEZER_ID
+from services import archive as archive_svc
+from services import freezers as freezers_svc
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: parquet exports need pyarrow
+    pa = pq = None
+
+CHUNK_ROWS = 5000
+FORMATS = ("csv", "ndjson", "parquet")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+TELEMETRY = ("temperature", "power")
+
+@dataclass
+class Table:
+    model: type
+    time_column: str                 # what from/to filter on
+    freezer_filter: Optional[Callable] = None
+
+    @property
+    def columns(self):
+        return list(self.model.__table__.columns)
+
+    @property
+    def key(self):
+        return list(self.model.__table__.primary_key.columns)
+
+TABLES = {
+    "items": Table(Item, "date_added", lambda fid: Item.freezer_id == fid),
+    "transactions": Table(Transaction, "timestamp",
+                          lambda fid: Transaction.item_id.in_(select(Item.id).where(Item.freezer_id == fid))),
+    "transactions_daily": Table(TransactionDaily, "day",
+                                lambda fid: TransactionDaily.item_id.in_(select(Item.id).where(Item.freezer_id == fid))),
+    "alerts": Table(Alert, "created_at", lambda fid: Alert.freezer_id == fid),
+    "alerts_archive": Table(AlertArchive, "created_at", lambda fid: AlertArchive.freezer_id == fid),
+}
+
+def datasets() -> list[str]:
+    return [*TABLES, *TELEMETRY]
+
+def _naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+# ----- row sources: each yields one list of row tuples per chunk -----
+
+def table_chunks(engine: Engine, name: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 freezer_id: Optional[int] = None, chunk_rows: int = CHUNK_ROWS) -> Iterator[list[tuple]]:
+    t = TABLES[name]
+    cols, key = t.columns, t.key
+    time_col = t.model.__table__.columns[t.time_column]
+    start, end = _naive_utc(start), _naive_utc(end)
+    if isinstance(time_col.type, Date) and not isinstance(time_col.type, DateTime):
+        start, end = start and start.date(), end and end.date()
+
+    base = select(*cols)
+    if start is not None:
+        base = base.where(time_col >= start)
+    if end is not None:
+        base = base.where(time_col < end)
+    if freezer_id is not None and t.freezer_filter is not None:
+        base = base.where(t.freezer_filter(freezer_id))
+    base = base.order_by(*key).limit(chunk_rows)
+
+    key_idx = [cols.index(k) for k in key]
+    last = None
+    while True:
+        stmt = base
+        if last is not None:
+            stmt = stmt.where(key[0] > last[0] if len(key) == 1 else tuple_(*key) > tuple_(*last))
+        with engine.connect() as conn:
+            rows = conn.execute(stmt).all()
+        if not rows:
+            return
+        yield [tuple(r) for r in rows]
+        if len(rows) < chunk_rows:
+            return
+        last = [rows[-1][i] for i in key_idx]
+
+def telemetry_chunks(metric: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     freezer_id: Optional[int] = None, chunk_rows: int = CHUNK_ROWS) -> Iterator[list[tuple]]:
+    fid = freezer_id if freezer_id is not None else DEFAULT_FREEZER_ID
+    lo = archive_svc.to_ms(start.isoformat()) if start else None
+    hi = archive_svc.to_ms(end.isoformat()) - 1 if end else None
+    name = freezers_svc.archive_metric(metric, fid)
+
+    def in_range(ms):
+        return (lo is None or ms >= lo) and (hi is None or ms <= hi)
+
+    def csv_samples(path: Path):
+        if not path.exists():
+            return
+        with open(path, newline="") as fh:
+            for row in csv.reader(fh):
+                try:
+                    ms, value = archive_svc.to_ms(row[0]), float(row[1])
+                except (ValueError, IndexError):
+                    continue          # header / partial line
+                if in_range(ms):
+                    yield ms, value
+
+    def sources():
+        if name in archive_svc.list_metrics():
+            yield archive_svc.query(name, lo, hi)
+        yield csv_samples(archive_svc.ARCHIVE_DIR / name / "staging.csv")
+        yield csv_samples(Path(freezers_svc.data_file(metric, fid)))
+
+    def samples():
+        newest = None               # last timestamp of the earlier sources
+        for source in sources():
+            seen = newest
+            for ms, value in source:
+                if newest is None or ms > newest:
+                    yield ms, value
+                    seen = ms if seen is None else max(seen, ms)
+            newest = seen
+
+    chunk = []
+    for ms, value in samples():
+        chunk.append((datetime.fromtimestamp(ms / 1000, tz=timezone.utc).replace(tzinfo=None), value))
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def fields(dataset: str) -> list[str]:
+    if dataset in TELEMETRY:
+        return ["timestamp", dataset]
+    return [c.name for c in TABLES[dataset].columns]
+
+def chunks(engine: Engine, dataset: str, start=None, end=None, freezer_id=None) -> Iterator[list[tuple]]:
+    if dataset in TELEMETRY:
+        return telemetry_chunks(dataset, start, end, freezer_id)
+    return table_chunks(engine, dataset, start, end, freezer_id)
+
+# ----- encoders -----
+
+def _text(v):
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    return v
+
+def encode_csv(names: list[str], row_chunks: Iterator[list[tuple]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(names)
+    for rows in row_chunks:
+        w.writerows([[_text(v) for v in r] for r in rows])
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+def encode_ndjson(names: list[str], row_chunks: Iterator[list[tuple]]) -> Iterator[bytes]:
+    dumps = json.JSONEncoder(default=_text, separators=(",", ":")).encode
+    for rows in row_chunks:
+        yield "".join(dumps(dict(zip(names, r))) + "\n" for r in rows).encode()
+
+_ARROW_TYPES = (
+    (Boolean, lambda: pa.bool_()),
+    (Integer, lambda: pa.int64()),
+    (Float, lambda: pa.float64()),
+    (DateTime, lambda: pa.timestamp("us")),
+    (Date, lambda: pa.date32()),
+)
+
+def arrow_schema(dataset: str):
+    if dataset in TELEMETRY:
+        return pa.schema([("timestamp", pa.timestamp("us")), (dataset, pa.float64())])
+    out = []
+    for c in TABLES[dataset].columns:
+        typ = next((make() for sa_type, make in _ARROW_TYPES if isinstance(c.type, sa_type)), pa.string())
+        out.append((c.name, typ))
+    return pa.schema(out)
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands over what was written since the last drain()."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self) -> bytes:
+        out, self._parts = b"".join(self._parts), []
+        return out
+
+def encode_parquet(dataset: str, row_chunks: Iterator[list[tuple]]) -> Iterator[bytes]:
+    """One row group per chunk, flushed to the client as soon as it is written."""
+    schema = arrow_schema(dataset)
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in row_chunks:
+            cols = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=f.type) for col, f in zip(cols, schema)], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def gzipped(parts: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)      # wbits 31 = gzip container
+    for part in parts:
+        out = z.compress(part)
+        if out:
+            yield out
+    yield z.flush()
+
+def stream(engine: Engine, dataset: str, fmt: str, start=None, end=None,
+           freezer_id=None, gzip: bool = False) -> Iterator[bytes]:
+    row_chunks = chunks(engine, dataset, start, end, freezer_id)
+    if fmt == "csv":
+        parts = encode_csv(fields(dataset), row_chunks)
+    elif fmt == "ndjson":
+        parts = encode_ndjson(fields(dataset), row_chunks)
+    else:
+        parts = encode_parquet(dataset, row_chunks)
+    return gzipped(parts) if gzip else parts
@@ -0,0 +1,206 @@
+# services/forecast.py
+"""
+Time-to-threshold forecast from a first-order thermal model.
+
+With the compressor off, a cabinet approaches ambient exponentially:
+
+    T(t) = A + C * exp(-k * (t - t0))
+
+For a fixed k this is linear in (A, C), so instead of an iterative nonlinear
+fit we keep least-squares sufficient statistics for a whole grid of k values
+at once (numpy arrays, one slot per k) and pick the k with the lowest residual.
+Adding or evicting a sample is one vectorized update, so the model refits on
+every reading at a cost that doesn't depend on how much history is in the window.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+WINDOW_SECONDS = 3600               # history the fit looks at
+MIN_SAMPLES = 8
+MIN_SPAN_S = 300                    # shorter histories can't tell a trend from noise
+TAU_GRID_S = np.geomspace(600, 48 * 3600, 64)   # 10 min .. 48 h time constants
+_K = 1.0 / TAU_GRID_S
+
+class ThermalFit:
+    def __init__(self, window_s: float = WINDOW_SECONDS):
+        self.window_s = window_s
+        self.samples: deque = deque()
+        self.t0: Optional[float] = None
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.n = 0
+        self.sy = self.syy = 0.0
+        self.se = np.zeros_like(_K)
+        self.see = np.zeros_like(_K)
+        self.sey = np.zeros_like(_K)
+
+    def _fold(self, t: float, y: float, sign: float):
+        e = np.exp(-_K * (t - self.t0))
+        self.n += int(sign)
+        self.sy += sign * y
+        self.syy += sign * y * y
+        self.se += sign * e
+        self.see += sign * e * e
+        self.sey += sign * e * y
+
+    def _refold(self):
+        # Re-anchor t0 at the oldest sample and recompute the sums in one vectorized pass.
+        # Done every quarter window, so evicting a sample never subtracts a term that is
+        # many orders of magnitude larger than what's left (fast-decay k's lose all precision).
+        t = np.fromiter((s[0] for s in self.samples), dtype=float, count=len(self.samples))
+        y = np.fromiter((s[1] for s in self.samples), dtype=float, count=len(self.samples))
+        self.t0 = float(t[0])
+        e = np.exp(-np.outer(_K, t - self.t0))
+        self.n = len(t)
+        self.sy, self.syy = float(y.sum()), float(y @ y)
+        self.se, self.see, self.sey = e.sum(axis=1), (e * e).sum(axis=1), e @ y
+
+    def add(self, t: float, y: float):
+        if self.samples and t <= self.samples[-1][0]:
+            return
+        if self.t0 is None:
+            self.t0 = t
+        self.samples.append((t, y))
+        self._fold(t, y, 1.0)
+        while self.samples and self.samples[0][0] < t - self.window_s:
+            old_t, old_y = self.samples.popleft()
+            self._fold(old_t, old_y, -1.0)
+        if self.samples[0][0] - self.t0 > self.window_s / 4:
+            self._refold()
+
+    def extend(self, ts: Iterable[float], ys: Iterable[float]):
+        """Bulk load (e.g. from the live CSV after a restart) in one vectorized pass."""
+        rows = sorted(zip(ts, ys))
+        if not rows:
+            return
+        horizon = rows[-1][0] - self.window_s
+        self.samples = deque((t, y) for t, y in rows if t >= horizon)
+        self._refold()
+
+    def solve(self) -> Optional[dict]:
+        if self.n < MIN_SAMPLES or self.samples[-1][0] - self.samples[0][0] < MIN_SPAN_S:
+            return None
+        n = self.n
+        # Centered normal equations; the raw 2x2 form cancels badly when e(t) is nearly linear
+        mean_e, mean_y = self.se / n, self.sy / n
+        var_e = self.see / n - mean_e ** 2
+        cov = self.sey / n - mean_e * mean_y
+        var_y = self.syy / n - mean_y ** 2
+        ok = var_e > 1e-15
+        if not ok.any():
+            return None
+        var_e = np.where(ok, var_e, np.nan)
+        c = cov / var_e
+        a = mean_y - c * mean_e
+        sse = n * (var_y - cov * c)
+        i = int(np.nanargmin(sse))
+        return {
+            "ambient_c": float(a[i]),
+            "c": float(c[i]),
+            "k": float(_K[i]),
+            "t0": self.t0,
+            "rmse": math.sqrt(max(float(sse[i]), 0.0) / n),
+            "samples": n,
+        }
+
+def predict(model: dict, t: float) -> float:
+    return model["ambient_c"] + model["c"] * math.exp(-model["k"] * (t - model["t0"]))
+
+def time_to(model: dict, now: float, threshold: float, upper: bool = True) -> Optional[float]:
+    """
+    Seconds from `now` until the fitted curve goes above (upper) / below a threshold.
+    0 if it already has, None if the curve levels off before reaching it.
+    """
+    current = predict(model, now)
+    a, c, k = model["ambient_c"], model["c"], model["k"]
+    if (current >= threshold) if upper else (current <= threshold):
+        return 0.0
+    if (a <= threshold) if upper else (a >= threshold):
+        return None
+    t = model["t0"] - math.log((threshold - a) / c) / k
+    return max(0.0, t - now)
+
+def forecast(fit: ThermalFit, thresholds: dict[str, tuple[float, bool]], now: Optional[float] = None,
+             horizon_s: float = 4 * 3600, step_s: float = 300) -> dict:
+    """thresholds: name -> (value, upper); upper thresholds are crossed going up."""
+    model = fit.solve()
+    if model is None:
+        return {"status": "insufficient_data", "samples": fit.n}
+    now = fit.samples[-1][0] if now is None else now
+    current = predict(model, now)
+
+    crossings = {}
+    for name, (value, upper) in thresholds.items():
+        secs = time_to(model, now, value, upper)
+        crossings[name] = {
+            "value": value,
+            "minutes": None if secs is None else round(secs / 60, 1),
+            "at": None if secs is None else _iso(now + secs),
+        }
+
+    steps = int(horizon_s // step_s) + 1
+    ts = now + np.arange(steps) * step_s
+    curve = model["ambient_c"] + model["c"] * np.exp(-model["k"] * (ts - model["t0"]))
+    return {
+        "status": "ok",
+        "samples": model["samples"],
+        "current_c": round(current, 3),
+        "trend": "warming" if model["ambient_c"] > current else "cooling",
+        "model": {
+            "ambient_c": round(model["ambient_c"], 3),
+            "tau_min": round(1 / model["k"] / 60, 1),
+            "rmse_c": round(model["rmse"], 4),
+        },
+        "thresholds": crossings,
+        "curve": [{"timestamp": _iso(t), "temperature": round(float(v), 3)}
+                  for t, v in zip(ts.tolist(), curve.tolist())],
+    }
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+# ----- live registry: one fit per freezer, refit on every reading -----
+# With several workers each one only observes the readings posted to it, so the
+# CSV is the shared record: when it was written after this worker's last seed
+# and last observed reading, the fit is rebuilt from it.
+
+_lock = threading.Lock()
+_fits: dict[int, ThermalFit] = {}
+_fresh_at: dict[int, float] = {}     # wall time the fit last caught up (seed or observe)
+
+def observe(freezer_id: int, ts: float, value: float):
+    with _lock:
+        fit = _fits.get(freezer_id)
+        if fit is None:
+            fit = _fits[freezer_id] = ThermalFit()
+        fit.add(ts, value)
+        _fresh_at[freezer_id] = time.time()
+
+def _mtime(path: Optional[str]) -> float:
+    try:
+        return os.path.getmtime(path) if path else 0.0
+    except OSError:
+        return 0.0
+
+def run(freezer_id: int, thresholds: dict[str, tuple[float, bool]],
+        history: Optional[Callable[[], Iterable[tuple[float, float]]]] = None,
+        source: Optional[str] = None, **kwargs) -> dict:
+    """Forecast for one unit; the fit is (re)seeded from history() when `source` changed behind it."""
+    with _lock:
+        fit = _fits.get(freezer_id)
+        if fit is None or (history and _mtime(source) > _fresh_at.get(freezer_id, 0.0)):
+            started = time.time()
+            fit = _fits[freezer_id] = ThermalFit()
+            rows = list(history()) if history else []
+            if rows:
+                fit.extend((t for t, _ in rows), (v for _, v in rows))
+            _fresh_at[freezer_id] = started
+        return forecast(fit, thresholds, **kwargs)
@@ -0,0 +1,29 @@
+# services/freezers.py
+from sqlalchemy.orm import Session
+from models import Freezer, DEFAULT_FREEZER_ID
+
+# Per-unit sensor streams: unit 1 keeps the original file names, so single-freezer
+# installs (and arduino_serial_reader.py defaults) are unchanged.
+def data_file(metric: str, freezer_id: int = DEFAULT_FREEZER_ID) -> str:
+    if freezer_id == DEFAULT_FREEZER_ID:
+        return f"{metric}_data.csv"
+    return f"{metric}_data_f{freezer_id}.csv"
+
+def archive_metric(metric: str, freezer_id: int = DEFAULT_FREEZER_ID) -> str:
+    if freezer_id == DEFAULT_FREEZER_ID:
+        return metric
+    return f"{metric}_f{freezer_id}"
+
+def list_ids(db: Session) -> list[int]:
+    return [fid for (fid,) in db.query(Freezer.id).order_by(Freezer.id)]
+
+def exists(db: Session, freezer_id: int) -> bool:
+    return db.query(Freezer.id).filter(Freezer.id == freezer_id).first() is not None
+
+def as_dict(f: Freezer) -> dict:
+    return {
+        "id": f.id,
+        "name": f.name,
+        "module": f.module,
+        "created_at": f.created_at.isoformat() if f.created_at else None,
+    }
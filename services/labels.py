@@ -0,0 +1,148 @@
+# services/labels.py
+"""
+Multi-up label sheets: barcode, name and expiry for many items on one canvas.
+
+Code128 module patterns come from python-barcode (no per-item image files);
+each symbol is rasterized once - a single row of bars stretched to height - and
+cached, so reprinting the same items reuses it. Labels are pasted onto one
+bilevel canvas per page; pages go out as a multi-page PDF or stacked into
+one tall PNG.
+"""
+import io
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+import barcode
+from PIL import Image, ImageDraw, ImageFont
+
+MM_PER_INCH = 25.4
+
+@dataclass
+class SheetLayout:
+    dpi: int = 300
+    page_mm: tuple = (210.0, 297.0)      # A4
+    margin_mm: float = 8.0
+    columns: int = 3
+    rows: int = 10                       # 30-up, like common A4 address label stock
+    module_px: int = 2                   # narrowest bar width
+    quiet_modules: int = 10              # Code128 quiet zone on each side
+
+    def px(self, mm: float) -> int:
+        return round(mm / MM_PER_INCH * self.dpi)
+
+@dataclass
+class Label:
+    code: str
+    name: str
+    expiration_date: Optional[date] = None
+
+@lru_cache(maxsize=4096)
+def code128_modules(code: str) -> str:
+    """'1'/'0' per module, bars and spaces, without the quiet zone."""
+    return barcode.get("code128", code).build()[0]
+
+@lru_cache(maxsize=2048)
+def symbol(code: str, module_px: int, height_px: int) -> Image.Image:
+    """Rasterized Code128 symbol (mode '1', black bars), cached per code and size."""
+    modules = code128_modules(code)
+    # One row of pixels: 0x00 = bar (black), 0xff = space
+    row = bytes(0 if m == "1" else 255 for m in modules for _ in range(module_px))
+    line = Image.frombytes("L", (len(row), 1), row)
+    return line.resize((len(row), height_px), Image.NEAREST).convert("1")
+
+@lru_cache(maxsize=8)
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except (TypeError, OSError):           # Pillow without FreeType: fixed bitmap font
+        return ImageFont.load_default()
+
+def _line_h(size: int) -> int:
+    return _font(size).getbbox("Ag")[3]
+
+@lru_cache(maxsize=4096)
+def _glyph(size: int, ch: str):
+    """(mask or None, advance, offset) for one character; rasterized once per font size."""
+    font = _font(size)
+    left, top, right, bottom = font.getbbox(ch)
+    advance = font.getlength(ch)
+    if right <= left or bottom <= top:
+        return None, advance, (0, 0)
+    mask = Image.new("1", (right - left, bottom - top), 0)
+    ImageDraw.Draw(mask).text((-left, -top), ch, font=font, fill=1)
+    return mask, advance, (left, top)
+
+def _draw_text(page: Image.Image, x: int, y: int, text: str, size: int, max_w: int):
+    """
+    Compose text from cached glyphs (no kerning - fine for labels). Rasterizing each
+    string with FreeType cost more than the rest of the sheet put together.
+    """
+    ellipsis = _glyph(size, "…")[1]
+    width, cut = 0.0, len(text)
+    for i, ch in enumerate(text):
+        width += _glyph(size, ch)[1]
+        if width > max_w:
+            cut = i
+            while cut and sum(_glyph(size, c)[1] for c in text[:cut]) + ellipsis > max_w:
+                cut -= 1
+            text = text[:cut] + "…"
+            break
+    pen = float(x)
+    for ch in text:
+        mask, advance, (left, top) = _glyph(size, ch)
+        if mask is not None:
+            page.paste(0, (round(pen) + left, y + top), mask)
+        pen += advance
+
+def render_pages(labels: list[Label], layout: SheetLayout) -> list[Image.Image]:
+    page_w, page_h = layout.px(layout.page_mm[0]), layout.px(layout.page_mm[1])
+    margin = layout.px(layout.margin_mm)
+    cell_w = (page_w - 2 * margin) // layout.columns
+    cell_h = (page_h - 2 * margin) // layout.rows
+    pad = max(4, cell_h // 16)
+    name_size, small_size = max(10, cell_h // 7), max(8, cell_h // 9)
+    name_h, small_h = _line_h(name_size), _line_h(small_size)
+    text_h = name_h + small_h + 2 * pad
+    bar_h = max(10, cell_h - text_h - 2 * pad)
+    quiet = layout.quiet_modules * layout.module_px
+    per_page = layout.columns * layout.rows
+
+    pages = []
+    for start in range(0, len(labels), per_page):
+        page = Image.new("1", (page_w, page_h), 1)
+        for i, label in enumerate(labels[start:start + per_page]):
+            x = margin + (i % layout.columns) * cell_w
+            y = margin + (i // layout.columns) * cell_h
+            # Shrink the module width for long codes so the symbol still fits the cell
+            module_px = layout.module_px
+            while module_px > 1 and len(code128_modules(label.code)) * module_px + 2 * quiet > cell_w:
+                module_px -= 1
+            sym = symbol(label.code, module_px, bar_h)
+            page.paste(sym, (x + max(quiet, (cell_w - sym.width) // 2), y + pad))
+
+            ty = y + pad + bar_h + pad // 2
+            _draw_text(page, x + pad, ty, label.name, name_size, cell_w - 2 * pad)
+            exp = f"EXP {label.expiration_date.isoformat()}" if label.expiration_date else "EXP -"
+            _draw_text(page, x + pad, ty + name_h + 2, f"{exp}   {label.code}", small_size, cell_w - 2 * pad)
+        pages.append(page)
+    return pages
+
+def render_sheet(labels: list[Label], layout: Optional[SheetLayout] = None, fmt: str = "pdf") -> bytes:
+    layout = layout or SheetLayout()
+    pages = render_pages(labels, layout)
+    if not pages:
+        pages = [Image.new("1", (layout.px(layout.page_mm[0]), layout.px(layout.page_mm[1])), 1)]
+    buf = io.BytesIO()
+    if fmt == "pdf":
+        pages[0].save(buf, format="PDF", resolution=layout.dpi, save_all=True, append_images=pages[1:])
+    else:
+        if len(pages) > 1:
+            tall = Image.new("1", (pages[0].width, pages[0].height * len(pages)), 1)
+            for n, p in enumerate(pages):
+                tall.paste(p, (0, n * p.height))
+            pages = [tall]
+        # Fast zlib level: bilevel pages compress well anyway, and level 6 doubles the encode time
+        pages[0].save(buf, format="PNG", compress_level=1, dpi=(layout.dpi, layout.dpi))
+    return buf.getvalue()
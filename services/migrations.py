@@ -0,0 +1,148 @@
+# services/migrations.py
+"""
+Versioned schema migrations, for SQLite and PostgreSQL alike.
+
+Each migration is a (version, description, function) and runs exactly once,
+in its own transaction together with its row in `schema_migrations`. New
+schema changes are appended to MIGRATIONS with the next version number and
+written with SQLAlchemy constructs or SQL valid on both dialects (or branch on
+services.dialect). Derived objects that are rebuilt from the live schema on
+every start (search index, replication triggers) are not migrations.
+
+    python migrate.py status
+    python migrate.py upgrade
+"""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from services import dialect
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def _column_names(conn: Connection, table: str) -> set[str]:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+def _add_columns(conn: Connection, table: str, columns: dict[str, str]):
+    """ALTER TABLE ... ADD COLUMN for each column the table doesn't have yet."""
+    if not dialect.table_exists(conn, table):
+        return
+    have = _column_names(conn, table)
+    for col, ddl in columns.items():
+        if col not in have:
+            conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN "{col}" {ddl}')
+
+# ----- migrations -----
+
+def _m1_initial_schema(conn: Connection):
+    # Fresh databases get the whole current schema here (later steps then find nothing to do);
+    # pre-existing ones only gain the tables they lack
+    from models import Base
+    Base.metadata.create_all(bind=conn)
+
+def _m2_item_nutrition(conn: Connection):
+    from models import Item
+    cols = ("serving_size", "calories", "protein", "carbs", "fat", "fiber", "sodium", "sugar")
+    _add_columns(conn, "items", {c: Item.__table__.c[c].type.compile(dialect=conn.dialect) for c in cols})
+
+def _m3_multi_freezer(conn: Connection):
+    # Existing data belongs to the original (only) unit
+    conn.execute(text(
+        "INSERT INTO freezers (id, name, created_at) SELECT 1, 'Freezer 1', :now "
+        "WHERE NOT EXISTS (SELECT 1 FROM freezers WHERE id = 1)"
+    ), {"now": datetime.utcnow()})
+    dialect.sync_sequence(conn, "freezers")
+    ref = "INTEGER NOT NULL DEFAULT 1 REFERENCES freezers(id)"
+    _add_columns(conn, "items", {"freezer_id": ref})
+    _add_columns(conn, "alerts", {"freezer_id": ref})
+    _add_columns(conn, "alerts_archive", {"freezer_id": "INTEGER"})
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_items_freezer_expiration ON items (freezer_id, expiration_date)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_alerts_freezer_open ON alerts (freezer_id, resolved_at)")
+
+def _m4_power_energy(conn: Connection):
+    # Energy totals move from the per-process power_state.json into the database
+    import json
+    from models import PowerEnergy
+    from services.power import STATE_FILE
+    PowerEnergy.__table__.create(bind=conn, checkfirst=True)
+    try:
+        saved = json.loads(STATE_FILE.read_text()) if STATE_FILE.exists() else {}
+    except (OSError, ValueError):
+        saved = {}
+    for fid, state in saved.items():
+        conn.execute(text(
+            "INSERT INTO power_energy (freezer_id, energy_wh) SELECT :fid, :wh "
+            "WHERE EXISTS (SELECT 1 FROM freezers WHERE id = :fid) "
+            "AND NOT EXISTS (SELECT 1 FROM power_energy WHERE freezer_id = :fid)"
+        ), {"fid": int(fid), "wh": float(state.get("energy_wh", 0.0))})
+
+def _m5_transactions_autoincrement(conn: Connection):
+    # SQLite reuses the ids of deleted rows unless the table is AUTOINCREMENT, and
+    # that needs a rebuild; PostgreSQL sequences never go backwards anyway
+    if not dialect.is_sqlite(conn):
+        return
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions'")).scalar()
+    if sql is None or "AUTOINCREMENT" in sql.upper():
+        return
+    from models import Transaction
+    for ix in inspect(conn).get_indexes("transactions"):
+        conn.exec_driver_sql(f'DROP INDEX "{ix["name"]}"')
+    conn.exec_driver_sql("ALTER TABLE transactions RENAME TO transactions_old")
+    Transaction.__table__.create(bind=conn)
+    cols = ", ".join(c for c in Transaction.__table__.c.keys() if c in _column_names(conn, "transactions_old"))
+    conn.exec_driver_sql(f"INSERT INTO transactions ({cols}) SELECT {cols} FROM transactions_old")
+    conn.exec_driver_sql("DROP TABLE transactions_old")
+
+def _m6_anomaly_state(conn: Connection):
+    from models import AnomalyState
+    AnomalyState.__table__.create(bind=conn, checkfirst=True)
+
+MIGRATIONS = [
+    (1, "initial schema", _m1_initial_schema),
+    (2, "nutrition columns on items", _m2_item_nutrition),
+    (3, "multi-freezer partitioning", _m3_multi_freezer),
+    (4, "shared power energy totals", _m4_power_energy),
+    (5, "monotonic transaction ids", _m5_transactions_autoincrement),
+    (6, "shared anomaly detector state", _m6_anomaly_state),
+]
+
+# ----- runner -----
+
+def applied(engine: Engine) -> dict[int, dict]:
+    with engine.connect() as conn:
+        if not dialect.table_exists(conn, "schema_migrations"):
+            return {}
+        rows = conn.execute(select(schema_migrations)).all()
+    return {r.version: dict(r._mapping) for r in rows}
+
+def status(engine: Engine) -> list[dict]:
+    done = applied(engine)
+    return [
+        {"version": v, "description": d, "applied_at": done.get(v, {}).get("applied_at")}
+        for v, d, _ in MIGRATIONS
+    ]
+
+def upgrade(engine: Engine, target: int | None = None, log=lambda msg: None) -> list[int]:
+    """Apply pending migrations in order (up to target). Returns the versions applied."""
+    _meta.create_all(engine)
+    ran = []
+    for version, description, fn in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        with engine.begin() as conn:
+            dialect.lock_for_migration(conn)
+            # Re-check under the lock: another worker/host may have just applied it
+            if conn.execute(select(schema_migrations.c.version)
+                            .where(schema_migrations.c.version == version)).first():
+                continue
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()))
+        ran.append(version)
+        log(f"✓ Migration {version}: {description}")
+    return ran
@@ -0,0 +1,328 @@
+# services/pick.py
+"""
+FEFO (first-expired, first-out) pick lists and meal plans.
+
+Items with the same name (case/spacing-insensitive) are one product; each item
+row is a lot of `quantity` units sharing one expiration date. PickIndex keeps a
+min-heap of lots per product ordered by expiration_date (undated lots last),
+so picking k units costs O(k log n) instead of a sort of the product's lots.
+
+The index is warmed once and then maintained incrementally:
+- create / delete in this process call upsert() / drop() directly
+- every scan (any worker) writes a transactions row, so before each pick the
+  lots touched by transactions after our cursor are re-read in one query
+  (transactions ids are AUTOINCREMENT, so the cursor never skips new rows; a
+  MAX(id) below the cursor means the DB was replaced, e.g. restored: rewarm)
+- creates in other workers arrive through the "items-created" signal: the
+  items past the highest id seen are read
+- deletes in other workers arrive through the "items" signal (rewarm)
+
+Stale heap entries (lot replaced, or emptied by check-outs) are dropped lazily
+when they reach the top.
+
+Meal plan: for each product, eat `per_day` units a day in FEFO order. The
+smallest rate that wastes nothing is the earliest-deadline-first bound
+    max over expiry dates e of ceil(units expiring by e / days until e, inclusive)
+and is the default. The plan is computed per lot, not per day, so a 180-day
+horizon over thousands of lots is a single linear pass after the sort.
+"""
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Optional
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Engine
+from services import coord
+from services.scan import ITEMS_SIGNAL, ITEMS_CREATED_SIGNAL, CREATED_OVERLAP
+
+DEFAULT_HORIZON_DAYS = 30
+MAX_HORIZON_DAYS = 366
+CATCH_UP_MAX_ITEMS = 2000        # more touched items than this: rewarm instead
+
+_UNDATED = date.max.toordinal()
+
+_ITEM_SQL = "SELECT id, name, quantity, expiration_date, code, location, freezer_id FROM items"
+
+def product_key(name: Optional[str]) -> str:
+    return " ".join((name or "").casefold().split())
+
+def _as_date(value) -> Optional[date]:
+    # Core text() queries return SQLite dates as strings
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+@dataclass(eq=False)
+class Lot:
+    item_id: int
+    name: str
+    quantity: int
+    expiration_date: Optional[date]
+    code: Optional[str]
+    location: Optional[str]
+    freezer_id: int
+    queued: bool = False
+    key: int = field(init=False)                   # heap order: expiry ordinal, undated last
+    expires: Optional[str] = field(init=False)     # ISO date, formatted once per lot
+
+    def __post_init__(self):
+        self.key = self.expiration_date.toordinal() if self.expiration_date else _UNDATED
+        self.expires = self.expiration_date.isoformat() if self.expiration_date else None
+
+    def brief(self, units: int) -> dict:
+        # Plan entries: the product name is on the plan itself
+        return {
+            "item_id": self.item_id,
+            "code": self.code,
+            "location": self.location,
+            "freezer_id": self.freezer_id,
+            "expiration_date": self.expires,
+            "units": units,
+        }
+
+    def as_dict(self, today: date, take: Optional[int] = None) -> dict:
+        out = {
+            "item_id": self.item_id,
+            "code": self.code,
+            "name": self.name,
+            "location": self.location,
+            "freezer_id": self.freezer_id,
+            "expiration_date": self.expires,
+            "days_left": (self.expiration_date - today).days if self.expiration_date else None,
+            "quantity": self.quantity,
+        }
+        if take is not None:
+            out["take"] = take
+        return out
+
+class PickIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lots: dict[int, Lot] = {}
+        self._heaps: dict[str, list[tuple[int, int, int, Lot]]] = {}   # (expiry, id, seq, lot)
+        self._seq = itertools.count()           # tie-break so Lots are never compared
+        self._cursor = 0                     # last transactions.id applied
+        self._last_item_id = 0               # highest items.id loaded
+        self._warm = False
+        self._items_changed = coord.Watch(ITEMS_SIGNAL)
+        self._items_created = coord.Watch(ITEMS_CREATED_SIGNAL)
+
+    # ----- maintenance -----
+
+    def warm(self, engine: Engine):
+        self._items_created.changed()        # a warm covers every create so far
+        with engine.connect() as conn:
+            # One read transaction: the cursor matches the quantities read
+            cursor = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM transactions")).scalar()
+            rows = conn.execute(text(_ITEM_SQL)).all()
+        with self._lock:
+            self._lots.clear()
+            self._heaps.clear()
+            for r in rows:
+                self._upsert(r)
+            self._cursor = cursor
+            self._last_item_id = max((r.id for r in rows), default=0)
+            self._warm = True
+
+    def sync(self, engine: Engine):
+        """Apply changes made since the last call (scans anywhere, creates/deletes elsewhere)."""
+        if not self._warm or self._items_changed.changed():
+            self.warm(engine)
+            return
+        created = self._items_created.changed()
+        with engine.connect() as conn:
+            rewound = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM transactions")).scalar() < self._cursor
+            rows = conn.execute(text("SELECT id, item_id FROM transactions WHERE id > :c"),
+                                {"c": self._cursor}).all()
+            new_items = conn.execute(text(f"{_ITEM_SQL} WHERE id > :after"),
+                                     {"after": self._last_item_id - CREATED_OVERLAP}).all() if created else []
+            if not rows and not new_items and not rewound:
+                return
+            touched = {r.item_id for r in rows if r.item_id is not None}
+            if rewound or len(touched) > CATCH_UP_MAX_ITEMS:
+                items = None
+            else:
+                items = conn.execute(
+                    text(f"{_ITEM_SQL} WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                    {"ids": list(touched)},
+                ).all() if touched else []
+        if items is None:
+            self.warm(engine)
+            return
+        with self._lock:
+            found = set()
+            for r in (*new_items, *items):
+                self._upsert(r)
+                found.add(r.id)
+            for item_id in touched - found:
+                self._drop(item_id)
+            if rows:
+                self._cursor = max(self._cursor, max(r.id for r in rows))
+            if new_items:
+                self._last_item_id = max(self._last_item_id, max(r.id for r in new_items))
+
+    def upsert(self, item_id: int, name: str, quantity: int, expiration_date: Optional[date],
+               code: Optional[str], location: Optional[str], freezer_id: int):
+        with self._lock:
+            self._upsert((item_id, name, quantity, expiration_date, code, location, freezer_id))
+
+    def drop(self, item_id: int):
+        with self._lock:
+            self._drop(item_id)
+
+    def _upsert(self, row):
+        item_id, name, quantity, expiration_date, code, location, freezer_id = row
+        lot = self._lots.get(item_id)
+        expiration_date = _as_date(expiration_date)
+        if lot is not None and lot.name == name and lot.expiration_date == expiration_date:
+            lot.quantity = quantity or 0           # quantity-only change: the heap entry stays valid
+            lot.code, lot.location, lot.freezer_id = code, location, freezer_id
+        else:
+            lot = Lot(item_id, name, quantity or 0, expiration_date, code, location, freezer_id)
+            self._lots[item_id] = lot              # any old entry is now stale
+        if lot.quantity > 0 and not lot.queued:
+            heapq.heappush(self._heaps.setdefault(product_key(name), []), (lot.key, item_id, next(self._seq), lot))
+            lot.queued = True
+
+    def _drop(self, item_id: int):
+        self._lots.pop(item_id, None)
+
+    def _live(self, lot: Lot) -> bool:
+        return self._lots.get(lot.item_id) is lot and lot.quantity > 0
+
+    def _sorted_lots(self, key: str) -> list[Lot]:
+        """The product's live lots in FEFO order; prunes stale entries while at it."""
+        heap = self._heaps.get(key, [])
+        live = [e for e in heap if self._live(e[3])]
+        for *_, lot in heap:
+            if not self._live(lot) and self._lots.get(lot.item_id) is lot:
+                lot.queued = False
+        live.sort(key=lambda e: e[:3])
+        if live:
+            self._heaps[key] = live                # a sorted list is a valid heap
+        else:
+            self._heaps.pop(key, None)
+        return [e[3] for e in live]
+
+    # ----- queries -----
+
+    def pick(self, name: str, count: int, today: date, freezer_id: Optional[int] = None,
+             include_expired: bool = False) -> dict:
+        """The `count` units to eat next: earliest expiry first, expired lots reported separately."""
+        key = product_key(name)
+        picks, expired, keep = [], [], []
+        needed = count
+        with self._lock:
+            heap = self._heaps.get(key, [])
+            while heap and needed > 0:
+                entry = heapq.heappop(heap)
+                lot = entry[3]
+                if not self._live(lot):
+                    if self._lots.get(lot.item_id) is lot:
+                        lot.queued = False
+                    continue
+                keep.append(entry)
+                if freezer_id is not None and lot.freezer_id != freezer_id:
+                    continue
+                if lot.expiration_date and lot.expiration_date < today and not include_expired:
+                    expired.append(lot.as_dict(today))
+                    continue
+                take = min(lot.quantity, needed)
+                picks.append(lot.as_dict(today, take))
+                needed -= take
+            for entry in keep:
+                heapq.heappush(heap, entry)
+            if not heap:
+                self._heaps.pop(key, None)
+        return {
+            "name": name,
+            "count": count,
+            "picked": count - needed,
+            "short": needed,
+            "picks": picks,
+            "expired": expired,
+        }
+
+    def plan(self, today: date, days: int = DEFAULT_HORIZON_DAYS, name: Optional[str] = None,
+             per_day: Optional[int] = None, freezer_id: Optional[int] = None) -> dict:
+        """Spread consumption over `days` days, per product, so nothing expires uneaten."""
+        with self._lock:
+            keys = [product_key(name)] if name is not None else list(self._heaps)
+            products = []
+            for key in keys:
+                lots = self._sorted_lots(key)
+                if freezer_id is not None:
+                    lots = [lot for lot in lots if lot.freezer_id == freezer_id]
+                if lots:
+                    products.append([(lot, lot.quantity) for lot in lots])   # snapshot quantities
+        day_iso = [(today + timedelta(days=d)).isoformat() for d in range(days)]
+        diff = [0] * (days + 1)            # daily totals as a difference array: O(1) per product
+        plans = []
+        for lots in products:
+            p, eaten = _plan_product(lots, today.toordinal(), day_iso, per_day)
+            rate = p["per_day"]
+            if rate:
+                full, rest = divmod(eaten, rate)
+                diff[0] += rate
+                diff[full] -= rate
+                if rest:
+                    diff[full] += rest
+                    diff[full + 1] -= rest
+            plans.append(p)
+        plans.sort(key=lambda p: (-p["required_per_day"], p["name"].casefold()))
+        daily, units = [], 0
+        for d, iso in enumerate(day_iso):
+            units += diff[d]
+            daily.append({"date": iso, "units": units})
+        return {"start": day_iso[0], "days": days, "daily_units": daily, "products": plans}
+
+def _plan_product(lots: list[tuple[Lot, int]], today: int, day_iso: list[str],
+                  per_day: Optional[int]) -> tuple[dict, int]:
+    """
+    One FEFO pass over a product's lots (already in expiry order) at a constant
+    daily rate. Dates are ordinals; returns the plan and the units eaten within the horizon.
+    """
+    # Lots are in expiry order: the expired ones come first
+    split = next((i for i, (lot, _) in enumerate(lots) if lot.key >= today), len(lots))
+    expired, edible = lots[:split], lots[split:]
+
+    # Earliest-deadline-first bound: by each expiry date, everything due by then is eaten
+    required, due = 0, 0
+    for lot, q in edible:
+        if lot.key == _UNDATED:
+            break
+        due += q
+        required = max(required, -(-due // (lot.key - today + 1)))
+    rate = per_day or max(required, 1 if edible else 0)
+
+    schedule, wasted = [], []
+    offset, horizon_units = 0, len(day_iso) * rate    # eaten units so far; unit n is eaten on day n // rate
+    for lot, q in edible:
+        eat = q
+        if lot.key != _UNDATED:
+            last_ok = (lot.key - today + 1) * rate     # units eaten by its expiry day
+            eat = max(0, min(q, last_ok - offset))
+        if eat < q:
+            wasted.append(lot.brief(q - eat))
+        in_horizon = min(eat, max(0, horizon_units - offset))
+        if in_horizon:
+            entry = lot.brief(in_horizon)
+            entry["start"] = day_iso[offset // rate]
+            entry["end"] = day_iso[(offset + in_horizon - 1) // rate]
+            schedule.append(entry)
+        offset += eat
+    eaten = min(offset, horizon_units)
+    return {
+        "name": lots[0][0].name,
+        "units": sum(q for _, q in edible),
+        "required_per_day": required,
+        "per_day": rate,
+        "schedule": schedule,
+        "wasted": wasted,
+        "beyond_horizon": offset - eaten,
+        "expired": [lot.brief(q) for lot, q in expired],
+    }, eaten
+
+index = PickIndex()
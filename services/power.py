@@ -0,0 +1,262 @@
+# services/power.py
+"""
+High-rate power ingest (10-50 Hz current sensor) reduced to aggregates on arrival.
+
+Each sample block is folded into the unit's current window (RMS, peak, mean W),
+split at window boundaries, and into a running Wh total. Blocks must arrive in
+time order (OUT_OF_ORDER_SLACK_SECONDS of overlap allowed for clock jitter);
+older ones are rejected rather than folded into the wrong window. Only closed windows are written out (one row per
+POWER_WINDOW_SECONDS in the unit's power CSV), so storage cost does not depend on
+the sample rate. A short ring buffer of raw samples is kept in memory and dumped
+to power_bursts/ around power alerts.
+
+The Wh total lives in the power_energy table, shared by every worker: each
+worker adds its own energy since the last flush with one atomic
+`energy_wh = energy_wh + :delta` (through the group-commit writer) when a window
+closes or FLUSH_SECONDS have passed, so /power/live on any worker is at most
+FLUSH_SECONDS behind the others. Windows and burst captures stay per worker: a
+sensor reader keeps one keep-alive connection, so a unit's blocks reach one worker.
+"""
+import csv
+import json
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from services.status import classify_power
+from services import coord, writer
+
+POWER_WINDOW_SECONDS = 60
+RAW_PRE_TRIGGER_SECONDS = 10     # raw history kept in memory for burst captures
+RAW_POST_TRIGGER_SECONDS = 10
+LIVE_TIMEOUT_SECONDS = 120       # a unit counts as "real sensor" while blocks keep arriving
+FLUSH_SECONDS = 10               # longest a worker keeps energy to itself
+OUT_OF_ORDER_SLACK_SECONDS = 1.0
+STATE_FILE = Path("power_state.json")   # pre-database energy totals, imported by migration 4
+BURST_DIR = Path("power_bursts")
+
+@dataclass
+class PowerWindow:
+    start: float            # unix seconds, aligned to POWER_WINDOW_SECONDS
+    n: int = 0
+    sum_w: float = 0.0
+    sum_sq: float = 0.0
+    peak_w: float = 0.0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "timestamp": datetime.fromtimestamp(self.start, tz=timezone.utc).replace(tzinfo=None).isoformat(),
+            "mean_w": round(self.sum_w / self.n, 3) if self.n else None,
+            "rms_w": round(math.sqrt(self.sum_sq / self.n), 3) if self.n else None,
+            "peak_w": round(self.peak_w, 3),
+            "samples": self.n,
+        }
+
+@dataclass
+class _Burst:
+    path: Path
+    until: float
+    rows: list = field(default_factory=list)
+
+class PowerAccumulator:
+    def __init__(self, freezer_id: int, energy_wh: float = 0.0, keep_raw: bool = True):
+        self.freezer_id = freezer_id
+        self.energy_wh = energy_wh           # not yet flushed to power_energy
+        self.flushed_at = 0.0
+        self.keep_raw = keep_raw
+        self.window: Optional[PowerWindow] = None
+        self.last_closed: Optional[PowerWindow] = None
+        self.last_block_at = 0.0
+        self.last_block_mean_w: Optional[float] = None
+        self._raw: deque = deque()
+        self._burst: Optional[_Burst] = None
+
+    def add_block(self, samples: list[float], rate_hz: float, start: float) -> dict:
+        """Fold one block in. Returns {"closed": [window dicts], "trigger": bool} or {"error": ...}."""
+        dt = 1.0 / rate_hz
+        n = len(samples)
+        if self.last_block_at and start < self.last_block_at - OUT_OF_ORDER_SLACK_SECONDS:
+            return {"error": "Block starts before the previous one ended (out of order)"}
+        peak = max(samples)
+        duration = n * dt
+
+        # Split at window boundaries: sample i belongs to the window containing start + i*dt
+        closed = []
+        i = 0
+        while i < n:
+            t = start + i * dt
+            wstart = t - t % POWER_WINDOW_SECONDS
+            j = min(n, max(i + 1, math.ceil((wstart + POWER_WINDOW_SECONDS - start) / dt)))
+            closed += self._fold(samples[i:j], wstart, (j - i) * dt)
+            i = j
+
+        mean = math.fsum(samples) / n
+        self.energy_wh += mean * duration / 3600
+        self.last_block_at = start + duration
+        self.last_block_mean_w = mean
+
+        # Alerts follow the peak whether or not raw samples are kept
+        trigger = classify_power(peak) == "critical"
+        if self.keep_raw:
+            self._capture(samples, dt, start, peak)
+        return {"closed": [c.as_dict() for c in closed], "trigger": trigger}
+
+    def _fold(self, samples: list[float], wstart: float, seconds: float) -> list[PowerWindow]:
+        closed = []
+        if self.window is not None and wstart > self.window.start:
+            closed.append(self.window)
+            self.last_closed = self.window
+            self.window = None
+        if self.window is None:
+            self.window = PowerWindow(start=wstart)
+        w = self.window
+        w.n += len(samples)
+        w.sum_w += math.fsum(samples)
+        w.sum_sq += math.fsum(x * x for x in samples)
+        w.peak_w = max(w.peak_w, max(samples))
+        w.seconds += seconds
+        return closed
+
+    def _capture(self, samples, dt, start, peak):
+        rows = [(start + i * dt, w) for i, w in enumerate(samples)]
+        horizon = start - RAW_PRE_TRIGGER_SECONDS
+        self._raw.extend(rows)
+        while self._raw and self._raw[0][0] < horizon:
+            self._raw.popleft()
+
+        if self._burst is not None:
+            self._burst.rows.extend(rows)
+            if rows[-1][0] >= self._burst.until:
+                _write_burst(self._burst)
+                self._burst = None
+            return
+
+        if classify_power(peak) != "critical":
+            return
+        BURST_DIR.mkdir(exist_ok=True)
+        stamp = datetime.fromtimestamp(start, tz=timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self._burst = _Burst(
+            path=BURST_DIR / f"freezer{self.freezer_id}_{stamp}.csv",
+            until=start + RAW_POST_TRIGGER_SECONDS,
+            rows=list(self._raw),
+        )
+
+    def live(self, now: float, shared: Optional[dict] = None) -> dict:
+        """This worker's view merged with the totals every worker has flushed."""
+        shared = shared or {}
+        latest = self.window if self.window and self.window.n else self.last_closed
+        mean_w = self.last_block_mean_w
+        if shared.get("last_block_at") and shared["last_block_at"] > self.last_block_at:
+            mean_w = shared["mean_w"]           # another worker saw a newer block
+        window = latest.as_dict() if latest else (json.loads(shared["last_window"]) if shared.get("last_window") else None)
+        return {
+            "freezer_id": self.freezer_id,
+            "live": self.is_live(now) or coord.age(f"power_live_{self.freezer_id}") < LIVE_TIMEOUT_SECONDS,
+            "kw": round(mean_w / 1000, 5) if mean_w is not None else None,
+            "kwh": round(((shared.get("energy_wh") or 0.0) + self.energy_wh) / 1000, 5),
+            "window": window,
+        }
+
+    def is_live(self, now: float) -> bool:
+        return now - self.last_block_at < LIVE_TIMEOUT_SECONDS
+
+def _write_burst(burst: _Burst):
+    with open(burst.path, "w", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(["timestamp", "power"])
+        for t, watts in burst.rows:
+            w.writerow([datetime.fromtimestamp(t, tz=timezone.utc).replace(tzinfo=None).isoformat(), watts])
+
+# ----- registry (one accumulator per freezer; energy totals in power_energy) -----
+
+_lock = threading.Lock()
+_units: dict[int, PowerAccumulator] = {}
+
+_FLUSH_SQL = text("""
+    INSERT INTO power_energy (freezer_id, energy_wh, mean_w, last_block_at, last_window)
+    VALUES (:fid, :wh, :mean_w, :at, :window)
+    ON CONFLICT (freezer_id) DO UPDATE SET
+        energy_wh = power_energy.energy_wh + excluded.energy_wh,
+        mean_w = CASE WHEN excluded.last_block_at >= COALESCE(power_energy.last_block_at, 0)
+                      THEN excluded.mean_w ELSE power_energy.mean_w END,
+        last_block_at = CASE WHEN excluded.last_block_at >= COALESCE(power_energy.last_block_at, 0)
+                             THEN excluded.last_block_at ELSE power_energy.last_block_at END,
+        last_window = COALESCE(excluded.last_window, power_energy.last_window)
+""")
+
+def unit(freezer_id: int) -> PowerAccumulator:
+    acc = _units.get(freezer_id)
+    if acc is None:
+        with _lock:
+            acc = _units.get(freezer_id)
+            if acc is None:
+                acc = _units[freezer_id] = PowerAccumulator(freezer_id)
+    return acc
+
+def _take(acc: PowerAccumulator, now: float) -> dict:
+    """Detach this worker's energy since the last flush. Call with _lock held."""
+    params = {
+        "fid": acc.freezer_id, "wh": acc.energy_wh, "mean_w": acc.last_block_mean_w,
+        "at": acc.last_block_at or None,
+        "window": json.dumps(acc.last_closed.as_dict()) if acc.last_closed else None,
+    }
+    acc.energy_wh = 0.0
+    acc.flushed_at = now
+    return params
+
+def _flush(engine: Engine, acc: PowerAccumulator, params: dict):
+    """Add detached energy to the shared total. Call without _lock: it waits on the writer."""
+    try:
+        writer.for_engine(engine).call(lambda conn: conn.execute(_FLUSH_SQL, params))
+    except Exception:
+        with _lock:
+            acc.energy_wh += params["wh"]    # keep it for the next flush
+        raise
+
+def flush_all(engine: Engine):
+    """On shutdown: nothing this worker measured is lost."""
+    now = datetime.now(timezone.utc).timestamp()
+    with _lock:
+        pending = [(acc, _take(acc, now)) for acc in _units.values() if acc.energy_wh]
+    for acc, params in pending:
+        _flush(engine, acc, params)
+
+def ingest(engine: Engine, freezer_id: int, samples: list[float], rate_hz: float,
+           start: Optional[float] = None, keep_raw: bool = True) -> dict:
+    now = datetime.now(timezone.utc).timestamp()
+    if start is None:
+        start = now - len(samples) / rate_hz
+    acc = unit(freezer_id)
+    # Lets the leader worker's sensor_writer see a live sensor even if another worker took the block
+    coord.touch(f"power_live_{freezer_id}")
+    params = None
+    with _lock:
+        acc.keep_raw = keep_raw
+        result = acc.add_block(samples, rate_hz, start)
+        if "error" not in result and (result["closed"] or now - acc.flushed_at >= FLUSH_SECONDS):
+            params = _take(acc, now)
+    if params is not None:
+        _flush(engine, acc, params)
+    return result
+
+def _shared(engine: Engine, freezer_id: int) -> dict:
+    with engine.connect() as conn:
+        row = conn.execute(text(
+            "SELECT energy_wh, mean_w, last_block_at, last_window FROM power_energy WHERE freezer_id = :fid"
+        ), {"fid": freezer_id}).first()
+    return dict(row._mapping) if row else {}
+
+def live(engine: Engine, freezer_id: int) -> dict:
+    return unit(freezer_id).live(datetime.now(timezone.utc).timestamp(), _shared(engine, freezer_id))
+
+def is_live(freezer_id: int) -> bool:
+    acc = _units.get(freezer_id)
+    if acc is not None and acc.is_live(datetime.now(timezone.utc).timestamp()):
+        return True
+    return coord.age(f"power_live_{freezer_id}") < LIVE_TIMEOUT_SECONDS
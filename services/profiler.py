@@ -0,0 +1,199 @@
+# services/profiler.py
+"""
+Per-request / per-task SQL profile: query count, total SQL time, slowest
+statements, and suspected N+1s (the same statement shape run N1_THRESHOLD or
+more times in one scope - a query inside a loop).
+
+Engine-level cursor events feed whichever profile is active in the current
+context (a contextvar, so it follows requests into the threadpool, asyncio
+tasks and asyncio.to_thread; the group-commit writer runs jobs in the
+submitter's context too). When no profile is active the hooks return after one
+contextvar lookup, and only a sampled fraction of requests get a profile, so
+this can stay on in production.
+
+    with profiler.scope("task:compaction"):
+        ...
+    profiler.report()       # what GET /debug/queries returns
+"""
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+N1_THRESHOLD = 5          # same shape this many times in one scope = suspected N+1
+SLOWEST_PER_SCOPE = 3
+RECENT = 200              # profiles kept for the debug endpoint
+MAX_SHAPE_CHARS = 300
+
+_current: ContextVar[Optional["Profile"]] = ContextVar("sql_profile", default=None)
+
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+_SELECT_LIST = re.compile(r"^SELECT .+? FROM ")
+
+def shape(statement: str) -> str:
+    """
+    Statement with the select list, IN lists and inline numbers collapsed, so loop
+    iterations compare equal and the part that differs (FROM/WHERE) stays readable.
+    """
+    s = _SPACE.sub(" ", statement).strip()
+    s = _SELECT_LIST.sub("SELECT … FROM ", s, count=1)
+    s = _IN_LIST.sub("(?…)", s)
+    s = _NUMBER.sub("N", s)
+    return s[:MAX_SHAPE_CHARS]
+
+class Profile:
+    __slots__ = ("name", "started", "elapsed_ms", "queries", "sql_ms", "shapes", "slowest", "_lock")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.time()
+        self.elapsed_ms = 0.0
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.shapes: dict[str, list] = {}          # shape -> [count, total_ms]
+        self.slowest: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, ms: float):
+        key = shape(statement)
+        with self._lock:
+            self.queries += 1
+            self.sql_ms += ms
+            entry = self.shapes.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += ms
+            if len(self.slowest) < SLOWEST_PER_SCOPE or ms > self.slowest[-1][0]:
+                self.slowest.append((ms, key))
+                self.slowest.sort(reverse=True)
+                del self.slowest[SLOWEST_PER_SCOPE:]
+
+    def suspects(self) -> list[dict]:
+        return [
+            {"shape": k, "count": c, "total_ms": round(ms, 2)}
+            for k, (c, ms) in sorted(self.shapes.items(), key=lambda kv: -kv[1][0])
+            if c >= N1_THRESHOLD
+        ]
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "started": self.started,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "queries": self.queries,
+            "sql_ms": round(self.sql_ms, 2),
+            "slowest": [{"ms": round(ms, 2), "shape": s} for ms, s in self.slowest],
+            "n_plus_one": self.suspects(),
+        }
+
+    def server_timing(self) -> str:
+        return f'sql;dur={self.sql_ms:.1f};desc="{self.queries} queries"'
+
+class _Registry:
+    """Finished profiles: the recent ones, plus running totals per scope name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.recent: deque = deque(maxlen=RECENT)
+        self.totals: dict[str, dict] = {}
+        self.n_plus_one: dict[tuple[str, str], int] = {}   # (scope name, shape) -> max count seen
+
+    def add(self, p: Profile):
+        d = p.as_dict()
+        with self._lock:
+            self.recent.append(d)
+            t = self.totals.setdefault(p.name, {"samples": 0, "queries": 0, "sql_ms": 0.0, "max_queries": 0})
+            t["samples"] += 1
+            t["queries"] += p.queries
+            t["sql_ms"] += p.sql_ms
+            t["max_queries"] = max(t["max_queries"], p.queries)
+            for s in d["n_plus_one"]:
+                key = (p.name, s["shape"])
+                self.n_plus_one[key] = max(self.n_plus_one.get(key, 0), s["count"])
+
+    def report(self, limit: int) -> dict:
+        with self._lock:
+            totals = {
+                name: {
+                    "samples": t["samples"],
+                    "avg_queries": round(t["queries"] / t["samples"], 2),
+                    "avg_sql_ms": round(t["sql_ms"] / t["samples"], 2),
+                    "max_queries": t["max_queries"],
+                }
+                for name, t in sorted(self.totals.items(), key=lambda kv: -kv[1]["sql_ms"])
+            }
+            suspects = [
+                {"scope": name, "shape": s, "max_count": c}
+                for (name, s), c in sorted(self.n_plus_one.items(), key=lambda kv: -kv[1])
+            ]
+            recent = list(self.recent)[-limit:][::-1]
+        return {"sample_rate": sample_rate, "by_scope": totals, "n_plus_one": suspects, "recent": recent}
+
+    def clear(self):
+        with self._lock:
+            self.recent.clear()
+            self.totals.clear()
+            self.n_plus_one.clear()
+
+registry = _Registry()
+sample_rate = 0.0
+
+def configure(rate: float):
+    global sample_rate
+    sample_rate = max(0.0, min(1.0, rate))
+
+def sampled() -> bool:
+    return sample_rate > 0 and random.random() < sample_rate
+
+def current() -> Optional[Profile]:
+    return _current.get()
+
+@contextmanager
+def scope(name: str, enabled: bool = True):
+    """Profile the SQL run in this block (and anything it awaits or hands to threads)."""
+    if not enabled or _current.get() is not None:
+        yield _current.get()
+        return
+    p = Profile(name)
+    token = _current.set(p)
+    t0 = time.perf_counter()
+    try:
+        yield p
+    finally:
+        _current.reset(token)
+        p.elapsed_ms = (time.perf_counter() - t0) * 1000
+        if p.queries:
+            registry.add(p)
+
+def report(limit: int = 20) -> dict:
+    return registry.report(limit)
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_t0", []).append(time.perf_counter())
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    p = _current.get()
+    if p is None:
+        return
+    stack = conn.info.get("profile_t0")
+    if stack:
+        p.record(statement, (time.perf_counter() - stack.pop()) * 1000)
+
+def _error(context):
+    stack = context.connection.info.get("profile_t0") if context.connection is not None else None
+    if stack and _current.get() is not None:
+        stack.pop()
+
+def install(engine: Engine):
+    if not event.contains(engine, "before_cursor_execute", _before):
+        event.listen(engine, "before_cursor_execute", _before)
+        event.listen(engine, "after_cursor_execute", _after)
+        event.listen(engine, "handle_error", _error)
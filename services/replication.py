@@ -0,0 +1,422 @@
+# services/replication.py
+"""
+Change-data-capture log for replicating the hub to a ground-station copy.
+
+Triggers on every replicated table append a full row image to `change_log`
+(op 'upsert' or 'delete', keyed by the row's primary key). A replica pulls
+batches of changes after its cursor, applies them in one transaction together
+with the new cursor, and so can stop and resume anywhere: re-applying a batch
+is a no-op because every change is a whole-row upsert or a delete by key.
+
+Changes are shipped in log order, one per log row: applying them in that order
+keeps foreign keys satisfied at every step, which a PostgreSQL replica checks.
+
+Sealed archive segments are logged as references (table `archive_segments`);
+the files themselves are fetched separately and only once. The replica keeps
+its own archive directory in the hub's layout (index.json of the segments it
+has), so services/archive.py can query it, and deletes the files of segments
+the hub merged away.
+
+Batch wire format: zlib-compressed JSON
+    {"since": n, "next": m, "more": bool, "gap": bool, "changes": [[seq, table, key, op, data], ...]}
+
+The replica acknowledges what it has applied with a separate call (POST
+/sync/ack); reading a batch never does. Log rows the replica has acknowledged
+are pruned after the retention window;
+a replica that starts from scratch after that needs a copy of the DB as its seed.
+So that a replica that never syncs can't grow the log forever, rows older than
+MAX_UNACKED_DAYS (or beyond the newest MAX_LOG_ROWS) go regardless; a replica
+that falls behind that is told so (`gap`) and re-seeds.
+
+On PostgreSQL the log has the same shape; one generic plpgsql trigger function
+(to_jsonb of the row) replaces the per-table SQLite triggers.
+"""
+import json
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from services import archive as archive_svc
+from services import dialect
+
+CHANGE_TABLE = "change_log"
+SEGMENT_TABLE = "archive_segments"
+REPLICATED_TABLES = (
+    "freezers", "items", "transactions", "transactions_daily",
+    "alerts", "alerts_archive", "settings", "freezer_settings",
+)
+BATCH_LIMIT = 500
+MAX_UNACKED_DAYS = 30           # log rows older than this are pruned even if no replica has them
+MAX_LOG_ROWS = 500_000          # ...as are rows beyond the newest this many
+COMPRESS_LEVEL = 6
+
+_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS {CHANGE_TABLE} (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        row_key TEXT NOT NULL,
+        op TEXT NOT NULL,
+        data TEXT,
+        changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    )""",
+    # Only used to avoid logging the same archive segment twice
+    f"CREATE INDEX IF NOT EXISTS ix_{CHANGE_TABLE}_tbl_key ON {CHANGE_TABLE}(tbl, row_key)",
+    "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+
+_PG_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS {CHANGE_TABLE} (
+        seq BIGSERIAL PRIMARY KEY,
+        tbl TEXT NOT NULL,
+        row_key TEXT NOT NULL,
+        op TEXT NOT NULL,
+        data TEXT,
+        changed_at TEXT NOT NULL DEFAULT (to_char(now() AT TIME ZONE 'utc', 'YYYY-MM-DD HH24:MI:SS.MS'))
+    )""",
+    _DDL[1],
+    _DDL[2],
+    # TG_ARGV = the table's primary key columns
+    f"""CREATE OR REPLACE FUNCTION cdc_capture() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        key_new TEXT;
+        key_old TEXT;
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            SELECT jsonb_object_agg(c, to_jsonb(OLD) -> c)::text INTO key_old FROM unnest(TG_ARGV) AS c;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            SELECT jsonb_object_agg(c, to_jsonb(NEW) -> c)::text INTO key_new FROM unnest(TG_ARGV) AS c;
+        END IF;
+        IF key_old IS NOT NULL AND key_old IS DISTINCT FROM key_new THEN
+            INSERT INTO {CHANGE_TABLE}(tbl, row_key, op, data) VALUES (TG_TABLE_NAME, key_old, 'delete', NULL);
+        END IF;
+        IF key_new IS NOT NULL THEN
+            INSERT INTO {CHANGE_TABLE}(tbl, row_key, op, data)
+            VALUES (TG_TABLE_NAME, key_new, 'upsert', to_jsonb(NEW)::text);
+        END IF;
+        RETURN NULL;
+    END $$""",
+]
+
+
+def _table_info(conn, table: str) -> tuple[list[str], list[str]]:
+    columns, pk = dialect.table_columns(conn, table)
+    return columns, pk or ["rowid"]
+
+
+def _json_object(columns: list[str], ref: str) -> str:
+    return "json_object(" + ", ".join(f"'{c}', {ref}.\"{c}\"" for c in columns) + ")"
+
+
+def _trigger_ddl(table: str, columns: list[str], pk: list[str]) -> list[str]:
+    key_new, key_old = _json_object(pk, "NEW"), _json_object(pk, "OLD")
+    row = _json_object(columns, "NEW")
+    insert = f"INSERT INTO {CHANGE_TABLE}(tbl, row_key, op, data)"
+    return [
+        f"""CREATE TRIGGER cdc_{table}_ai AFTER INSERT ON "{table}" BEGIN
+            {insert} VALUES ('{table}', {key_new}, 'upsert', {row});
+        END""",
+        # A key change is a delete of the old row plus an upsert of the new one
+        f"""CREATE TRIGGER cdc_{table}_au AFTER UPDATE ON "{table}" BEGIN
+            {insert} SELECT '{table}', {key_old}, 'delete', NULL WHERE {key_old} IS NOT {key_new};
+            {insert} VALUES ('{table}', {key_new}, 'upsert', {row});
+        END""",
+        f"""CREATE TRIGGER cdc_{table}_ad AFTER DELETE ON "{table}" BEGIN
+            {insert} VALUES ('{table}', {key_old}, 'delete', NULL);
+        END""",
+    ]
+
+
+def _install_postgres(conn, existed: bool):
+    for stmt in _PG_DDL:
+        conn.exec_driver_sql(stmt)
+    for table in REPLICATED_TABLES:
+        columns, pk = dialect.table_columns(conn, table)
+        if not columns:
+            continue
+        args = ", ".join(f"'{c}'" for c in pk)
+        conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS cdc_{table} ON "{table}"')
+        conn.exec_driver_sql(
+            f'CREATE TRIGGER cdc_{table} AFTER INSERT OR UPDATE OR DELETE ON "{table}" '
+            f"FOR EACH ROW EXECUTE FUNCTION cdc_capture({args})"
+        )
+        if not existed:
+            key = "jsonb_build_object(" + ", ".join(f"'{c}', t.\"{c}\"" for c in pk) + ")::text"
+            conn.exec_driver_sql(
+                f"INSERT INTO {CHANGE_TABLE}(tbl, row_key, op, data) "
+                f"SELECT '{table}', {key}, 'upsert', to_jsonb(t)::text FROM \"{table}\" AS t"
+            )
+
+
+def install(engine: Engine):
+    """
+    Create the change log and (re)create the capture triggers from the live schema,
+    so columns added by migrations are picked up on the next start. The first time,
+    every existing row is logged so a fresh replica starts from a full copy.
+    """
+    with engine.begin() as conn:
+        existed = dialect.table_exists(conn, CHANGE_TABLE)
+        if dialect.is_postgres(conn):
+            _install_postgres(conn, existed)
+            return
+        for stmt in _DDL:
+            conn.exec_driver_sql(stmt)
+        for table in REPLICATED_TABLES:
+            columns, pk = _table_info(conn, table)
+            if not columns:
+                continue
+            for op in ("ai", "au", "ad"):
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS cdc_{table}_{op}")
+            for stmt in _trigger_ddl(table, columns, pk):
+                conn.exec_driver_sql(stmt)
+            if not existed:
+                conn.exec_driver_sql(
+                    f"INSERT INTO {CHANGE_TABLE}(tbl, row_key, op, data) "
+                    f"SELECT '{table}', {_json_object(pk, table)}, 'upsert', {_json_object(columns, table)} "
+                    f'FROM "{table}"'
+                )
+
+
+def _segment_key(metric: str, file: str) -> str:
+    return json.dumps({"metric": metric, "file": file})
+
+
+def log_segments(engine: Engine, metric: str, entries: list[dict], archive_dir) -> int:
+    """
+    Log references to sealed archive segments that are new or were rewritten
+    (late rows merged in: the sample count changes), and deletes for parts
+    that were merged away.
+    """
+    logged = 0
+    insert = text(f"INSERT INTO {CHANGE_TABLE}(tbl, row_key, op, data) VALUES (:tbl, :key, :op, :data)")
+    with engine.begin() as conn:
+        latest = {}
+        for key, op, data in conn.execute(text(f"""
+            SELECT row_key, op, data FROM {CHANGE_TABLE}
+            WHERE seq IN (SELECT MAX(seq) FROM {CHANGE_TABLE} WHERE tbl = :tbl GROUP BY row_key)
+        """), {"tbl": SEGMENT_TABLE}):
+            if json.loads(key)["metric"] == metric:
+                latest[key] = json.loads(data) if op == "upsert" else None
+        current = set()
+        for e in entries:
+            key = _segment_key(metric, e["file"])
+            path = archive_dir / metric / e["file"]
+            if not path.exists():
+                continue
+            current.add(key)
+            data = {"metric": metric, **e, "bytes": path.stat().st_size}
+            logged_before = latest.get(key)
+            if logged_before and logged_before.get("count") == data["count"]:
+                continue
+            conn.execute(insert, {"tbl": SEGMENT_TABLE, "key": key, "op": "upsert", "data": json.dumps(data)})
+            logged += 1
+        for key, data in latest.items():
+            if data is not None and key not in current:
+                conn.execute(insert, {"tbl": SEGMENT_TABLE, "key": key, "op": "delete", "data": None})
+                logged += 1
+    return logged
+
+
+# ----- primary side -----
+
+def read_batch(engine: Engine, since: int, limit: int = BATCH_LIMIT) -> dict:
+    """
+    Changes with seq > since, at most `limit` log rows, in log order. Repeated
+    changes to one row are not collapsed: moving a row's last image ahead of, or
+    behind, rows that reference it would break foreign keys on the replica.
+    """
+    with engine.connect() as conn:
+        pruned = conn.execute(text("SELECT value FROM sync_state WHERE key = 'pruned_through'")).scalar()
+        rows = conn.execute(text(f"""
+            SELECT seq, tbl, row_key, op, data FROM {CHANGE_TABLE}
+            WHERE seq > :since ORDER BY seq LIMIT :limit
+        """), {"since": since, "limit": limit + 1}).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "since": since,
+        "next": rows[-1][0] if rows else since,
+        "more": more,
+        # Changes the replica never saw were pruned: it has to be re-seeded from a copy of the DB
+        "gap": since < int(pruned or 0),
+        "changes": [[seq, tbl, json.loads(key), op, json.loads(data) if data else None]
+                    for seq, tbl, key, op, data in rows],
+    }
+
+
+def encode_batch(batch: dict) -> bytes:
+    return zlib.compress(json.dumps(batch, separators=(",", ":")).encode(), COMPRESS_LEVEL)
+
+
+def decode_batch(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob))
+
+
+def head(engine: Engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT COALESCE(MAX(seq), 0) FROM {CHANGE_TABLE}")).scalar()
+
+
+def get_state(engine: Engine, key: str, default: Optional[str] = None) -> Optional[str]:
+    with engine.connect() as conn:
+        value = conn.execute(text("SELECT value FROM sync_state WHERE key = :k"), {"k": key}).scalar()
+    return default if value is None else value
+
+
+def _set_state(conn, key: str, value):
+    conn.execute(text("""
+        INSERT INTO sync_state(key, value) VALUES (:k, :v)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """), {"k": key, "v": str(value)})
+
+
+def ack(engine: Engine, seq: int):
+    """The replica has applied everything up to seq."""
+    with engine.begin() as conn:
+        current = conn.execute(text("SELECT value FROM sync_state WHERE key = 'acked_seq'")).scalar()
+        if current is None or int(current) < seq:
+            _set_state(conn, "acked_seq", seq)
+
+
+def _stamp(dt: datetime) -> str:
+    # Same text as the changed_at defaults: "YYYY-MM-DD HH:MM:SS.sss"
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def prune(engine: Engine, retention_days: int) -> int:
+    """
+    Drop log rows the replica already has and that are older than the retention
+    window, and any rows past the hard limits whether acknowledged or not.
+    Segment references are kept: they are few and a rebuilt replica needs them.
+    """
+    acked = int(get_state(engine, "acked_seq", "0"))
+    retention_days = max(int(retention_days), 1)
+    now = datetime.utcnow()
+    params = {
+        "acked": acked,
+        "cutoff": _stamp(now - timedelta(days=retention_days)),
+        "hard_cutoff": _stamp(now - timedelta(days=max(retention_days, MAX_UNACKED_DAYS))),
+        "max_rows": MAX_LOG_ROWS,
+        "seg": SEGMENT_TABLE,
+    }
+    with engine.begin() as conn:
+        through = conn.execute(text(f"""
+            SELECT MAX(seq) FROM {CHANGE_TABLE}
+            WHERE tbl != :seg AND (
+                (seq <= :acked AND changed_at < :cutoff)
+                OR changed_at < :hard_cutoff
+                OR seq <= (SELECT MAX(seq) FROM {CHANGE_TABLE}) - :max_rows)
+        """), params).scalar()
+        if through is None:
+            return 0
+        deleted = conn.execute(text(f"""
+            DELETE FROM {CHANGE_TABLE} WHERE seq <= :through AND tbl != :seg
+        """), {"through": through, "seg": SEGMENT_TABLE}).rowcount
+        _set_state(conn, "pruned_through", through)
+        return deleted
+
+
+# ----- replica side -----
+
+def prepare_replica(engine: Engine):
+    """Same schema as the hub (without its triggers), plus the cursor and segment tables."""
+    from models import Base
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.exec_driver_sql(f"""CREATE TABLE IF NOT EXISTS {SEGMENT_TABLE} (
+            metric TEXT NOT NULL,
+            file TEXT NOT NULL,
+            data TEXT NOT NULL,
+            fetched INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, file)
+        )""")
+
+
+def cursor(engine: Engine) -> int:
+    return int(get_state(engine, "cursor", "0"))
+
+
+def apply_batch(engine: Engine, batch: dict) -> int:
+    """Apply one batch and advance the cursor atomically. Returns changes applied."""
+    applied = 0
+    with engine.begin() as conn:
+        current = conn.execute(text("SELECT value FROM sync_state WHERE key = 'cursor'")).scalar()
+        current = int(current or 0)
+        for seq, tbl, key, op, data in batch["changes"]:
+            if seq <= current:
+                continue                       # already applied by an earlier, interrupted run
+            if tbl == SEGMENT_TABLE and op == "delete":
+                conn.execute(text(f"DELETE FROM {SEGMENT_TABLE} WHERE metric = :m AND file = :f"),
+                             {"m": key["metric"], "f": key["file"]})
+            elif tbl == SEGMENT_TABLE:
+                # A rewritten segment (late rows merged in) has to be fetched again
+                conn.execute(text(f"""
+                    INSERT INTO {SEGMENT_TABLE}(metric, file, data) VALUES (:m, :f, :d)
+                    ON CONFLICT(metric, file) DO UPDATE SET data = excluded.data,
+                        fetched = CASE WHEN {SEGMENT_TABLE}.data = excluded.data THEN {SEGMENT_TABLE}.fetched ELSE 0 END
+                """), {"m": key["metric"], "f": key["file"], "d": json.dumps(data)})
+            elif tbl not in REPLICATED_TABLES:
+                continue
+            elif op == "delete":
+                where = " AND ".join(f'"{c}" = :k_{i}' for i, c in enumerate(key))
+                conn.execute(text(f'DELETE FROM "{tbl}" WHERE {where}'),
+                             {f"k_{i}": v for i, v in enumerate(key.values())})
+            else:
+                cols = list(data)
+                names = ", ".join(f'"{c}"' for c in cols)
+                params = ", ".join(f":c_{i}" for i in range(len(cols)))
+                if dialect.is_postgres(conn):
+                    updates = ", ".join(f'"{c}" = excluded."{c}"' for c in cols)
+                    conflict = ", ".join(f'"{c}"' for c in key)
+                    sql = f'INSERT INTO "{tbl}" ({names}) VALUES ({params}) ON CONFLICT ({conflict}) DO UPDATE SET {updates}'
+                else:
+                    sql = f'INSERT OR REPLACE INTO "{tbl}" ({names}) VALUES ({params})'
+                conn.execute(text(sql), {f"c_{i}": data[c] for i, c in enumerate(cols)})
+            applied += 1
+        if batch["next"] > current:
+            _set_state(conn, "cursor", batch["next"])
+    return applied
+
+
+def pending_segments(engine: Engine) -> list[dict]:
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT data FROM {SEGMENT_TABLE} WHERE fetched = 0")).fetchall()
+    return [json.loads(r.data) for r in rows]
+
+
+def mark_fetched(engine: Engine, metric: str, file: str):
+    with engine.begin() as conn:
+        conn.execute(text(f"UPDATE {SEGMENT_TABLE} SET fetched = 1 WHERE metric = :m AND file = :f"),
+                     {"m": metric, "f": file})
+
+
+def sync_archive_dir(engine: Engine, archive_dir: Path) -> int:
+    """
+    Bring the replica's archive directory in line with its segment table: an
+    index.json per metric listing the fetched segments, and no files for
+    segments the hub has deleted. Returns the number of files removed.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT metric, file, data, fetched FROM {SEGMENT_TABLE}")).fetchall()
+    known: dict[str, set[str]] = {}
+    fetched: dict[str, list[dict]] = {}
+    for metric, file, data, done in rows:
+        known.setdefault(metric, set()).add(file)
+        if done:
+            entry = {k: v for k, v in json.loads(data).items() if k != "metric"}
+            fetched.setdefault(metric, []).append(entry)
+
+    removed = 0
+    metrics = set(known) | ({p.name for p in archive_dir.iterdir() if p.is_dir()} if archive_dir.exists() else set())
+    for metric in sorted(metrics):
+        d = archive_dir / metric
+        d.mkdir(parents=True, exist_ok=True)
+        archive_svc.write_index(d, fetched.get(metric, []))
+        for path in d.glob("*.seg"):
+            if path.name not in known.get(metric, ()):
+                path.unlink(missing_ok=True)
+                removed += 1
+    return removed
@@ -0,0 +1,108 @@
+# services/scan.py
+import threading
+from datetime import datetime, timezone
+from typing import Literal, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from models import Transaction
+from services import coord, writer
+
+Action = Literal["check_in", "check_out"]
+
+class CodeIndex:
+    """
+    In-memory code -> item id map for the scan station.
+    Warmed once at startup and updated only after a write has committed,
+    so a scan resolves its item without an ORM query. Quantities are
+    always read in the write transaction, never from here.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_code: dict[str, int] = {}
+
+    def warm(self, engine: Engine):
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT code, id FROM items WHERE code IS NOT NULL")).all()
+        with self._lock:
+            self._by_code = dict(rows)
+
+    def get(self, code: str) -> Optional[int]:
+        return self._by_code.get(code)
+
+    def put(self, code: str, item_id: int):
+        with self._lock:
+            self._by_code[code] = item_id
+
+    def drop(self, code: str):
+        with self._lock:
+            self._by_code.pop(code, None)
+
+    def __len__(self):
+        return len(self._by_code)
+
+index = CodeIndex()
+
+# Bumped when items are deleted, so other worker processes drop stale code -> id entries
+# (SQLite can hand a deleted item's id to the next new item); watchers re-warm
+ITEMS_SIGNAL = "items"
+# Bumped when items are created; watchers only read items past the highest id they have.
+# Scans don't need it: a code created elsewhere is a cache miss, looked up once.
+ITEMS_CREATED_SIGNAL = "items-created"
+CREATED_OVERLAP = 64        # ids re-read below that: concurrent creates can commit out of id order on PostgreSQL
+_items_changed = coord.Watch(ITEMS_SIGNAL)
+
+# Atomic in SQL: concurrent scans can never double-decrement or go below zero
+_DELTA_SQL = {
+    "check_out": text("UPDATE items SET quantity = quantity - 1 WHERE id = :id AND quantity > 0"),
+    "check_in": text("UPDATE items SET quantity = COALESCE(quantity, 0) + 1 WHERE id = :id"),
+}
+_MESSAGES = {"check_out": "Checked out", "check_in": "Checked in"}
+_tx_insert = Transaction.__table__.insert()
+
+def _resolve(conn, code: str) -> Optional[int]:
+    item_id = index.get(code)
+    if item_id is not None:
+        return item_id
+    # Cache miss (item created by another process): scan() remembers it once committed
+    return conn.execute(text("SELECT id FROM items WHERE code = :code"), {"code": code}).scalar()
+
+def _apply(conn, code: str, action: Action) -> dict:
+    """One scan inside a writer job. Touches only the database: the job may still roll back."""
+    item_id = _resolve(conn, code)
+    if item_id is None:
+        return {"error": "Item not found"}
+
+    updated = conn.execute(_DELTA_SQL[action], {"id": item_id}).rowcount
+    if updated == 0:
+        if conn.execute(text("SELECT id FROM items WHERE id = :id"), {"id": item_id}).first() is None:
+            return {"error": "Item not found"}
+        return {"error": "No quantity available"}
+
+    # The UPDATE holds the write lock, so this read sees exactly our result
+    quantity = conn.execute(text("SELECT quantity FROM items WHERE id = :id"), {"id": item_id}).scalar_one()
+    tx_id = conn.execute(_tx_insert.values(
+        item_id=item_id, action=action, timestamp=datetime.now(timezone.utc)
+    )).inserted_primary_key[0]
+    return {
+        "message": _MESSAGES[action],
+        "code": code,
+        "item_id": item_id,
+        "quantity": quantity,
+        "transaction_id": tx_id,
+    }
+
+def scan(engine: Engine, code: str, action: Action) -> dict:
+    """
+    Apply one check-in/check-out through the group-commit writer (services/writer.py)
+    and return a small fixed-shape result (no ORM objects) once it is durable.
+    """
+    if _items_changed.changed():
+        index.warm(engine)
+    result = writer.for_engine(engine).call(lambda conn: _apply(conn, code, action))
+    # Committed: now the cache may follow
+    if "item_id" in result:
+        index.put(code, result["item_id"])
+    elif result.get("error") == "Item not found":
+        index.drop(code)
+    return result
@@ -0,0 +1,132 @@
+# services/search.py
+import re
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from services import dialect
+
+# External-content FTS5 table: the index stores only tokens, rows live in `items`
+FTS_TABLE = "items_fts"
+FTS_COLUMNS = ("name", "location", "serving_size")
+
+_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, location, serving_size,
+        content='items', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )""",
+    # Keep the index in sync with every write to items
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, location, serving_size)
+        VALUES (new.id, new.name, new.location, new.serving_size);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, location, serving_size)
+        VALUES ('delete', old.id, old.name, old.location, old.serving_size);
+    END""",
+    # Only re-index when a searchable column changes (quantity updates on every scan)
+    f"""CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE OF name, location, serving_size ON items BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, location, serving_size)
+        VALUES ('delete', old.id, old.name, old.location, old.serving_size);
+        INSERT INTO {FTS_TABLE}(rowid, name, location, serving_size)
+        VALUES (new.id, new.name, new.location, new.serving_size);
+    END""",
+]
+
+# Postgres: the same weighting as setweight() labels over one expression, GIN-indexed.
+# 'simple' config = no stemming, like unicode61 (prefix queries need the raw words)
+PG_DOCUMENT = """(
+    setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(location, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(serving_size, '')), 'C')
+)"""
+_PG_DDL = [f"CREATE INDEX IF NOT EXISTS ix_items_search ON items USING GIN ({PG_DOCUMENT})"]
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def install(engine: Engine):
+    """Create the full-text index (and, on SQLite, its triggers); backfill it the first time."""
+    with engine.begin() as conn:
+        if dialect.is_postgres(conn):
+            for stmt in _PG_DDL:
+                conn.execute(text(stmt))     # an expression index maintains itself
+            return
+        existed = dialect.table_exists(conn, FTS_TABLE)
+        for stmt in _DDL:
+            conn.execute(text(stmt))
+        if not existed:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match(q: str) -> str | None:
+    """
+    Turn free text into an FTS5 MATCH expression.
+    Every token must match; the last one is a prefix so typeahead works mid-word.
+    """
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens[:-1]]
+    terms.append(f'"{tokens[-1]}"*')
+    return " ".join(terms)
+
+
+def search_items(db: Session, q: str, limit: int = 20, offset: int = 0,
+                 freezer_id: int | None = None) -> list[dict]:
+    if dialect.is_postgres(db):
+        return _search_postgres(db, q, limit, offset, freezer_id)
+    match = build_match(q)
+    if match is None:
+        return []
+
+    # bm25 weights: name matters most, then location, then serving size
+    rows = db.execute(text(f"""
+        SELECT i.id, i.name, i.code, i.quantity, i.location, i.serving_size,
+               i.expiration_date, i.freezer_id, bm25({FTS_TABLE}, 10.0, 3.0, 1.0) AS rank
+        FROM {FTS_TABLE}
+        JOIN items AS i ON i.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH :match
+          AND (:freezer_id IS NULL OR i.freezer_id = :freezer_id)
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """), {"match": match, "limit": limit, "offset": offset, "freezer_id": freezer_id})
+
+    return [{
+        "id": r.id,
+        "name": r.name,
+        "code": r.code,
+        "quantity": r.quantity,
+        "location": r.location,
+        "serving_size": r.serving_size,
+        "expiration_date": r.expiration_date,
+        "freezer_id": r.freezer_id,
+        "rank": r.rank,
+    } for r in rows]
+
+
+def build_tsquery(q: str) -> str | None:
+    """Same rules as build_match() in to_tsquery syntax: 'frozen & pe:*'."""
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    return " & ".join(tokens[:-1] + [f"{tokens[-1]}:*"])
+
+
+def _search_postgres(db: Session, q: str, limit: int, offset: int, freezer_id: int | None) -> list[dict]:
+    query = build_tsquery(q)
+    if query is None:
+        return []
+    # Weights are listed {D, C, B, A}: name (A) matters most, then location (B), then serving size (C).
+    # Negated so that, as with bm25(), lower rank = better match
+    rows = db.execute(text(f"""
+        SELECT id, name, code, quantity, location, serving_size, expiration_date, freezer_id,
+               -ts_rank('{{0.0, 0.1, 0.3, 1.0}}', {PG_DOCUMENT}, to_tsquery('simple', :q)) AS rank
+        FROM items
+        WHERE {PG_DOCUMENT} @@ to_tsquery('simple', :q)
+          AND (CAST(:freezer_id AS INTEGER) IS NULL OR freezer_id = :freezer_id)
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """), {"q": query, "limit": limit, "offset": offset, "freezer_id": freezer_id})
+    return [dict(r._mapping) for r in rows]
@@ -1,7 +1,8 @@
 # services/settings.py
 import json
+from typing import Optional
 from sqlalchemy.orm import Session
-from models import Setting
+from models import Setting, FreezerSetting
 
 DEFAULTS = {
   "target_temp_c": 0, "temp_nominal_min": -2, "temp_nominal_max": 2,
@@ -12,19 +13,33 @@ DEFAULTS = {
   "log_period_s": 30, "retention_days": 30,
 }
 
-def get_all(db: Session) -> dict:
+def get_all(db: Session, freezer_id: Optional[int] = None) -> dict:
+    """Hub-wide settings, overlaid with the unit's own overrides when freezer_id is given."""
     rows = db.query(Setting).all()
     cur = {r.key: json.loads(r.value) for r in rows}
+    if freezer_id is not None:
+        for r in db.query(FreezerSetting).filter(FreezerSetting.freezer_id == freezer_id):
+            cur[r.key] = json.loads(r.value)
     # fill in defaults
     for k,v in DEFAULTS.items():
         cur.setdefault(k, v)
     return cur
 
-def update_many(db: Session, payload: dict):
+def update_many(db: Session, payload: dict, freezer_id: Optional[int] = None):
+    # One SELECT for all keys, then insert or update each
+    if freezer_id is None:
+        existing = {r.key: r for r in db.query(Setting).filter(Setting.key.in_(payload))}
+    else:
+        existing = {r.key: r for r in db.query(FreezerSetting).filter(
+            FreezerSetting.freezer_id == freezer_id, FreezerSetting.key.in_(payload)
+        )}
     for k,v in payload.items():
-        row = db.query(Setting).filter(Setting.key == k).first()
+        row = existing.get(k)
         if not row:
-            row = Setting(key=k, value=json.dumps(v))
+            if freezer_id is None:
+                row = Setting(key=k, value=json.dumps(v))
+            else:
+                row = FreezerSetting(freezer_id=freezer_id, key=k, value=json.dumps(v))
             db.add(row)
         else:
             row.value = json.dumps(v)
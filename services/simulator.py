@@ -0,0 +1,111 @@
+# services/simulator.py
+"""
+Simple first-order thermal model of one freezer unit, for soak tests and demos.
+
+- heat leaks in from the cabin:        dT/dt += (T_ambient - T) / tau_leak
+- compressor pulls heat out when on:   dT/dt -= cool_rate
+- an open door leaks much faster:      dT/dt += (T_ambient - T) / tau_door
+- thermostat with hysteresis around the setpoint and a minimum off time
+- DS18B20 quirks: 0.0625 C quantization and dropouts that read -127 / 85
+- power tracks the compressor (inrush on start, steady draw, idle otherwise)
+"""
+import math
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+@dataclass
+class SimParams:
+    setpoint_c: float = 0.0
+    hysteresis_c: float = 1.0
+    ambient_c: float = 22.0
+    tau_leak_s: float = 6 * 3600        # cabinet time constant, door closed
+    tau_door_s: float = 600             # time constant while the door is open
+    cool_rate_c_per_s: float = 0.004    # compressor pull-down rate
+    min_off_s: float = 180              # compressor short-cycle protection
+    door_opens_per_hour: float = 0.5
+    door_open_s: tuple = (10, 60)
+    dropout_per_hour: float = 0.05      # chance of a probe dropout starting
+    dropout_s: tuple = (30, 300)
+    sensor_noise_c: float = 0.05
+    idle_w: float = 3.0
+    compressor_w: float = 45.0
+    inrush_w: float = 120.0
+    inrush_s: float = 2.0
+    power_noise_w: float = 1.0
+
+@dataclass
+class Sample:
+    timestamp: datetime
+    temperature: float   # what the probe reports (may be -127 / 85 during a dropout)
+    power: float
+    true_temperature: float
+    compressor_on: bool
+    door_open: bool
+
+class FreezerSim:
+    def __init__(self, params: Optional[SimParams] = None, start: Optional[datetime] = None,
+                 seed: Optional[int] = None, initial_c: Optional[float] = None):
+        self.p = params or SimParams()
+        self.rng = random.Random(seed)
+        self.now = start or datetime.utcnow()
+        self.temp = self.p.setpoint_c if initial_c is None else initial_c
+        self.compressor_on = False
+        self._since_switch = self.p.min_off_s
+        self._door_left = 0.0
+        self._dropout_left = 0.0
+        self._dropout_value = -127.0
+
+    def _event(self, per_hour: float, dt: float) -> bool:
+        return self.rng.random() < 1 - math.exp(-per_hour * dt / 3600)
+
+    def step(self, dt: float) -> Sample:
+        p, rng = self.p, self.rng
+
+        # Random events
+        if self._door_left <= 0 and self._event(p.door_opens_per_hour, dt):
+            self._door_left = rng.uniform(*p.door_open_s)
+        if self._dropout_left <= 0 and self._event(p.dropout_per_hour, dt):
+            self._dropout_left = rng.uniform(*p.dropout_s)
+            self._dropout_value = rng.choice((-127.0, 85.0))
+        door_open = self._door_left > 0
+
+        # Thermostat (hysteresis + minimum off time)
+        self._since_switch += dt
+        if self.compressor_on and self.temp <= p.setpoint_c - p.hysteresis_c:
+            self.compressor_on, self._since_switch = False, 0.0
+        elif (not self.compressor_on and self.temp >= p.setpoint_c + p.hysteresis_c
+              and self._since_switch >= p.min_off_s):
+            self.compressor_on, self._since_switch = True, 0.0
+
+        # Exact solution of the linear ODE over dt (stable for any step size)
+        tau = p.tau_leak_s if not door_open else 1 / (1 / p.tau_leak_s + 1 / p.tau_door_s)
+        sink = p.cool_rate_c_per_s * tau if self.compressor_on else 0.0
+        target = p.ambient_c - sink
+        self.temp = target + (self.temp - target) * math.exp(-dt / tau)
+
+        # Power correlated with the compressor
+        if self.compressor_on:
+            inrush = p.inrush_w * min(1.0, p.inrush_s / dt) if self._since_switch <= dt else 0.0
+            watts = p.compressor_w + inrush
+        else:
+            watts = p.idle_w
+        watts = max(0.0, watts + rng.gauss(0, p.power_noise_w))
+
+        # Probe reading
+        if self._dropout_left > 0:
+            reading = self._dropout_value
+        else:
+            reading = round((self.temp + rng.gauss(0, p.sensor_noise_c)) / 0.0625) * 0.0625
+
+        self._door_left -= dt
+        self._dropout_left -= dt
+        self.now += timedelta(seconds=dt)
+        return Sample(self.now, round(reading, 4), round(watts, 2), self.temp, self.compressor_on, door_open)
+
+    def run(self, dt: float, n: Optional[int] = None) -> Iterator[Sample]:
+        i = 0
+        while n is None or i < n:
+            yield self.step(dt)
+            i += 1
@@ -0,0 +1,205 @@
+# services/snapshot.py
+"""
+Online snapshots of the SQLite database while the service keeps writing.
+
+The copy is made with SQLite's backup API a few pages at a time, sleeping
+between steps. In WAL mode the whole copy runs inside one read transaction:
+it sees a fixed snapshot, so concurrent writes neither block on it nor force
+it to start over, and scans, ingest and the sweeper carry on at full speed.
+In rollback-journal mode each step takes the read lock only briefly; if writes
+keep restarting the copy it falls back to `VACUUM INTO`.
+
+Each snapshot is checked with PRAGMA quick_check, gzip-compressed, and given a
+`sha256sum`-compatible sidecar. Only the newest SNAPSHOT_KEEP are kept, newest
+by the UTC time in the name (microseconds, so back-to-back snapshots never collide).
+
+    snapshots/freezer_inventory-20250301T020000123456.db.gz
+    snapshots/freezer_inventory-20250301T020000123456.db.gz.sha256
+
+Restoring replaces the live file underneath every open connection, so it is
+refused while the service is running (coord leader lock held).
+"""
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from services import coord
+
+SNAPSHOT_DIR = Path("snapshots")
+SNAPSHOT_KEEP = 7
+STEP_PAGES = 64                 # 256 KiB per step at the default 4 KiB page size
+STEP_SLEEP_S = 0.005
+MAX_RESTARTS = 3                # concurrent writes restart the backup from page 0
+CHUNK = 1024 * 1024
+# <stem>-<YYYYmmddTHHMMSS>[micro].db.gz, plus .<n> from older same-second snapshots
+_NAME_RE = re.compile(r"-(\d{8}T\d{6})(\d{6})?(?:\.(\d+))?\.db\.gz$")
+
+class _Restarted(Exception):
+    pass
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _backup_stepwise(src: sqlite3.Connection, dest_path: Path):
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status, remaining, total):
+        # `remaining` only goes up when another connection wrote and the copy started over
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > MAX_RESTARTS:
+                raise _Restarted()
+        state["remaining"] = remaining
+        time.sleep(STEP_SLEEP_S)
+
+    dest = sqlite3.connect(dest_path)
+    try:
+        src.backup(dest, pages=STEP_PAGES, progress=progress)
+    finally:
+        dest.close()
+    return state["restarts"]
+
+def _copy_online(db_file: Path, dest_path: Path) -> dict:
+    src = sqlite3.connect(db_file, timeout=30)
+    try:
+        if src.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            # Pin a read snapshot; backup steps reuse an open read transaction instead of
+            # starting a new one each time, so other connections' commits can't reset the copy
+            src.execute("BEGIN")
+            src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        try:
+            restarts = _backup_stepwise(src, dest_path)
+            return {"method": "backup", "restarts": restarts}
+        except _Restarted:
+            dest_path.unlink(missing_ok=True)
+            if src.in_transaction:
+                src.rollback()
+            src.execute("VACUUM INTO ?", (str(dest_path),))
+            return {"method": "vacuum_into", "restarts": MAX_RESTARTS + 1}
+    finally:
+        src.close()
+
+def _compress(src: Path, dest: Path):
+    tmp = dest.with_suffix(dest.suffix + ".tmp")
+    with open(src, "rb") as fin, gzip.open(tmp, "wb", compresslevel=6) as fout:
+        shutil.copyfileobj(fin, fout, CHUNK)
+    os.replace(tmp, dest)
+
+def take(db_file, snapshot_dir: Path = SNAPSHOT_DIR, keep: int = SNAPSHOT_KEEP) -> dict:
+    """Snapshot db_file into snapshot_dir. Returns what was written and how long each phase took."""
+    db_file = Path(db_file)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    final = snapshot_dir / f"{db_file.stem}-{stamp}.db.gz"
+    n = 1
+    while final.exists():
+        final = snapshot_dir / f"{db_file.stem}-{stamp}.{n}.db.gz"
+        n += 1
+    raw = snapshot_dir / f".{final.name[:-3]}"
+
+    t0 = time.perf_counter()
+    try:
+        info = _copy_online(db_file, raw)
+        t1 = time.perf_counter()
+        check = sqlite3.connect(raw)
+        try:
+            ok = check.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            check.close()
+        if ok != "ok":
+            raise RuntimeError(f"snapshot failed quick_check: {ok}")
+        _compress(raw, final)
+    finally:
+        raw.unlink(missing_ok=True)
+    digest = _sha256(final)
+    Path(f"{final}.sha256").write_text(f"{digest}  {final.name}\n")
+    t2 = time.perf_counter()
+
+    return {
+        "file": str(final),
+        "bytes": final.stat().st_size,
+        "sha256": digest,
+        "copy_s": round(t1 - t0, 3),
+        "compress_s": round(t2 - t1, 3),
+        "removed": rotate(snapshot_dir, db_file.stem, keep),
+        **info,
+    }
+
+def _taken_at(path: Path) -> tuple:
+    m = _NAME_RE.search(path.name)
+    if not m:
+        # Renamed by hand: fall back to when it was written
+        return datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).strftime("%Y%m%dT%H%M%S%f"), 0
+    return m.group(1) + (m.group(2) or "000000"), int(m.group(3) or 0)
+
+def list_snapshots(snapshot_dir: Path = SNAPSHOT_DIR, stem: Optional[str] = None) -> list[Path]:
+    """Newest first."""
+    if not snapshot_dir.exists():
+        return []
+    pattern = f"{stem}-*.db.gz" if stem else "*.db.gz"
+    return sorted(snapshot_dir.glob(pattern), key=_taken_at, reverse=True)
+
+def rotate(snapshot_dir: Path, stem: str, keep: int) -> list[str]:
+    removed = []
+    for old in list_snapshots(snapshot_dir, stem)[max(keep, 1):]:
+        old.unlink(missing_ok=True)
+        Path(f"{old}.sha256").unlink(missing_ok=True)
+        removed.append(old.name)
+    return removed
+
+def verify(snapshot: Path) -> bool:
+    sidecar = Path(f"{snapshot}.sha256")
+    if not sidecar.exists():
+        return False
+    expected = sidecar.read_text().split()[0]
+    return _sha256(snapshot) == expected
+
+def restore(snapshot: Path, db_file) -> dict:
+    """
+    Replace db_file's contents with a snapshot, with the service stopped: workers
+    keep pooled connections and in-memory caches of the old contents. The current
+    database is snapshotted first so a restore can itself be undone.
+    """
+    snapshot, db_file = Path(snapshot), Path(db_file)
+    if not verify(snapshot):
+        raise ValueError(f"checksum mismatch or missing sidecar for {snapshot.name}")
+    # Workers take db-init before touching the database: none can start mid-restore
+    with coord.exclusive("db-init"):
+        if coord.leader_alive():
+            raise ValueError(f"service is running (pid {coord.leader_pid()}); stop it before restoring")
+        return _restore(snapshot, db_file)
+
+def _restore(snapshot: Path, db_file: Path) -> dict:
+    raw = snapshot.with_name(f".restore-{snapshot.stem}")
+    try:
+        with gzip.open(snapshot, "rb") as fin, open(raw, "wb") as fout:
+            shutil.copyfileobj(fin, fout, CHUNK)
+        src = sqlite3.connect(raw)
+        try:
+            ok = src.execute("PRAGMA quick_check").fetchone()[0]
+            if ok != "ok":
+                raise ValueError(f"snapshot failed quick_check: {ok}")
+            # Keep everything this time: the snapshot being restored may be the oldest one
+            keep_all = len(list_snapshots(snapshot.parent)) + 1
+            before = take(db_file, snapshot.parent, keep=keep_all) if db_file.exists() else None
+            dest = sqlite3.connect(db_file, timeout=30)
+            try:
+                src.backup(dest)
+            finally:
+                dest.close()
+        finally:
+            src.close()
+    finally:
+        raw.unlink(missing_ok=True)
+    return {"restored": snapshot.name, "previous": before["file"] if before else None}
@@ -0,0 +1,142 @@
+# services/writer.py
+"""
+Group commit for the write endpoints (scans, item creation, alert inserts/acks).
+
+Callers hand a mutation - a function taking a SQLAlchemy Connection - to the
+per-process writer thread and block on a Future. The thread takes everything
+that queued up while the previous commit was flushing, plus whatever arrives
+in the next few milliseconds (WINDOW_SECONDS, cut short when arrivals pause),
+and runs it in ONE transaction, each job inside its own SAVEPOINT so a failing
+job only undoes itself. Futures are
+resolved only after the shared COMMIT returns, so a caller that got a result
+knows its write is on disk, exactly as with a per-request commit - there is
+just one fsync for the whole batch instead of one per request.
+
+Jobs must be short and DB-only: no network calls, no sleeping, no commits.
+Side effects that must only happen once the data is durable (cache updates,
+signals) belong in the caller, after call() returns.
+"""
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+from sqlalchemy.engine import Connection, Engine
+
+WINDOW_SECONDS = 0.003          # longest a batch waits for company after its first job
+QUIET_SECONDS = 0.0005          # ...but stop waiting as soon as arrivals pause this long
+MAX_BATCH = 256
+
+Job = Callable[[Connection], Any]
+
+class GroupCommitWriter:
+    def __init__(self, engine: Engine, window_s: float = WINDOW_SECONDS, max_batch: int = MAX_BATCH):
+        self.engine = engine
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._queue: "queue.SimpleQueue[tuple[Job, Future, contextvars.Context]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats = {"jobs": 0, "failed": 0, "commits": 0, "largest_batch": 0}
+
+    def submit(self, fn: Job) -> Future:
+        if self._thread is None:
+            self._start()
+        fut: Future = Future()
+        # Jobs run in the submitter's context (request-scoped state such as the SQL profile)
+        self._queue.put((fn, fut, contextvars.copy_context()))
+        return fut
+
+    def call(self, fn: Job, timeout: Optional[float] = 30):
+        """Run fn(conn) in the next group commit; returns its result once committed."""
+        return self.submit(fn).result(timeout)
+
+    def stats(self) -> dict:
+        s = dict(self._stats)
+        s["jobs_per_commit"] = round(s["jobs"] / s["commits"], 2) if s["commits"] else 0.0
+        s["queued"] = self._queue.qsize()
+        return s
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> list[tuple[Job, Future, contextvars.Context]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window_s
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())     # already waiting: no delay
+                continue
+            except queue.Empty:
+                pass
+            left = min(deadline - time.monotonic(), QUIET_SECONDS)
+            if left <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=left))
+            except queue.Empty:
+                break
+        return batch
+
+    def _begin(self, conn: Connection):
+        if conn.dialect.name == "sqlite":
+            # Take the write lock up front (no lock-upgrade failures against other
+            # workers) and make the driver's own implicit BEGIN a no-op, so job
+            # savepoints nest inside this transaction instead of committing it
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conn.begin()
+
+    def _run_batch(self, batch: list[tuple[Job, Future, contextvars.Context]]):
+        outcomes = []
+        try:
+            with self.engine.connect() as conn:
+                self._begin(conn)
+                for fn, fut, ctx in batch:
+                    if not fut.set_running_or_notify_cancel():
+                        continue
+                    sp = conn.begin_nested()
+                    try:
+                        result = ctx.run(fn, conn)
+                        sp.commit()
+                        outcomes.append((fut, result, None))
+                    except Exception as e:
+                        sp.rollback()
+                        outcomes.append((fut, None, e))
+                conn.commit()
+        except Exception as e:
+            # Nothing in this batch was committed
+            for fn, fut, ctx in batch:
+                if fut.running() or (not fut.done() and fut.set_running_or_notify_cancel()):
+                    fut.set_exception(e)
+            self._stats["failed"] += len(batch)
+            return
+
+        self._stats["commits"] += 1
+        self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+        for fut, result, error in outcomes:
+            self._stats["jobs"] += 1
+            if error is not None:
+                self._stats["failed"] += 1
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+
+    def _loop(self):
+        while True:
+            self._run_batch(self._collect())
+
+_writers: dict[int, GroupCommitWriter] = {}
+_writers_lock = threading.Lock()
+
+def for_engine(engine: Engine) -> GroupCommitWriter:
+    """The process-wide writer for this engine (created on first use)."""
+    with _writers_lock:
+        w = _writers.get(id(engine))
+        if w is None:
+            w = _writers[id(engine)] = GroupCommitWriter(engine)
+        return w
@@ -0,0 +1,172 @@
+"""
+Sensor Simulator / Load Generator
+Replays synthetic freezer telemetry (services/simulator.py) at N x real time,
+either through the ingest API (temperature like arduino_serial_reader.py, power
+as /power/samples blocks; the server stamps both with its own clock) or straight
+into storage (live CSVs + archive segments) with simulated UTC timestamps.
+
+Examples:
+    # one week of minute data into storage, as fast as possible
+    python simulate_sensors.py --target storage --duration 7d --speed 0
+
+    # soak the running backend: 2 units, 50x real time, 4 concurrent senders
+    python simulate_sensors.py --target api --freezers 1,2 --speed 50 --duration 2h --workers 4
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from services.simulator import FreezerSim, SimParams
+
+BACKEND_URL = "http://localhost:8000"
+MAX_ROWS = 100  # Must match main.py (live CSVs keep only the newest rows)
+
+def parse_duration(text: str) -> float:
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+# ----- targets -----
+
+def run_api(sims, interval, steps, speed, workers, url):
+    import requests
+
+    local = threading.local()       # requests.Session isn't thread-safe: one per sender
+    latencies, failures = [], 0
+
+    def post(path, **kwargs):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = session.post(f"{url}{path}", timeout=5, **kwargs).status_code == 200
+        except requests.RequestException:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    def send_temperature(freezer_id, sample):
+        return post("/temperature", params={"temperature": sample.temperature, "freezer_id": freezer_id})
+
+    def send_power(freezer_id, sample, seconds):
+        # Same clock as the temperature posts: the server stamps the block as ending now,
+        # covering the wall time since this unit's previous block
+        return post("/power/samples", json={"freezer_id": freezer_id, "rate_hz": 1 / seconds,
+                                            "samples": [sample.power]})
+
+    wall_start = last_step = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(steps):
+            now = time.perf_counter()
+            seconds = max(0.001, interval / speed if speed > 0 else min(interval, now - last_step))
+            last_step = now
+            batch = []
+            for fid, sim in sims.items():
+                sample = sim.step(interval)
+                batch.append(pool.submit(send_temperature, fid, sample))
+                batch.append(pool.submit(send_power, fid, sample, seconds))
+            for fut in batch:
+                ok, latency = fut.result()
+                latencies.append(latency)
+                failures += not ok
+            if speed > 0:
+                # Pace against wall clock so slow requests don't accumulate drift
+                due = wall_start + (i + 1) * interval / speed
+                time.sleep(max(0.0, due - time.perf_counter()))
+    return len(latencies), failures, latencies, time.perf_counter() - wall_start
+
+def run_storage(sims, interval, steps, speed):
+    from services import archive as archive_svc
+    from services import freezers as freezers_svc
+
+    written = 0
+    wall_start = time.perf_counter()
+    for fid, sim in sims.items():
+        by_day = {"temperature": {}, "power": {}}
+        tail = []
+        for i in range(steps):
+            s = sim.step(interval)
+            ms = archive_svc.to_ms(s.timestamp.isoformat())     # naive simulated time is UTC
+            day = s.timestamp.date()
+            # Faulty probe readings are rejected on ingest, so they never reach storage
+            if s.temperature not in (-127.0, 85.0):
+                by_day["temperature"].setdefault(day, []).append((ms, s.temperature))
+            by_day["power"].setdefault(day, []).append((ms, s.power))
+            tail.append(s)
+            if len(tail) > MAX_ROWS:
+                tail.pop(0)
+            written += 1
+            if speed > 0:
+                time.sleep(interval / speed)
+
+        for metric, days in by_day.items():
+            archive_svc.append_days(freezers_svc.archive_metric(metric, fid), days)
+
+        # Newest rows into the live CSVs so the dashboards have something to show
+        for metric, column in (("temperature", "temperature"), ("power", "power")):
+            with open(freezers_svc.data_file(metric, fid), "w") as fh:
+                fh.write(f"timestamp,{column}\n")
+                for s in tail:
+                    value = getattr(s, column)
+                    if metric == "temperature" and value in (-127.0, 85.0):
+                        continue
+                    fh.write(f"{s.timestamp.isoformat()},{value}\n")
+    return written, 0, [], time.perf_counter() - wall_start
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic freezer telemetry")
+    parser.add_argument("--target", choices=("api", "storage"), default="api")
+    parser.add_argument("--url", default=BACKEND_URL)
+    parser.add_argument("--freezers", default="1", help="comma-separated freezer ids")
+    parser.add_argument("--duration", default="1d", help="simulated time span, e.g. 90m, 12h, 14d")
+    parser.add_argument("--interval", type=float, default=60, help="simulated seconds between samples")
+    parser.add_argument("--speed", type=float, default=60, help="N x real time (0 = as fast as possible)")
+    parser.add_argument("--workers", type=int, default=1, help="concurrent senders (api target)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--setpoint", type=float, default=SimParams.setpoint_c)
+    args = parser.parse_args()
+
+    duration = parse_duration(args.duration)
+    steps = int(duration // args.interval)
+    start = datetime.utcnow() - timedelta(seconds=duration) if args.target == "storage" else datetime.utcnow()
+    freezer_ids = [int(f) for f in args.freezers.split(",") if f]
+    sims = {fid: FreezerSim(SimParams(setpoint_c=args.setpoint), start=start,
+                            seed=None if args.seed is None else args.seed + fid)
+            for fid in freezer_ids}
+
+    print("=" * 50)
+    print("Space Freezer Sensor Simulator")
+    print("=" * 50)
+    print(f"Target: {args.target}  Units: {freezer_ids}  Samples/unit: {steps}  Speed: "
+          f"{'max' if args.speed <= 0 else f'{args.speed:g}x'}")
+
+    try:
+        if args.target == "api":
+            sent, failures, latencies, elapsed = run_api(sims, args.interval, steps, args.speed,
+                                                         args.workers, args.url.rstrip("/"))
+        else:
+            sent, failures, latencies, elapsed = run_storage(sims, args.interval, steps, args.speed)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+        sys.exit(1)
+
+    unit = "requests" if args.target == "api" else "samples"
+    print(f"\n✓ {sent} {unit} in {elapsed:.1f}s ({sent / elapsed if elapsed else 0:.0f}/s)")
+    if args.target == "api":
+        print(f"  failures: {failures}")
+        print(f"  latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
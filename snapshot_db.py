@@ -0,0 +1,78 @@
+"""
+Database Snapshots
+Take, list, verify and restore online snapshots of freezer_inventory.db
+(services/snapshot.py). The service takes one every SNAPSHOT_INTERVAL_SECONDS
+on its own; this is for doing it by hand.
+
+Examples:
+    python snapshot_db.py take
+    python snapshot_db.py list
+    python snapshot_db.py verify
+    python snapshot_db.py restore snapshots/freezer_inventory-20250301T020000.db.gz
+    python snapshot_db.py restore latest
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from services import snapshot
+
+DB_FILE = "freezer_inventory.db"
+
+def main():
+    parser = argparse.ArgumentParser(description="Online snapshots of the inventory database")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--dir", default=str(snapshot.SNAPSHOT_DIR))
+    sub = parser.add_subparsers(dest="command", required=True)
+    take = sub.add_parser("take", help="snapshot now (safe while the service runs)")
+    take.add_argument("--keep", type=int, default=snapshot.SNAPSHOT_KEEP)
+    sub.add_parser("list", help="list snapshots, newest first")
+    sub.add_parser("verify", help="check every snapshot against its sha256 sidecar")
+    restore = sub.add_parser("restore", help="restore a snapshot into --db (service stopped)")
+    restore.add_argument("snapshot", help="snapshot file, or 'latest'")
+    args = parser.parse_args()
+
+    snapshot_dir = Path(args.dir)
+    stem = Path(args.db).stem
+
+    if args.command == "take":
+        info = snapshot.take(args.db, snapshot_dir, args.keep)
+        print(f"✓ {info['file']} ({info['bytes'] / 1024:.0f} KiB) via {info['method']} "
+              f"in {info['copy_s']}s + {info['compress_s']}s compress")
+        for name in info["removed"]:
+            print(f"  rotated out {name}")
+
+    elif args.command == "list":
+        for path in snapshot.list_snapshots(snapshot_dir, stem):
+            print(f"{path.name}  {path.stat().st_size / 1024:>8.0f} KiB")
+
+    elif args.command == "verify":
+        bad = 0
+        for path in snapshot.list_snapshots(snapshot_dir, stem):
+            ok = snapshot.verify(path)
+            bad += not ok
+            print(f"{'✓' if ok else '✗'} {path.name}")
+        sys.exit(1 if bad else 0)
+
+    elif args.command == "restore":
+        if args.snapshot == "latest":
+            found = snapshot.list_snapshots(snapshot_dir, stem)
+            if not found:
+                print("✗ No snapshots found")
+                sys.exit(1)
+            path = found[0]
+        else:
+            path = Path(args.snapshot)
+        try:
+            info = snapshot.restore(path, args.db)
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        print(f"✓ Restored {info['restored']} into {args.db}")
+        if info["previous"]:
+            print(f"  previous contents saved as {info['previous']}")
+        print("  Start the service again.")
+
+if __name__ == "__main__":
+    main()
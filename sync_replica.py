@@ -0,0 +1,146 @@
+"""
+Ground-Station Replica Sync
+Pulls the hub's change log (services/replication.py) in compressed batches and
+applies it to a local SQLite copy, then fetches any sealed archive segments the
+replica doesn't have yet, keeping ground_archive/ queryable like the hub's
+archive/. Safe to interrupt: each batch is applied together with its cursor in
+one transaction, and the next run resumes from that cursor. The hub is told what
+was applied (so it can prune its log) only after that commit.
+
+Examples:
+    # over the downlink
+    python sync_replica.py --url http://hub.local:8000 --replica ground_station.db
+
+    # entirely local: second SQLite file as the ground station
+    python sync_replica.py --source-db freezer_inventory.db --replica ground_station.db
+
+    # keep following the hub
+    python sync_replica.py --url http://hub.local:8000 --follow 60
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+
+from services import archive as archive_svc
+from services import replication
+
+BACKEND_URL = "http://localhost:8000"
+MAX_RETRIES = 5
+
+class HttpSource:
+    def __init__(self, url: str):
+        import requests
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+
+    def batch(self, since: int, limit: int) -> tuple[dict, int]:
+        r = self.session.get(f"{self.url}/sync/changes", params={"since": since, "limit": limit}, timeout=30)
+        r.raise_for_status()
+        return replication.decode_batch(r.content), len(r.content)
+
+    def ack(self, seq: int):
+        self.session.post(f"{self.url}/sync/ack", params={"seq": seq}, timeout=30).raise_for_status()
+
+    def segment(self, metric: str, file: str, dest: Path):
+        r = self.session.get(f"{self.url}/sync/segments/{metric}/{file}", timeout=60)
+        r.raise_for_status()
+        dest.write_bytes(r.content)
+
+class LocalSource:
+    def __init__(self, db_file: str, archive_dir: str):
+        self.engine = create_engine(f"sqlite:///{db_file}")
+        self.archive_dir = Path(archive_dir)
+
+    def batch(self, since: int, limit: int) -> tuple[dict, int]:
+        blob = replication.encode_batch(replication.read_batch(self.engine, since, limit))
+        return replication.decode_batch(blob), len(blob)
+
+    def ack(self, seq: int):
+        replication.ack(self.engine, seq)
+
+    def segment(self, metric: str, file: str, dest: Path):
+        shutil.copyfile(self.archive_dir / metric / file, dest)
+
+def with_retries(fn, *args):
+    for attempt in range(MAX_RETRIES):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == MAX_RETRIES - 1:
+                raise
+            wait = 2 ** attempt
+            print(f"⚠ {e} - retrying in {wait}s")
+            time.sleep(wait)
+
+def sync_once(source, replica, archive_dir: Path, limit: int) -> dict:
+    stats = {"batches": 0, "changes": 0, "bytes": 0, "segments": 0, "removed": 0}
+    while True:
+        since = replication.cursor(replica)
+        batch, size = with_retries(source.batch, since, limit)
+        if batch["gap"]:
+            raise SystemExit("✗ Replica is behind the hub's pruned change log; seed it from a copy of the DB first")
+        stats["changes"] += replication.apply_batch(replica, batch)
+        with_retries(source.ack, replication.cursor(replica))
+        stats["batches"] += 1
+        stats["bytes"] += size
+        if not batch["more"]:
+            break
+
+    for seg in replication.pending_segments(replica):
+        dest = archive_dir / seg["metric"] / seg["file"]
+        # Same name can mean an older version of the segment: check its sample count too
+        if not (dest.exists() and dest.stat().st_size == seg["bytes"]
+                and archive_svc.segment_count(dest) == seg["count"]):
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dest.with_suffix(dest.suffix + ".part")
+            with_retries(source.segment, seg["metric"], seg["file"], tmp)
+            os.replace(tmp, dest)
+            stats["segments"] += 1
+        replication.mark_fetched(replica, seg["metric"], seg["file"])
+    stats["removed"] = replication.sync_archive_dir(replica, archive_dir)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Replicate the hub into a ground-station SQLite copy")
+    src = parser.add_mutually_exclusive_group()
+    src.add_argument("--url", default=BACKEND_URL, help="hub API base URL")
+    src.add_argument("--source-db", help="read the hub DB file directly instead of over HTTP")
+    parser.add_argument("--source-archive", default="archive", help="hub archive dir (with --source-db)")
+    parser.add_argument("--replica", default="ground_station.db")
+    parser.add_argument("--archive-dir", default="ground_archive", help="where replicated segments go")
+    parser.add_argument("--batch", type=int, default=replication.BATCH_LIMIT, help="log rows per batch")
+    parser.add_argument("--follow", type=float, default=0, help="keep syncing every N seconds")
+    args = parser.parse_args()
+
+    source = LocalSource(args.source_db, args.source_archive) if args.source_db else HttpSource(args.url)
+    replica = create_engine(f"sqlite:///{args.replica}")
+    replication.prepare_replica(replica)
+    archive_dir = Path(args.archive_dir)
+
+    print("=" * 50)
+    print("Space Freezer Replica Sync")
+    print("=" * 50)
+    print(f"Source: {args.source_db or args.url}  Replica: {args.replica}  Cursor: {replication.cursor(replica)}")
+
+    try:
+        while True:
+            stats = sync_once(source, replica, archive_dir, args.batch)
+            print(f"✓ {stats['changes']} changes in {stats['batches']} batches "
+                  f"({stats['bytes'] / 1024:.1f} KiB), {stats['segments']} segments fetched, "
+                  f"{stats['removed']} removed, "
+                  f"cursor {replication.cursor(replica)}")
+            if args.follow <= 0:
+                break
+            time.sleep(args.follow)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from sqlalchemy import select, text
+
+from models import Alert
+from services import anomaly
+
+P = anomaly.DetectorParams(warmup=30, cooldown_s=600)
+
+
+def _steady(det, n, start=0.0, value=-18.0):
+    for i in range(n):
+        assert det.update(start + 60 * i, value + 0.05 * (i % 2)) is None
+    return start + 60 * n
+
+
+def test_no_alert_during_warmup():
+    det = anomaly.TemperatureDetector(P)
+    t = _steady(det, 10)
+    assert det.update(t, 5.0) is None                   # huge jump, but only 11 samples in
+    det = anomaly.TemperatureDetector(P)
+    t = _steady(det, 40)
+    assert det.update(t, 5.0) is not None
+
+
+def test_cooldown_between_alerts():
+    det = anomaly.TemperatureDetector(P)
+    t = _steady(det, 40)
+    assert det.update(t, 5.0) is not None
+    assert det.update(t + 60, 15.0) is None             # inside the cooldown
+    t = _steady(det, 20, start=t + 120, value=-18.0)
+    assert det.update(t, 10.0) is not None              # cooldown over
+
+
+def test_settles_once_the_scores_drop():
+    det = anomaly.TemperatureDetector(P)
+    t = _steady(det, 40)
+    det.update(t, 5.0)
+    settled = []
+    for i in range(1, 200):
+        det.update(t + 60 * i, -18.0)
+        settled.append(det.settled)
+    assert settled.count(True) == 1 and not det.alerting
+
+
+def test_open_alert_of_the_same_kind_is_not_repeated_and_resolves(engine):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO freezers (id, name) VALUES (1, 'Freezer 1')"))
+    spike = anomaly.Anomaly(0.0, 5.0, "ewma", 0.9, "5.00C is +20 sd")
+    drift = anomaly.Anomaly(0.0, -15.0, "cusum", 0.6, "sustained rise")
+    with engine.begin() as conn:
+        assert anomaly.raise_alert(conn, 1, spike)
+        assert not anomaly.raise_alert(conn, 1, spike)
+        assert anomaly.raise_alert(conn, 1, drift)          # a different kind is its own alert
+        assert anomaly.resolve_alerts(conn, 1) == 2
+        assert anomaly.raise_alert(conn, 1, spike)          # resolved: a new episode alerts again
+    with engine.connect() as conn:
+        open_alerts = conn.execute(select(Alert.message).where(Alert.resolved_at.is_(None))).scalars().all()
+    assert len(open_alerts) == 1 and open_alerts[0].startswith("Early warning (ewma)")
+
+
+def test_workers_share_one_detector(engine):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO freezers (id, name) VALUES (1, 'Freezer 1')"))
+
+    def reading(ts, value):
+        # Every call is its own transaction, as in different workers' writer jobs
+        with engine.begin() as conn:
+            return anomaly.observe(conn, 1, ts, value)
+
+    for i in range(30):                                 # warmup counts readings from every worker
+        assert reading(60 * i, -18.0 + 0.05 * (i % 2)) is None
+    assert reading(1800, 5.0) is not None
+    assert reading(1860, 15.0) is None                  # one cooldown for the unit, not one per worker
+    assert anomaly.state(engine, 1)["samples"] == 32
+    with engine.connect() as conn:
+        assert conn.execute(select(Alert.id)).all() == [(1,)]
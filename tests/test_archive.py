@@ -0,0 +1,77 @@
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+from services import archive
+
+DAY = date(2026, 3, 1)
+TODAY = DAY + timedelta(days=2)
+
+
+def _rows(start: int, n: int, day: date = DAY):
+    t0 = datetime(day.year, day.month, day.day)
+    return [((t0 + timedelta(seconds=i)).isoformat(), round(-18 + i % 7 * 0.25, 2)) for i in range(start, start + n)]
+
+
+def _seal(today=TODAY):
+    archive._sealed_through.pop("temperature", None)
+    return archive.seal("temperature", today)
+
+
+def test_seal_moves_finished_days_and_keeps_today():
+    archive.stage("temperature", _rows(0, 100) + _rows(0, 5, day=TODAY))
+    assert _seal() == 100
+    assert [e["count"] for e in archive.load_index("temperature")] == [100]
+    staged = (archive.ARCHIVE_DIR / "temperature" / "staging.csv").read_text().splitlines()
+    assert len(staged) == 5
+
+
+def test_late_rows_merge_into_the_days_segment():
+    archive.stage("temperature", _rows(0, 50))
+    _seal()
+    archive.stage("temperature", _rows(100, 20) + _rows(10, 5))   # late rows, 5 of them re-staged
+    _seal()
+    entries = archive.load_index("temperature")
+    assert [e["file"] for e in entries] == [f"{DAY.isoformat()}.seg"]
+    assert entries[0]["count"] == 70
+    ts = [t for t, _ in archive.query("temperature")]
+    assert ts == sorted(ts) and len(ts) == 70
+
+
+def test_query_merges_overlapping_legacy_parts():
+    ms0 = archive.to_ms(datetime(2026, 3, 1).isoformat())
+    a = [(ms0 + i * 2000, 1.0) for i in range(10)]
+    b = [(ms0 + i * 2000 + 1000, 2.0) for i in range(10)]
+    entries = [archive.write_segment("temperature", DAY, a), archive.write_segment("temperature", DAY, b)]
+    archive._save_index("temperature", entries)
+    assert len(archive.load_index("temperature")) == 2
+    ts = [t for t, _ in archive.query("temperature")]
+    assert ts == sorted(ts) and len(ts) == 20
+    buckets = [b for b, _ in archive.downsample(archive.query("temperature"), 10_000)]
+    assert buckets == sorted(set(buckets))
+
+
+def test_rows_staged_during_a_seal_are_not_lost():
+    batches, size = 200, 25
+    stop = threading.Event()
+
+    def sealer():
+        while not stop.is_set():
+            _seal()
+
+    t = threading.Thread(target=sealer)
+    t.start()
+    try:
+        for i in range(batches):
+            archive.stage("temperature", _rows(i * size, size))
+    finally:
+        stop.set()
+        t.join()
+    _seal()
+    assert sum(e["count"] for e in archive.load_index("temperature")) == batches * size
+
+
+def test_added_counts_only_rows_not_already_archived():
+    assert archive.append_days("temperature", {DAY: [(archive.to_ms(t), v) for t, v in _rows(0, 10)]}) == 10
+    again = [(archive.to_ms(t), v) for t, v in _rows(5, 10)]       # 5 re-staged, 5 new
+    assert archive.append_days("temperature", {DAY: again}) == 5
+    assert archive.load_index("temperature")[0]["count"] == 15
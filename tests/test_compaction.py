@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import Alert, AlertArchive, Freezer, Item, Transaction, TransactionDaily
+from services import compaction, dialect
+
+
+def seed(engine):
+    old = datetime.utcnow() - timedelta(days=40)
+    new = datetime.utcnow() - timedelta(days=1)
+    with Session(engine) as s:
+        s.add(Freezer(id=1, name="Main"))
+        s.add(Item(id=1, name="Peas", code="P1", freezer_id=1))
+        s.add_all([
+            Transaction(item_id=1, action="check_in", timestamp=old),
+            Transaction(item_id=1, action="check_in", timestamp=old),
+            Transaction(item_id=1, action="check_out", timestamp=old),
+            Transaction(item_id=None, action="check_out", timestamp=old),   # item deleted since
+            Transaction(item_id=1, action="check_out", timestamp=new),
+            Alert(type="inventory", severity="info", message="old resolved", created_at=old, resolved_at=old),
+            Alert(type="inventory", severity="info", message="old acked", created_at=old, is_acknowledged=True),
+            Alert(type="inventory", severity="warning", message="old open", created_at=old),
+            Alert(type="inventory", severity="info", message="new resolved", created_at=new, resolved_at=new),
+        ])
+        s.commit()
+    return old.date()
+
+
+def test_rollup_keeps_every_count(engine):
+    day = seed(engine)
+    result = compaction.run(engine, retention_days=30)
+    assert result["transactions_rolled_up"] == 4
+    with Session(engine) as s:
+        daily = {(r.item_id, r.day, r.action): r.count for r in s.scalars(select(TransactionDaily))}
+        left = s.scalars(select(Transaction)).all()
+    assert daily == {
+        (1, day, "check_in"): 2,
+        (1, day, "check_out"): 1,
+        (compaction.UNKNOWN_ITEM_ID, day, "check_out"): 1,
+    }
+    assert [(t.item_id, t.action) for t in left] == [(1, "check_out")]
+
+
+def test_rollup_accumulates_across_batches_and_runs(engine):
+    day = seed(engine)
+    compaction.rollup_transactions(engine, datetime.utcnow() - timedelta(days=30), batch=1)
+    with Session(engine) as s:
+        s.add(Transaction(item_id=1, action="check_in", timestamp=datetime.combine(day, datetime.min.time())))
+        s.commit()
+    compaction.run(engine, retention_days=30)
+    with Session(engine) as s:
+        count = s.get(TransactionDaily, (1, day, "check_in")).count
+    assert count == 3
+
+
+def test_retention_moves_only_closed_old_alerts(engine):
+    seed(engine)
+    assert compaction.run(engine, retention_days=30)["alerts_archived"] == 2
+    with Session(engine) as s:
+        live = sorted(a.message for a in s.scalars(select(Alert)))
+        archived = sorted(a.message for a in s.scalars(select(AlertArchive)))
+    assert live == ["new resolved", "old open"]
+    assert archived == ["old acked", "old resolved"]
+    # Idempotent: a second pass finds nothing left to move
+    assert compaction.run(engine, retention_days=30)["alerts_archived"] == 0
+
+
+def test_new_sqlite_files_use_incremental_vacuum(tmp_path):
+    engine = dialect.make_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    dialect.tune(engine)
+    assert compaction.incremental_vacuum_enabled(engine)
+    assert not compaction.enable_incremental_vacuum(engine)
+
+
+def test_enable_incremental_vacuum_switches_an_old_file(engine):
+    seed(engine)
+    assert not compaction.incremental_vacuum_enabled(engine)
+    assert compaction.enable_incremental_vacuum(engine)
+    assert compaction.incremental_vacuum_enabled(engine)
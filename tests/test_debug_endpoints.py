@@ -0,0 +1,24 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+PATHS = [("get", "/leader"), ("get", "/writer"), ("get", "/debug/queries"),
+         ("put", "/debug/queries?sample_rate=0"), ("delete", "/debug/queries")]
+
+
+@pytest.mark.parametrize("method, path", PATHS)
+def test_debug_endpoints_are_off_by_default(method, path):
+    import main
+    assert not main.DEBUG_ENDPOINTS
+    assert getattr(TestClient(main.app), method)(path).status_code in (404, 405)
+
+
+def test_debug_router_serves_worker_internals(monkeypatch):
+    import routes_debug
+    monkeypatch.setattr(routes_debug.svc, "sample_rate", routes_debug.svc.sample_rate)
+    app = FastAPI()
+    app.include_router(routes_debug.router)
+    client = TestClient(app)
+    assert client.get("/leader").json()["is_leader"] is False
+    assert "commits" in client.get("/writer").json()
+    assert client.put("/debug/queries", params={"sample_rate": 0}).json()["sample_rate"] == 0
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from models import Alert, Freezer, Item
+from services import expiry_scheduler as sched
+from services.expiry import SOON_DAYS, URGENT_DAYS
+
+TODAY = date(2026, 3, 10)
+
+
+def add_item(engine, expires, name="Peas"):
+    with Session(engine) as s:
+        s.merge(Freezer(id=1, name="Main"))
+        item = Item(name=name, code=name, expiration_date=expires, freezer_id=1)
+        s.add(item)
+        s.commit()
+        return item.id
+
+
+def alerts(engine):
+    with Session(engine) as s:
+        return [(a.severity, a.resolved_at is None) for a in s.scalars(select(Alert).order_by(Alert.id))]
+
+
+def test_heap_pops_in_order_and_skips_rescheduled_entries():
+    s = sched.ExpiryScheduler()
+    s._schedule(1, TODAY + timedelta(days=SOON_DAYS + 5), TODAY)    # -> soon in 5 days
+    s._schedule(2, TODAY + timedelta(days=URGENT_DAYS + 1), TODAY)  # -> urgent tomorrow
+    s._schedule(3, TODAY, TODAY)                                   # -> expired tomorrow
+    s._schedule(3, TODAY + timedelta(days=SOON_DAYS + 2), TODAY)   # edited: old entry is stale
+    s._schedule(4, None, TODAY)                                    # no date: never due
+    assert len(s) == 3
+    assert s.next_due() == datetime(2026, 3, 11)
+
+    midnight = datetime.combine(TODAY + timedelta(days=1), datetime.min.time())
+    assert s._pop_due(midnight) == {2}
+    assert s.next_due() == datetime(2026, 3, 12)
+    assert s._pop_due(midnight + timedelta(days=10)) == {1, 3}
+    assert s.next_due() is None and len(s) == 0
+
+
+def test_each_transition_supersedes_the_previous_alert(engine):
+    db = sessionmaker(bind=engine)
+    expires = TODAY + timedelta(days=SOON_DAYS)
+    item_id = add_item(engine, expires)
+
+    sched.evaluate(db(), [item_id], TODAY)
+    assert alerts(engine) == [("info", True)]
+    sched.evaluate(db(), [item_id], TODAY)                         # no change: no duplicate
+    assert alerts(engine) == [("info", True)]
+
+    sched.evaluate(db(), [item_id], expires - timedelta(days=URGENT_DAYS))
+    assert alerts(engine) == [("info", False), ("warning", True)]
+    sched.evaluate(db(), [item_id], expires + timedelta(days=1))
+    assert alerts(engine) == [("info", False), ("warning", False), ("critical", True)]
+
+
+def test_back_to_ok_resolves_and_missing_items_are_dropped(engine):
+    db = sessionmaker(bind=engine)
+    item_id = add_item(engine, TODAY)
+    sched.evaluate(db(), [item_id], TODAY)
+    with Session(engine) as s:
+        s.get(Item, item_id).expiration_date = TODAY + timedelta(days=SOON_DAYS + 30)
+        s.commit()
+    found = sched.evaluate(db(), [item_id, 999], TODAY)
+    assert found == {item_id: TODAY + timedelta(days=SOON_DAYS + 30)}
+    assert alerts(engine) == [("warning", False)]
+
+
+def test_item_changed_is_ignored_outside_the_scheduler_process():
+    s = sched.ExpiryScheduler()
+    for i in range(100):
+        s.item_changed(i)
+    assert not s._pending
+
+
+def test_run_alerts_existing_and_changed_items(engine):
+    db = sessionmaker(bind=engine)
+    add_item(engine, date.today() - timedelta(days=1), name="Old")
+
+    async def scenario():
+        s = sched.ExpiryScheduler()
+        task = asyncio.create_task(s.run(db))
+        try:
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if len(alerts(engine)) == 1:
+                    break
+            s.item_changed(add_item(engine, date.today(), name="New"))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if len(alerts(engine)) == 2:
+                    break
+        finally:
+            task.cancel()
+
+    asyncio.run(scenario())
+    assert alerts(engine) == [("critical", True), ("warning", True)]
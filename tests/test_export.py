@@ -0,0 +1,57 @@
+import csv
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from models import Freezer, Item, TransactionDaily
+from services import archive, export
+
+DAY = date(2026, 3, 1)
+T0 = datetime(2026, 3, 1)
+
+
+def _rows(start, stop, day_offset=0):
+    return [((T0 + timedelta(days=day_offset, seconds=i)).isoformat(), -18.0) for i in range(start, stop)]
+
+
+def test_keyset_pages_cover_every_row_once(engine):
+    with Session(engine) as s:
+        s.add_all([Freezer(id=1, name="Main"), Freezer(id=2, name="Spare")])
+        s.add_all([Item(id=i, name=f"Item {i}", code=f"C{i}", freezer_id=1 + i % 2,
+                        date_added=DAY + timedelta(days=i % 4)) for i in range(1, 12)])
+        s.add_all([TransactionDaily(item_id=i, day=DAY + timedelta(days=d), action=a, count=1)
+                   for i in (1, 2, 3) for d in range(3) for a in ("check_in", "check_out")])
+        s.commit()
+
+    pages = list(export.table_chunks(engine, "items", chunk_rows=3))
+    assert [len(p) for p in pages] == [3, 3, 3, 2]
+    assert [r[0] for p in pages for r in p] == list(range(1, 12))
+
+    odd = [r[0] for p in export.table_chunks(engine, "items", freezer_id=2, chunk_rows=2) for r in p]
+    assert odd == [1, 3, 5, 7, 9, 11]
+    ranged = [r[0] for p in export.table_chunks(engine, "items", start=T0 + timedelta(days=1),
+                                                end=T0 + timedelta(days=3), chunk_rows=2) for r in p]
+    assert ranged == [1, 2, 5, 6, 9, 10]
+
+    # Composite key (item_id, day, action): pages continue from the last tuple, not the first column
+    keys = [r[:3] for p in export.table_chunks(engine, "transactions_daily", chunk_rows=4) for r in p]
+    assert len(keys) == 18 and keys == sorted(set(keys))
+
+
+def test_telemetry_merges_archive_staging_and_live_without_duplicates():
+    archive.stage("temperature", _rows(0, 100))
+    archive._sealed_through.pop("temperature", None)
+    assert archive.seal("temperature", DAY + timedelta(days=1)) == 100
+    # Rows are copied before they are trimmed: each source overlaps the next
+    archive.stage("temperature", _rows(90, 120))
+    with open("temperature_data.csv", "w", newline="") as fh:
+        w = csv.writer(fh)
+        w.writerow(["timestamp", "temperature"])
+        w.writerows(_rows(110, 150))
+
+    rows = [r for chunk in export.telemetry_chunks("temperature", chunk_rows=40) for r in chunk]
+    assert [t for t, _ in rows] == [T0 + timedelta(seconds=i) for i in range(150)]
+
+    window = [r for chunk in export.telemetry_chunks("temperature", start=T0 + timedelta(seconds=95),
+                                                     end=T0 + timedelta(seconds=115)) for r in chunk]
+    assert [t for t, _ in window] == [T0 + timedelta(seconds=i) for i in range(95, 115)]
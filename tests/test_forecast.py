@@ -0,0 +1,33 @@
+import os
+import time
+
+from services import forecast
+
+
+def _history(rows):
+    return lambda: list(rows)
+
+
+def test_fit_is_reseeded_when_another_worker_wrote_the_csv(tmp_path, monkeypatch):
+    monkeypatch.setattr(forecast, "_fits", {})
+    monkeypatch.setattr(forecast, "_fresh_at", {})
+    csv = tmp_path / "temperature.csv"
+    csv.write_text("timestamp,temperature\n")
+    thresholds = {"temp_nominal_max": (-10.0, True)}
+    t0 = time.time() - 1800
+    rows = [(t0 + 60 * i, -20.0) for i in range(10)]
+
+    forecast.run(1, thresholds, history=_history(rows), source=str(csv))
+    first = forecast._fits[1]
+
+    # Unchanged file: the fit is reused
+    forecast.run(1, thresholds, history=_history(rows), source=str(csv))
+    assert forecast._fits[1] is first
+
+    # Another worker appended readings: the fit is rebuilt from the CSV
+    rows += [(t0 + 60 * i, -20.0 + 0.5 * (i - 9)) for i in range(10, 20)]
+    later = time.time() + 5
+    os.utime(csv, (later, later))
+    forecast.run(1, thresholds, history=_history(rows), source=str(csv))
+    assert forecast._fits[1] is not first
+    assert forecast._fits[1].n == len(rows)
@@ -0,0 +1,22 @@
+import pytest
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("method, path, kwargs", [
+    ("post", "/temperature", {"params": {"temperature": -18.0, "freezer_id": 999}}),
+    ("get", "/temperature", {"params": {"freezer_id": 999}}),
+    ("get", "/temperature/forecast", {"params": {"freezer_id": 999}}),
+    ("get", "/power", {"params": {"freezer_id": 999}}),
+    ("get", "/power/live", {"params": {"freezer_id": 999}}),
+    ("post", "/power/samples", {"json": {"freezer_id": 999, "samples": [100.0], "rate_hz": 1.0}}),
+])
+def test_unknown_freezer_rejected(client, workdir, method, path, kwargs):
+    r = getattr(client, method)(path, **kwargs)
+    assert r.json() == {"error": "Freezer not found"}
+    assert not list(workdir.rglob("*999*"))
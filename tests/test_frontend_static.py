@@ -0,0 +1,21 @@
+import frontend_static
+
+
+def test_only_hashed_bundles_under_assets_are_immutable(tmp_path):
+    files = {
+        "assets/index-Bx3kP9aQ.js": True,
+        "assets/vendor-a1_B2c3D.css": True,
+        "assets/logo.svg": False,
+        "apple-touch-icon.png": False,
+        "site-webmanifest.json": False,
+        "android-chrome-192x192.png": False,
+        "favicon-Bx3kP9aQ.ico": False,         # looks hashed, but public/ files keep their names
+        "index.html": False,
+    }
+    for rel in files:
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_bytes(b"x")
+    table = frontend_static.build_table(tmp_path)
+    for rel, immutable in files.items():
+        expected = frontend_static.IMMUTABLE if immutable else frontend_static.REVALIDATE
+        assert table[rel].cache_control == expected, rel
@@ -0,0 +1,20 @@
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import routes_labels
+from schemas import LabelSheetIn
+
+
+def test_huge_quantity_is_rejected_before_building_labels(engine):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO freezers (id, name) VALUES (1, 'Freezer 1')"))
+        conn.execute(text("INSERT INTO items (name, quantity, code, freezer_id) VALUES ('Peas', :q, 'aaaa1111', 1)"),
+                     {"q": 10 ** 7})
+    with Session(engine) as db:
+        start = time.perf_counter()
+        out = routes_labels.label_sheet(LabelSheetIn(per_unit=True), db=db)
+        elapsed = time.perf_counter() - start
+    assert out == {"error": f"Too many labels ({10 ** 7} > {routes_labels.MAX_LABELS})"}
+    assert elapsed < 0.5
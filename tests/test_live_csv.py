@@ -0,0 +1,30 @@
+import csv
+import threading
+from datetime import datetime, timedelta
+
+from services import archive
+
+
+def test_concurrent_appends_and_trims_keep_every_row_once():
+    import main
+    path, writers, per_writer = "temperature_data.csv", 4, 150
+    t0 = datetime(2026, 3, 1)
+
+    def writer(w):
+        for i in range(per_writer):
+            ts = (t0 + timedelta(seconds=w * per_writer + i)).isoformat()
+            main.append_csv(path, "temperature", [ts], [-18.0])
+            main.trim_csv(path, "temperature")
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with open(path, newline="") as fh:
+        live = [row[0] for row in csv.reader(fh)][1:]
+    with open(archive.ARCHIVE_DIR / "temperature" / "staging.csv", newline="") as fh:
+        staged = [row[0] for row in csv.reader(fh)]
+    assert len(live) <= main.MAX_ROWS
+    assert sorted(live + staged) == sorted({*live, *staged}) and len(live + staged) == writers * per_writer
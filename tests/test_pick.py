@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from services import coord, pick, scan
+
+TODAY = date(2026, 5, 1)
+
+
+def _add_item(engine, item_id, name, quantity, days):
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO items (id, name, quantity, code, expiration_date, freezer_id)
+            VALUES (:id, :name, :q, :code, :exp, 1)
+        """), {"id": item_id, "name": name, "q": quantity, "code": f"{item_id:08x}",
+               "exp": TODAY + timedelta(days=days)})
+
+
+def _picked(index, name, count):
+    return [(p["item_id"], p["take"]) for p in index.pick(name, count, TODAY)["picks"]]
+
+
+def test_items_created_elsewhere_are_read_without_a_rewarm(engine, monkeypatch):
+    _add_item(engine, 1, "Peas", 2, 30)
+    index = pick.PickIndex()
+    index.sync(engine)
+
+    # Another worker creates a lot that expires sooner
+    _add_item(engine, 2, "Peas", 1, 5)
+    coord.bump(scan.ITEMS_CREATED_SIGNAL)
+    monkeypatch.setattr(index, "warm", lambda engine: (_ for _ in ()).throw(AssertionError("rewarmed")))
+    index.sync(engine)
+    assert _picked(index, "peas", 2) == [(2, 1), (1, 1)]
+
+
+def _scan(engine, item_id):
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE items SET quantity = quantity - 1 WHERE id = :id"), {"id": item_id})
+        conn.execute(text("INSERT INTO transactions (item_id, action) VALUES (:id, 'check_out')"), {"id": item_id})
+
+
+def test_scans_after_compaction_emptied_transactions_are_seen(engine):
+    _add_item(engine, 1, "Peas", 5, 30)
+    _add_item(engine, 2, "Corn", 5, 30)
+    for _ in range(3):
+        _scan(engine, 2)
+    index = pick.PickIndex()
+    index.sync(engine)
+
+    # Compaction rolls every transaction up; the next scan must not reuse an id behind the cursor
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM transactions"))
+    _scan(engine, 1)
+    index.sync(engine)
+    assert _picked(index, "peas", 10) == [(1, 4)]
+
+
+def test_cursor_ahead_of_the_table_rewarms(engine):
+    _add_item(engine, 1, "Peas", 5, 30)
+    _scan(engine, 1)
+    _scan(engine, 1)
+    index = pick.PickIndex()
+    index.sync(engine)
+
+    # The database was replaced by an older copy: ids went backwards
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM transactions"))
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'transactions'"))
+        conn.execute(text("UPDATE items SET quantity = 1 WHERE id = 1"))
+    index.sync(engine)
+    assert _picked(index, "peas", 10) == [(1, 1)]
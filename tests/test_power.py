@@ -0,0 +1,52 @@
+from services import power
+
+
+def _block(watts=100.0, n=10, rate=10.0):
+    return [watts] * n, rate
+
+
+def test_energy_from_every_worker_adds_up(engine, monkeypatch):
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO freezers (id, name) VALUES (1, 'Freezer 1')"))
+    monkeypatch.setattr(power, "FLUSH_SECONDS", 0)
+
+    # Two "workers": separate accumulators for the same unit, one shared table
+    workers = [power.PowerAccumulator(1), power.PowerAccumulator(1)]
+    for i in range(6):
+        acc = workers[i % 2]
+        samples, rate = _block()
+        monkeypatch.setitem(power._units, 1, acc)
+        power.ingest(engine, 1, samples, rate, start=1_000_000 + i)
+
+    # 6 blocks of 1 s at 100 W = 600 J = 1/6 Wh, seen the same from either worker
+    for acc in workers:
+        monkeypatch.setitem(power._units, 1, acc)
+        live = power.live(engine, 1)
+        assert live["kwh"] == round(600 / 3600 / 1000, 5)
+        assert live["kw"] == 0.1
+
+
+def test_spike_triggers_without_raw_capture(tmp_path):
+    acc = power.PowerAccumulator(1, keep_raw=False)
+    assert acc.add_block([30.0] * 10, 10.0, 600.0)["trigger"] is False
+    assert acc.add_block([30.0] * 9 + [500.0], 10.0, 601.0)["trigger"] is True
+    assert not (tmp_path / "power_bursts").exists()
+
+
+def test_block_is_split_at_the_window_boundary():
+    acc = power.PowerAccumulator(1, keep_raw=False)
+    # 4 s at 10 Hz from 58 s: 20 samples of 10 W in the first window, 20 of 50 W in the next
+    result = acc.add_block([10.0] * 20 + [50.0] * 20, 10.0, 58.0)
+    [closed] = result["closed"]
+    assert closed["samples"] == 20 and closed["mean_w"] == 10.0 and closed["peak_w"] == 10.0
+    assert acc.window.start == 60 and acc.window.n == 20 and acc.window.peak_w == 50.0
+
+
+def test_out_of_order_block_is_rejected():
+    acc = power.PowerAccumulator(1, keep_raw=False)
+    acc.add_block([20.0] * 10, 10.0, 130.0)
+    before = (acc.window.n, acc.energy_wh)
+    assert "error" in acc.add_block([20.0] * 10, 10.0, 100.0)
+    assert (acc.window.n, acc.energy_wh) == before
+    assert "error" not in acc.add_block([20.0] * 10, 10.0, 130.9)    # jitter-sized overlap is fine
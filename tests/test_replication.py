@@ -0,0 +1,151 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+import sync_replica
+from services import archive, replication
+
+
+@pytest.fixture
+def hub(engine):
+    replication.install(engine)
+    return engine
+
+
+@pytest.fixture
+def replica(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    replication.prepare_replica(eng)
+    yield eng
+    eng.dispose()
+
+
+def _sync(hub, replica):
+    while True:
+        batch = replication.read_batch(hub, replication.cursor(replica))
+        replication.apply_batch(replica, batch)
+        if not batch["more"]:
+            return
+
+
+def test_rewritten_segment_is_fetched_again(hub, replica):
+    day = date(2026, 3, 1)
+    ms0 = archive.to_ms(datetime(2026, 3, 1).isoformat())
+    archive.append_days("temperature", {day: [(ms0 + i * 1000, -18.0) for i in range(10)]})
+    replication.log_segments(hub, "temperature", archive.load_index("temperature"), archive.ARCHIVE_DIR)
+    _sync(hub, replica)
+    [seg] = replication.pending_segments(replica)
+    replication.mark_fetched(replica, "temperature", seg["file"])
+
+    # Nothing changed: nothing new is logged
+    assert replication.log_segments(hub, "temperature", archive.load_index("temperature"), archive.ARCHIVE_DIR) == 0
+
+    # Late rows merged into the day's segment: same file name, new content
+    archive.append_days("temperature", {day: [(ms0 + 60_000 + i * 1000, -17.5) for i in range(5)]})
+    assert replication.log_segments(hub, "temperature", archive.load_index("temperature"), archive.ARCHIVE_DIR) == 1
+    _sync(hub, replica)
+    [seg] = replication.pending_segments(replica)
+    assert seg["file"] == f"{day.isoformat()}.seg" and seg["count"] == 15
+
+
+def test_merged_away_parts_are_deleted_on_the_replica(hub, replica):
+    day = date(2026, 3, 1)
+    ms0 = archive.to_ms(datetime(2026, 3, 1).isoformat())
+    parts = [archive.write_segment("temperature", day, [(ms0 + i * 1000 + k, 1.0) for i in range(5)]) for k in range(2)]
+    archive._save_index("temperature", parts)
+    replication.log_segments(hub, "temperature", archive.load_index("temperature"), archive.ARCHIVE_DIR)
+    _sync(hub, replica)
+    assert len(replication.pending_segments(replica)) == 2
+
+    archive.append_days("temperature", {day: [(ms0 + 99_000, 2.0)]})
+    replication.log_segments(hub, "temperature", archive.load_index("temperature"), archive.ARCHIVE_DIR)
+    _sync(hub, replica)
+    assert [s["file"] for s in replication.pending_segments(replica)] == [f"{day.isoformat()}.seg"]
+
+
+def _log_freezers(hub, ids, *age):
+    # Backdate with SQLite's own clock and format, as the trigger default writes it
+    modifiers = "".join(f", '-{a}'" for a in age)
+    with hub.begin() as conn:
+        for n in ids:
+            conn.execute(text("INSERT INTO freezers (id, name) VALUES (:n, :name)"), {"n": n, "name": f"Freezer {n}"})
+        conn.execute(text(f"""
+            UPDATE {replication.CHANGE_TABLE} SET changed_at = strftime('%Y-%m-%d %H:%M:%f', 'now'{modifiers})
+            WHERE seq > (SELECT COALESCE(MAX(seq), 0) FROM {replication.CHANGE_TABLE}) - :n
+        """), {"n": len(ids)})
+
+
+def _logged(hub):
+    with hub.connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {replication.CHANGE_TABLE}")).scalar()
+
+
+def test_prune_keeps_acked_rows_inside_the_retention_window(hub):
+    _log_freezers(hub, [1, 2], "7 days", "2 seconds")       # just past the window
+    _log_freezers(hub, [3], "6 days", "86370 seconds")      # 30 s inside it
+    _log_freezers(hub, [4])
+    replication.ack(hub, replication.read_batch(hub, 0)["next"])
+
+    assert replication.prune(hub, 7) == 2
+    assert _logged(hub) == 2
+    assert not replication.read_batch(hub, 2)["gap"]
+
+
+def test_prune_caps_the_log_when_no_replica_acks(hub, monkeypatch):
+    _log_freezers(hub, [1, 2], f"{replication.MAX_UNACKED_DAYS + 1} days")
+    _log_freezers(hub, [3, 4, 5])
+    assert replication.prune(hub, 7) == 2                  # old enough: gone without an ack
+
+    monkeypatch.setattr(replication, "MAX_LOG_ROWS", 2)
+    assert replication.prune(hub, 7) == 1                  # only the newest 2 are kept
+    assert _logged(hub) == 2
+    batch = replication.read_batch(hub, 0)
+    assert batch["gap"] and [c[2] for c in batch["changes"]] == [{"id": 4}, {"id": 5}]
+
+
+def test_changes_keep_log_order_for_foreign_keys(hub, tmp_path):
+    strict = create_engine(f"sqlite:///{tmp_path / 'strict.db'}")
+    event.listen(strict, "connect", lambda dbapi_conn, _: dbapi_conn.execute("PRAGMA foreign_keys=ON"))
+    replication.prepare_replica(strict)
+    with hub.begin() as conn:
+        conn.execute(text("INSERT INTO freezers (id, name) VALUES (2, 'Spare')"))
+        conn.execute(text("INSERT INTO items (id, name, code, freezer_id) VALUES (1, 'Peas', 'P1', 2)"))
+        conn.execute(text("UPDATE freezers SET name = 'Spare B' WHERE id = 2"))
+
+    batch = replication.read_batch(hub, 0)
+    assert [c[0] for c in batch["changes"]] == [1, 2, 3]
+    replication.apply_batch(strict, batch)                 # freezer 2 exists before the item
+    with strict.connect() as conn:
+        assert conn.execute(text("SELECT name FROM freezers")).scalar() == "Spare B"
+        assert conn.execute(text("SELECT freezer_id FROM items")).scalar() == 2
+    strict.dispose()
+
+
+def test_sync_acks_only_after_applying_and_mirrors_the_archive(hub, replica, workdir, monkeypatch):
+    day = date(2026, 3, 1)
+    ms0 = archive.to_ms(datetime(2026, 3, 1).isoformat())
+    parts = [archive.write_segment("temperature", day, [(ms0 + i * 1000 + k, 1.0) for i in range(5)]) for k in range(2)]
+    archive._save_index("temperature", parts)
+    replication.log_segments(hub, "temperature", archive.load_index("temperature"), archive.ARCHIVE_DIR)
+    with hub.begin() as conn:
+        conn.execute(text("INSERT INTO freezers (id, name) VALUES (1, 'Main')"))
+
+    replication.read_batch(hub, 0)
+    assert replication.get_state(hub, "acked_seq") is None     # reading is not an ack
+
+    source = sync_replica.LocalSource(hub.url.database, "archive")
+    ground = workdir / "ground"
+    sync_replica.sync_once(source, replica, ground, limit=2)
+    assert replication.get_state(hub, "acked_seq") == str(replication.head(hub))
+    assert sorted(p.name for p in (ground / "temperature").glob("*.seg")) == ["2026-03-01.1.seg", "2026-03-01.seg"]
+
+    # The hub merges the parts: the replica drops the merged-away file and can query its copy
+    archive.append_days("temperature", {day: [(ms0 + 99_000, 2.0)]})
+    replication.log_segments(hub, "temperature", archive.load_index("temperature"), archive.ARCHIVE_DIR)
+    stats = sync_replica.sync_once(source, replica, ground, limit=2)
+    assert stats["removed"] == 1
+    assert [p.name for p in (ground / "temperature").glob("*.seg")] == ["2026-03-01.seg"]
+    expected = list(archive.query("temperature"))
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", ground)
+    assert list(archive.query("temperature")) == expected and len(expected) == 11
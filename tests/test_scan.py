@@ -0,0 +1,68 @@
+import threading
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from models import Freezer, Item, Transaction
+from services import scan
+
+
+def add_item(engine, code="P1", quantity=1):
+    with Session(engine) as s:
+        s.add(Freezer(id=1, name="Main"))
+        s.add(Item(id=1, name="Peas", code=code, quantity=quantity, freezer_id=1))
+        s.commit()
+
+
+def test_concurrent_check_outs_of_the_last_unit(engine):
+    add_item(engine, quantity=1)
+    scan.index.warm(engine)
+    start = threading.Barrier(8)
+    results = []
+
+    def check_out():
+        start.wait()
+        results.append(scan.scan(engine, "P1", "check_out"))
+
+    threads = [threading.Thread(target=check_out) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    ok = [r for r in results if "error" not in r]
+    assert len(ok) == 1 and ok[0]["quantity"] == 0
+    assert [r["error"] for r in results if "error" in r] == ["No quantity available"] * 7
+    with Session(engine) as s:
+        assert s.get(Item, 1).quantity == 0
+        assert len(s.scalars(select(Transaction)).all()) == 1
+
+
+def test_cache_is_untouched_by_a_rolled_back_scan(engine):
+    add_item(engine)
+    scan.index.warm(engine)
+    with engine.connect() as conn:
+        conn.execute(text("DELETE FROM items"))
+        conn.commit()
+        # A miss is looked up in the job, but only remembered by scan() after the commit
+        with conn.begin() as tx:
+            conn.execute(text("INSERT INTO items (id, name, code, quantity, freezer_id) VALUES (2, 'Corn', 'C2', 3, 1)"))
+            assert scan._apply(conn, "C2", "check_out")["item_id"] == 2
+            tx.rollback()
+    assert scan.index.get("C2") is None
+    assert scan.index.get("P1") == 1
+
+
+def test_scan_caches_misses_and_forgets_deleted_codes(engine):
+    add_item(engine)
+    scan.index.warm(engine)
+    with Session(engine) as s:
+        s.add(Item(id=2, name="Corn", code="C2", quantity=3, freezer_id=1))
+        s.commit()
+    assert scan.scan(engine, "C2", "check_in")["quantity"] == 4
+    assert scan.index.get("C2") == 2
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM items WHERE id = 1"))
+    assert scan.scan(engine, "P1", "check_in") == {"error": "Item not found"}
+    assert scan.index.get("P1") is None
@@ -0,0 +1,82 @@
+import os
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from models import Base, Freezer, Item
+from services import search as search_svc
+
+# Set to a throwaway database (its tables are dropped afterwards) to run the Postgres path too
+PG_URL = os.environ.get("SEARCH_TEST_POSTGRES_URL")
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def db(request, tmp_path):
+    if request.param == "sqlite":
+        eng = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    elif PG_URL:
+        eng = create_engine(PG_URL)
+    else:
+        pytest.skip("SEARCH_TEST_POSTGRES_URL not set")
+    Base.metadata.drop_all(eng)
+    Base.metadata.create_all(eng)
+    search_svc.install(eng)
+    with Session(eng) as s:
+        s.add_all([Freezer(id=1, name="Main"), Freezer(id=2, name="Spare")])
+        s.flush()
+        yield s
+    Base.metadata.drop_all(eng)
+    eng.dispose()
+
+
+def add(db, name, location=None, serving_size=None, freezer_id=1):
+    db.add(Item(name=name, code=name, location=location, serving_size=serving_size, freezer_id=freezer_id))
+    db.commit()
+
+
+def names(db, q, **kw):
+    return [r["name"] for r in search_svc.search_items(db, q, **kw)]
+
+
+def test_name_match_ranks_above_location_match(db):
+    add(db, "Ice cream", location="Pea drawer")
+    add(db, "Frozen peas", location="Top shelf")
+    add(db, "Bread", serving_size="1 pea-sized slice")
+    assert names(db, "pea") == ["Frozen peas", "Ice cream", "Bread"]
+
+
+def test_build_match_quotes_every_token():
+    assert search_svc.build_match("") is None
+    assert search_svc.build_match('"*  -') is None
+    assert search_svc.build_match("frozen pe") == '"frozen" "pe"*'
+    # FTS5 operators in user input are plain words, never syntax
+    assert search_svc.build_match('peas NEAR corn -ice "x*') == '"peas" "NEAR" "corn" "ice" "x"*'
+    assert search_svc.build_tsquery("peas & !corn | x:*") == "peas & corn & x:*"
+
+
+def test_last_word_matches_as_a_prefix(db):
+    add(db, "Frozen peas")
+    add(db, "Pears")
+    add(db, "Peppers")
+    assert sorted(names(db, "pe")) == ["Frozen peas", "Pears", "Peppers"]
+    assert names(db, "frozen pe") == ["Frozen peas"]
+    assert names(db, "pea frozen") == []              # only the last word is a prefix
+
+
+def test_operators_and_quotes_in_input_are_literal(db):
+    add(db, "Ice cream NEAR door")
+    add(db, "Peas", location="Ice box")
+    add(db, "Corn")
+    for q in ['ice"', '"ice', "ice*", "-ice", "ice AND", "NEAR(ice corn)", 'ice" OR "corn']:
+        names(db, q)                                  # never a query syntax error
+    assert names(db, "NEAR door") == ["Ice cream NEAR door"]
+    assert names(db, "-corn") == ["Corn"]             # not a negation
+    assert names(db, 'ice" OR "corn') == []           # OR is just another required word
+
+
+def test_freezer_filter(db):
+    add(db, "Peas", freezer_id=1)
+    add(db, "Pea soup", freezer_id=2)
+    assert sorted(names(db, "pea")) == ["Pea soup", "Peas"]
+    assert names(db, "pea", freezer_id=2) == ["Pea soup"]
+    assert names(db, "pea", freezer_id=3) == []
@@ -0,0 +1,41 @@
+import csv
+
+import pytest
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    return TestClient(main.app)
+
+
+def open_faults():
+    from sqlalchemy import select
+    from database import SessionLocal
+    from models import Alert
+    with SessionLocal() as db:
+        return db.scalars(select(Alert.message).where(
+            Alert.freezer_id == 1, Alert.message.like("Sensor fault%"), Alert.is_acknowledged == False)).all()
+
+
+def readings(workdir):
+    path = workdir / "temperature_data.csv"
+    if not path.exists():
+        return []
+    with open(path, newline="") as fh:
+        return [row[1] for row in csv.reader(fh)][1:]
+
+
+def test_lost_link_raises_one_alert_and_stores_no_reading(client, workdir):
+    for _ in range(2):
+        r = client.post("/temperature/fault", params={"reason": "No reading from probe 0 for 80s", "freezer_id": 1})
+        assert r.json()["status"] == "fault"
+    assert len(open_faults()) == 1
+    assert readings(workdir) == []
+
+
+def test_fault_values_are_never_stored(client, workdir):
+    assert client.post("/temperature", params={"temperature": -127, "freezer_id": 1}).json()["status"] == "fault"
+    assert client.post("/temperature", params={"temperature": -18.5, "freezer_id": 1}).json()["status"] == "success"
+    assert readings(workdir) == ["-18.5"]
@@ -0,0 +1,29 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import simulate_sensors
+from services import archive
+from services.simulator import FreezerSim
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_storage_samples_land_in_their_utc_day(new_york):
+    start = datetime(2026, 3, 1, 22, 0)            # naive UTC, 22:00-02:00 across midnight
+    simulate_sensors.run_storage({1: FreezerSim(start=start, seed=1)}, 60, 240, 0)
+    for entry in archive.load_index("power"):
+        day = entry["file"][:10]
+        samples = archive._read_segment("power", entry)
+        days = {datetime.fromtimestamp(ms / 1000, tz=timezone.utc).date().isoformat() for ms, _ in samples}
+        assert days == {day}
+    assert [e["file"] for e in archive.load_index("power")] == ["2026-03-01.seg", "2026-03-02.seg"]
+    assert archive.load_index("power")[0]["start"] == archive.to_ms("2026-03-01T22:01:00")
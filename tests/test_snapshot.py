@@ -0,0 +1,72 @@
+import fcntl
+import sqlite3
+
+import pytest
+
+from services import coord, snapshot
+
+
+def make_db(path, value):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS t (v TEXT)")
+    conn.execute("DELETE FROM t")
+    conn.execute("INSERT INTO t VALUES (?)", (value,))
+    conn.commit()
+    conn.close()
+
+
+def read_db(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT v FROM t").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_back_to_back_snapshots_get_distinct_names_and_rotate_oldest(workdir):
+    db = workdir / "inv.db"
+    make_db(db, "x")
+    taken = [snapshot.take(db, workdir / "snaps", keep=3)["file"] for _ in range(5)]
+    assert len(set(taken)) == 5
+    kept = snapshot.list_snapshots(workdir / "snaps", "inv")
+    assert [str(p) for p in kept] == taken[:-4:-1]
+
+
+def test_order_is_by_time_not_name(workdir):
+    snaps = workdir / "snaps"
+    snaps.mkdir()
+    # Older naming: a same-second suffix sorted before the plain name as a string
+    names = ["inv-20250301T020000.db.gz", "inv-20250301T020000.1.db.gz",
+             "inv-20250301T020000500000.db.gz", "inv-20250301T020001.db.gz"]
+    for name in names:
+        (snaps / name).write_bytes(b"")
+    assert [p.name for p in snapshot.list_snapshots(snaps, "inv")] == names[::-1]
+    assert snapshot.rotate(snaps, "inv", keep=2) == names[1::-1]
+
+
+def test_restore_round_trip(workdir):
+    db = workdir / "inv.db"
+    make_db(db, "before")
+    snap = snapshot.take(db, workdir / "snaps")["file"]
+    make_db(db, "after")
+    info = snapshot.restore(snap, db)
+    assert read_db(db) == "before"
+    # The overwritten contents were saved and can be restored in turn
+    snapshot.restore(info["previous"], db)
+    assert read_db(db) == "after"
+
+
+def test_restore_refused_while_service_runs(workdir):
+    db = workdir / "inv.db"
+    make_db(db, "before")
+    snap = snapshot.take(db, workdir / "snaps")["file"]
+    make_db(db, "after")
+    coord.RUN_DIR.mkdir()
+    with open(coord.LEADER_LOCK, "a+") as leader:    # a running worker's lock
+        fcntl.flock(leader, fcntl.LOCK_EX)
+        with pytest.raises(ValueError, match="running"):
+            snapshot.restore(snap, db)
+    assert read_db(db) == "after"
+    snapshot.restore(snap, db)
+    assert read_db(db) == "before"
@@ -0,0 +1,35 @@
+import contextvars
+from concurrent.futures import Future
+
+import pytest
+from sqlalchemy import insert, select
+
+from models import Freezer
+from services import writer
+
+
+def _job(fn):
+    return fn, Future(), contextvars.copy_context()
+
+
+def test_failing_job_only_undoes_itself(engine):
+    w = writer.GroupCommitWriter(engine)
+
+    def ok(n):
+        return lambda conn: conn.execute(insert(Freezer).values(id=n, name=f"Freezer {n}"))
+
+    def fails(conn):
+        conn.execute(insert(Freezer).values(id=3, name="Freezer 3"))
+        conn.execute(insert(Freezer).values(id=1, name="duplicate"))    # primary key clash
+
+    batch = [_job(ok(1)), _job(fails), _job(ok(2))]
+    w._run_batch(batch)
+
+    assert batch[0][1].exception() is None
+    assert batch[2][1].exception() is None
+    with pytest.raises(Exception):
+        batch[1][1].result()
+    with engine.connect() as conn:
+        ids = conn.execute(select(Freezer.id).order_by(Freezer.id)).scalars().all()
+    assert ids == [1, 2]                     # the failed job's first insert was rolled back too
+    assert w.stats()["commits"] == 1 and w.stats()["failed"] == 1
@@ -0,0 +1,62 @@
+"""
+Anomaly Detector Tuning
+Replays stored temperature history (archive segments + live CSV) through the
+streaming detector in services/anomaly.py for a grid of parameters, and reports
+how many early warnings each setting would have raised and the per-sample cost.
+
+Run: python tune_anomaly.py [--freezer-id 1] [--days 30]
+"""
+
+import argparse
+import csv
+import itertools
+import time
+from datetime import datetime, timedelta, timezone
+
+from services import archive as archive_svc
+from services import freezers as freezers_svc
+from services.anomaly import DetectorParams, replay
+
+def load_history(freezer_id: int, days: float) -> list[tuple[float, float]]:
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    start_ms = int(start.timestamp() * 1000)
+    metric = freezers_svc.archive_metric("temperature", freezer_id)
+    samples = [(t / 1000, v) for t, v in archive_svc.query(metric, start_ms)]
+    try:
+        with open(freezers_svc.data_file("temperature", freezer_id), newline="") as fh:
+            for row in csv.DictReader(fh):
+                ts = datetime.fromisoformat(row["timestamp"]).replace(tzinfo=timezone.utc).timestamp()
+                if ts >= start.timestamp():
+                    samples.append((ts, float(row["temperature"])))
+    except (OSError, ValueError, KeyError):
+        pass
+    samples.sort()
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay history through the anomaly detector")
+    parser.add_argument("--freezer-id", type=int, default=1)
+    parser.add_argument("--days", type=float, default=30)
+    args = parser.parse_args()
+
+    history = load_history(args.freezer_id, args.days)
+    print(f"Loaded {len(history)} samples for freezer {args.freezer_id}")
+    if not history:
+        return
+
+    grid = {
+        "z_threshold": (4.0, 6.0, 8.0),
+        "rise_c_per_min": (0.4, 0.6, 1.0),
+        "cusum_h": (15.0, 25.0, 40.0),
+    }
+    print(f"{'z':>5}{'rise':>7}{'h':>6}{'alerts':>8}{'ewma':>6}{'rate':>6}{'cusum':>7}{'us/sample':>11}")
+    for z, rise, h in itertools.product(*grid.values()):
+        params = DetectorParams(z_threshold=z, rise_c_per_min=rise, cusum_h=h)
+        start = time.perf_counter()
+        found = replay(history, params)
+        cost_us = (time.perf_counter() - start) / len(history) * 1e6
+        kinds = {k: sum(a.kind == k for a in found) for k in ("ewma", "rate", "cusum")}
+        print(f"{z:>5}{rise:>7}{h:>6}{len(found):>8}{kinds['ewma']:>6}{kinds['rate']:>6}{kinds['cusum']:>7}{cost_us:>11.2f}")
+
+if __name__ == "__main__":
+    main()